@@ -0,0 +1,88 @@
+# MIT License
+#
+# Copyright (c) 2022 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# As a special exception, the copyright holders of exqalibur library give you
+# permission to combine exqalibur with code included in the standard release of
+# Perceval under the MIT license (or modified versions of such code). You may
+# copy and distribute such a combined system following the terms of the MIT
+# license for both exqalibur and Perceval. This exception for the usage of
+# exqalibur is limited to the python bindings used by Perceval.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import numpy as np
+
+from perceval.utils import BasicState, BSCount, BSDistribution, BSSamples
+from perceval.utils.conversion import probs_to_sample_count, samples_to_sample_count
+from perceval.utils.state_array import fock_space_occupations
+
+SHOTS = 100000
+
+
+def _build_distribution() -> BSDistribution:
+    # 116280 states of 6 photons in 14 modes
+    bsd = BSDistribution()
+    for occupation, p in zip(fock_space_occupations(14, 6).tolist(), np.random.random(116280)):
+        bsd[BasicState(occupation)] = p
+    bsd.normalize()
+    return bsd
+
+
+def _reference_probs_to_sample_count(probs: BSDistribution, count: int) -> BSCount:
+    # Former implementation: independent normal perturbation of each probability
+    perturbed_dist = {state: max(prob + np.random.normal(scale=(prob * (1 - prob) / count) ** .5), 0)
+                      for state, prob in probs.items()}
+    fac = 1 / sum(prob for prob in perturbed_dist.values())
+    results = BSCount()
+    for state, prob in perturbed_dist.items():
+        results.add(state, int(np.round(fac * prob * count)))
+    return results
+
+
+def _reference_samples_to_sample_count(sample_list: BSSamples) -> BSCount:
+    # Former implementation: one list scan per distinct state
+    results = BSCount()
+    for s in sample_list:
+        if s not in results:
+            results[s] = sample_list.count(s)
+    return results
+
+
+bsd = _build_distribution()
+samples = bsd.sample(SHOTS)
+
+
+def test_probs_to_sample_count(benchmark):
+    benchmark(probs_to_sample_count, bsd, SHOTS)
+
+
+def test_probs_to_sample_count_reference(benchmark):
+    benchmark(_reference_probs_to_sample_count, bsd, SHOTS)
+
+
+def test_samples_to_sample_count(benchmark):
+    benchmark(samples_to_sample_count, samples)
+
+
+def test_samples_to_sample_count_reference(benchmark):
+    # The former implementation is quadratic (about 12s for 5000 samples): it only runs on the first samples
+    sample_subset = BSSamples()
+    sample_subset.extend(samples[:5000])
+    benchmark.pedantic(_reference_samples_to_sample_count, args=(sample_subset,), rounds=1, iterations=1)
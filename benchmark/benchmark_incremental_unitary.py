@@ -0,0 +1,55 @@
+# MIT License
+#
+# Copyright (c) 2022 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# As a special exception, the copyright holders of exqalibur library give you
+# permission to combine exqalibur with code included in the standard release of
+# Perceval under the MIT license (or modified versions of such code). You may
+# copy and distribute such a combined system following the terms of the MIT
+# license for both exqalibur and Perceval. This exception for the usage of
+# exqalibur is limited to the python bindings used by Perceval.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import random
+
+import perceval as pcvl
+import perceval.components.unitary_components as comp
+
+m = 12
+
+
+def _build_circuit() -> pcvl.Circuit:
+    return pcvl.Circuit.generic_interferometer(
+        m, lambda i: comp.BS(theta=pcvl.P(f"theta{i}")) // comp.PS(phi=pcvl.P(f"phi{i}")), shape="rectangle")
+
+
+def _variational_loop(circuit: pcvl.Circuit, iterations: int):
+    # Tweak one phase at a time, as a gradient-free optimizer does
+    params = circuit.get_parameters()
+    for _ in range(iterations):
+        random.choice(params).set_value(random.random())
+        circuit.compute_unitary()
+
+
+def test_variational_loop(benchmark):
+    circuit = _build_circuit()
+    for param in circuit.get_parameters():
+        param.set_value(random.random())
+    benchmark(_variational_loop, circuit, 100)
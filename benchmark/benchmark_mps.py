@@ -0,0 +1,71 @@
+# MIT License
+#
+# Copyright (c) 2022 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# As a special exception, the copyright holders of exqalibur library give you
+# permission to combine exqalibur with code included in the standard release of
+# Perceval under the MIT license (or modified versions of such code). You may
+# copy and distribute such a combined system following the terms of the MIT
+# license for both exqalibur and Perceval. This exception for the usage of
+# exqalibur is limited to the python bindings used by Perceval.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import numpy as np
+
+import perceval as pcvl
+import perceval.components.unitary_components as comp
+from perceval.backends import MPSBackend
+
+m = 60
+n = 4
+cutoff = 10
+
+
+def _build_circuit() -> pcvl.Circuit:
+    return pcvl.Circuit.generic_interferometer(
+        m, lambda i: comp.BS(theta=float(np.random.random() * 3)) // comp.PS(phi=float(np.random.random() * 6)),
+        shape="rectangle", depth=20)
+
+
+def _compile(circuit: pcvl.Circuit, input_state: pcvl.BasicState):
+    backend = MPSBackend()
+    backend.set_cutoff(cutoff)
+    backend.set_circuit(circuit)
+    backend.set_input_state(input_state)
+    return backend
+
+
+def _amplitudes(backend: MPSBackend, output_states):
+    for output_state in output_states:
+        backend.prob_amplitude(output_state)
+
+
+circuit = _build_circuit()
+input_state = pcvl.BasicState([1] * n + [0] * (m - n))
+
+
+def test_mps_compile(benchmark):
+    benchmark(_compile, circuit, input_state)
+
+
+def test_mps_prob_amplitudes(benchmark):
+    backend = _compile(circuit, input_state)
+    output_states = [pcvl.BasicState(list(np.random.permutation(list(input_state)))) for _ in range(200)]
+    benchmark(_amplitudes, backend, output_states)
@@ -0,0 +1,103 @@
+# MIT License
+#
+# Copyright (c) 2022 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# As a special exception, the copyright holders of exqalibur library give you
+# permission to combine exqalibur with code included in the standard release of
+# Perceval under the MIT license (or modified versions of such code). You may
+# copy and distribute such a combined system following the terms of the MIT
+# license for both exqalibur and Perceval. This exception for the usage of
+# exqalibur is limited to the python bindings used by Perceval.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import numpy as np
+
+from perceval.utils import BasicState, BSCount, BSDistribution
+from perceval.utils.state_array import fock_space_occupations
+from perceval.serialization import serialize, deserialize
+
+SHOTS = 1000000
+
+
+def _build_distribution() -> BSDistribution:
+    # 38760 states of 6 photons in 12 modes
+    occupations = fock_space_occupations(12, 6)
+    bsd = BSDistribution()
+    for occupation, p in zip(occupations.tolist(), np.random.random(len(occupations))):
+        bsd[BasicState(occupation)] = p
+    bsd.normalize()
+    return bsd
+
+
+bsd = _build_distribution()
+samples = bsd.sample(SHOTS)
+bsc = BSCount()
+for state, count in zip(*np.unique(np.random.choice(len(bsd), SHOTS), return_counts=True)):
+    bsc[list(bsd.keys())[state]] = int(count)
+serialized = {(name, binary): serialize(obj, compress=False, binary=binary)
+              for name, obj in [("bsd", bsd), ("bsc", bsc), ("samples", samples)] for binary in (False, True)}
+
+
+def test_serialize_bssamples_text(benchmark):
+    benchmark(serialize, samples, compress=False)
+
+
+def test_serialize_bssamples_binary(benchmark):
+    benchmark(serialize, samples, compress=False, binary=True)
+
+
+def test_deserialize_bssamples_text(benchmark):
+    benchmark(deserialize, serialized["samples", False])
+
+
+def test_deserialize_bssamples_binary(benchmark):
+    benchmark(deserialize, serialized["samples", True])
+
+
+def test_serialize_bsdistribution_text(benchmark):
+    benchmark(serialize, bsd)
+
+
+def test_serialize_bsdistribution_binary(benchmark):
+    benchmark(serialize, bsd, binary=True)
+
+
+def test_deserialize_bsdistribution_text(benchmark):
+    benchmark(deserialize, serialized["bsd", False])
+
+
+def test_deserialize_bsdistribution_binary(benchmark):
+    benchmark(deserialize, serialized["bsd", True])
+
+
+def test_serialize_bscount_text(benchmark):
+    benchmark(serialize, bsc)
+
+
+def test_serialize_bscount_binary(benchmark):
+    benchmark(serialize, bsc, binary=True)
+
+
+def test_deserialize_bscount_text(benchmark):
+    benchmark(deserialize, serialized["bsc", False])
+
+
+def test_deserialize_bscount_binary(benchmark):
+    benchmark(deserialize, serialized["bsc", True])
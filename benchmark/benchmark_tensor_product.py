@@ -0,0 +1,85 @@
+# MIT License
+#
+# Copyright (c) 2022 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# As a special exception, the copyright holders of exqalibur library give you
+# permission to combine exqalibur with code included in the standard release of
+# Perceval under the MIT license (or modified versions of such code). You may
+# copy and distribute such a combined system following the terms of the MIT
+# license for both exqalibur and Perceval. This exception for the usage of
+# exqalibur is limited to the python bindings used by Perceval.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import perceval as pcvl
+from perceval.backends import SLOSBackend
+from perceval.components.unitary_components import BS, PS
+from perceval.utils import BSDistribution, CompactBSDistribution
+
+
+def _prepare_imperfect_source_inputs():
+    r"""Reproduces the recombination step of Simulator.probs_svd for 12 modes and 6 photons emitted by an imperfect
+    source with g2 > 0 (distinguishable noise photons)"""
+    circuit = pcvl.Circuit.generic_interferometer(12, lambda i: BS(theta=0.3 + i / 10) // PS(i / 5))
+    source = pcvl.Source(emission_probability=0.9, multiphoton_component=0.02, indistinguishability=0.9)
+    svd = source.generate_distribution(pcvl.BasicState([1, 0] * 6))
+    decomposed_input = [(p, sv[0].separate_state(keep_annotations=False)) for sv, p in svd.items()
+                        if sv[0].n >= 6]
+    slos = SLOSBackend()
+    slos.set_circuit(circuit)
+    distributions = {}
+    for _, input_list in decomposed_input:
+        for input_state in input_list:
+            if input_state not in distributions:
+                slos.set_input_state(input_state)
+                distributions[input_state] = slos.prob_distribution()
+    return decomposed_input, distributions
+
+
+DECOMPOSED_INPUT, DISTRIBUTIONS = _prepare_imperfect_source_inputs()
+COMPACT_DISTRIBUTIONS = {state: CompactBSDistribution.from_bsd(bsd) for state, bsd in DISTRIBUTIONS.items()}
+
+
+def run_recombination(dist_type, distributions, threshold: float = 1e-8):
+    for prob, input_list in DECOMPOSED_INPUT:
+        result = dist_type()
+        for input_state in input_list:
+            result = dist_type.tensor_product(result, distributions[input_state], merge_modes=True,
+                                              prob_threshold=threshold / prob)
+
+
+def run_loop():
+    min_pairs = BSDistribution._VECTORIZED_PRODUCT_MIN_PAIRS
+    BSDistribution._VECTORIZED_PRODUCT_MIN_PAIRS = float("inf")  # Forces the pair by pair Python loop
+    try:
+        run_recombination(BSDistribution, DISTRIBUTIONS)
+    finally:
+        BSDistribution._VECTORIZED_PRODUCT_MIN_PAIRS = min_pairs
+
+
+def test_tensor_product_loop_12_6_g2(benchmark):
+    benchmark(run_loop)
+
+
+def test_tensor_product_vectorized_12_6_g2(benchmark):
+    benchmark(run_recombination, BSDistribution, DISTRIBUTIONS)
+
+
+def test_tensor_product_compact_12_6_g2(benchmark):
+    benchmark(run_recombination, CompactBSDistribution, COMPACT_DISTRIBUTIONS)
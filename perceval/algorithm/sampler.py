@@ -33,8 +33,19 @@ from .abstract_algorithm import AAlgorithm
 from perceval.utils import samples_to_sample_count, samples_to_probs, sample_count_to_samples,\
                            sample_count_to_probs, probs_to_samples, probs_to_sample_count
 from perceval.components.abstract_processor import AProcessor
-from perceval.runtime import Job, RemoteJob, LocalJob
-from perceval.utils import BasicState
+from perceval.components.processor import Processor
+from perceval.runtime import Job, RemoteJob, LocalJob, LocalStreamJob
+from perceval.utils import BasicState, BasicStateArray, BSCount
+
+import numpy as np
+
+
+def _count_samples(counts: BSCount, samples: BasicStateArray) -> BSCount:
+    if len(samples):
+        states, state_counts = np.unique(samples.occupations, axis=0, return_counts=True)
+        for state, state_count in zip(states.tolist(), state_counts.tolist()):
+            counts[BasicState(state)] += state_count
+    return counts
 
 
 class Sampler(AAlgorithm):
@@ -128,6 +139,18 @@ class Sampler(AAlgorithm):
     def probs(self) -> Job:
         return self._generic("probs")
 
+    @property
+    def samples_stream(self) -> LocalStreamJob:
+        r"""
+        Streaming sampling job, for local processors only. Samples are produced chunk by chunk (see
+        `Processor.samples_iterator`) and folded into a `BSCount` as results, so that memory usage does not depend on
+        the shot count. Chunks can also be consumed directly with `LocalStreamJob.iterate`.
+        """
+        assert isinstance(self._processor, Processor), "Sample streaming requires a local processor"
+        assert not self._iterator, "Sample streaming does not support iterations"
+        assert self._input_available(), "Missing input state"
+        return LocalStreamJob(self._processor.samples_iterator, fold=_count_samples, init_results=BSCount)
+
     # Iterator construction methods
     def add_iteration(self, circuit_params: Dict = None,
                       input_state: BasicState = None,
@@ -166,13 +189,34 @@ class Sampler(AAlgorithm):
     # Local iteration methods: mimic the remote iteration for interchangeability purpose
     def _probs_iterate_locally(self, progress_callback: Callable = None):
         results = {'results_list':[]}
-        for idx, it in enumerate(self._iterator):
-            self._apply_iteration(it)
-            results['results_list'].append(self._processor.probs())
+        done = 0
+        for group in self._group_iterations():
+            if len(group) > 1 and isinstance(self._processor, Processor):
+                # Iterations sharing the same input and photon filter only differ by their circuit parameters
+                self._apply_iteration({k: v for k, v in group[0].items() if k != 'circuit_params'})
+                results['results_list'] += self._processor.probs_sweep([it.get('circuit_params', {}) for it in group])
+            else:
+                for it in group:
+                    self._apply_iteration(it)
+                    results['results_list'].append(self._processor.probs())
+            done += len(group)
             if progress_callback is not None:
-                progress_callback((idx+1)/len(self._iterator))
+                progress_callback(done/len(self._iterator))
         return results
 
+    def _group_iterations(self) -> List[List[Dict]]:
+        # Split the iterations in runs of consecutive iterations sharing input state and min detected photon count
+        groups = []
+        current = {}
+        for it in self._iterator:
+            changes = {k: it[k] for k in ('input_state', 'min_detected_photons') if k in it}
+            if groups and all(current.get(k) == v for k, v in changes.items()):
+                groups[-1].append(it)
+            else:
+                current.update(changes)
+                groups.append([it])
+        return groups
+
     def _sample_count_iterate_locally(self, count: int, progress_callback: Callable = None):
         results = {'results_list':[]}
         for idx, it in enumerate(self._iterator):
@@ -196,6 +240,7 @@ class Sampler(AAlgorithm):
             circuit_params = self._processor.get_circuit_parameters()
             for name, value in it['circuit_params'].items():
                 circuit_params[name].set_value(value)
+            self._processor._circuit_changed()  # Rebuilds the simulation with the new parameter values
         if 'input_state' in it:
             self._processor.with_input(it['input_state'])
         if 'min_detected_photons' in it:
@@ -32,6 +32,7 @@ from ._abstract_backends import ABackend, ASamplingBackend, AProbAmpliBackend
 from ._clifford2017 import Clifford2017Backend
 from ._naive import NaiveBackend
 from ._slos import SLOSBackend
+from ._slos_cache import SLOSPathCache
 from ._mps import MPSBackend
 
 
@@ -28,20 +28,44 @@
 # SOFTWARE.
 
 from abc import ABC, abstractmethod
+from typing import Iterable, Tuple, Union
+
+import numpy as np
 
 from perceval.components import ACircuit
-from perceval.utils import BasicState, BSDistribution, allstate_iterator, StateVector
+from perceval.utils import BasicState, BasicStateArray, BSDistribution, allstate_iterator, StateVector
+from perceval.utils.state_array import fock_space_occupations
+
+
+def _as_state_array(output_states: Union[BasicStateArray, np.ndarray, Iterable[BasicState]],
+                    m: int) -> BasicStateArray:
+    if isinstance(output_states, BasicStateArray):
+        return output_states
+    if isinstance(output_states, np.ndarray):
+        return BasicStateArray(output_states)
+    return BasicStateArray.from_states(output_states, m)
 
 
 class ABackend(ABC):
     def __init__(self):
         self._circuit = None
+        self._circuit_version = None
         self._umat = None
         self._input_state = None
 
+    def _track_circuit(self, circuit: ACircuit) -> bool:
+        """Record the version of the circuit about to be set, and return True if it is the current circuit and it did
+        not change since it was set"""
+        version = circuit.version
+        unchanged = circuit is self._circuit and version is not None and version == self._circuit_version
+        self._circuit_version = version
+        return unchanged
+
     def set_circuit(self, circuit: ACircuit):
         assert not circuit.requires_polarization, "Circuit must not contain polarized components"
         self._input_state = None
+        if self._track_circuit(circuit):
+            return
         self._circuit = circuit
         self._umat = circuit.compute_unitary()
 
@@ -69,6 +93,17 @@ class ASamplingBackend(ABackend):
     def sample(self):
         """Request samples from the circuit given an input state"""
 
+    def sample_many(self, count: int) -> np.ndarray:
+        r"""Request `count` samples from the circuit given an input state
+
+        :param count: number of samples
+        :return: a (count x m) occupation array, each row being a sampled output state
+        """
+        res = np.zeros((count, self._input_state.m), dtype=np.int64)
+        for i in range(count):
+            res[i] = list(self.sample())
+        return res
+
     @staticmethod
     def preferred_command() -> str:
         return "sample"
@@ -82,12 +117,44 @@ class AProbAmpliBackend(ABackend):
     def probability(self, output_state: BasicState) -> float:
         return abs(self.prob_amplitude(output_state)) ** 2
 
+    def prob_amplitudes(self, output_states: Union[BasicStateArray, np.ndarray, Iterable[BasicState]]) -> np.ndarray:
+        r"""Compute the probability amplitudes of a batch of output states
+
+        Backends override this method to compute all amplitudes at once, the default implementation calls
+        `prob_amplitude` for each state.
+
+        :param output_states: the output states, as a `BasicStateArray`, a (count x m) occupation array or an iterable
+            of non-annotated basic states
+        :return: a complex vector of the amplitudes, in the order of the output states
+        """
+        states = _as_state_array(output_states, self._input_state.m)
+        return np.fromiter((self.prob_amplitude(output_state) for output_state in states), dtype=complex,
+                           count=len(states))
+
     def prob_distribution(self) -> BSDistribution:
         bsd = BSDistribution()
         for output_state in allstate_iterator(self._input_state):
             bsd.add(output_state, self.probability(output_state))
         return bsd
 
+    def amplitude_vector(self) -> Tuple[np.ndarray, BasicStateArray]:
+        r"""Compute the output probability amplitudes of the current input state as a NumPy vector
+
+        :return: a tuple (amplitudes, output states) where output states is a lazy `BasicStateArray` indexed the
+            same way as the amplitudes
+        """
+        states = BasicStateArray(fock_space_occupations(self._input_state.m, self._input_state.n))
+        return self.prob_amplitudes(states), states
+
+    def prob_vector(self) -> Tuple[np.ndarray, BasicStateArray]:
+        r"""Compute the output probabilities of the current input state as a NumPy vector
+
+        :return: a tuple (probabilities, output states) where output states is a lazy `BasicStateArray` indexed the
+            same way as the probabilities
+        """
+        amplitudes, states = self.amplitude_vector()
+        return np.abs(amplitudes) ** 2, states
+
     def evolve(self) -> StateVector:
         res = StateVector()
         for output_state in allstate_iterator(self._input_state):
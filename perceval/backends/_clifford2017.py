@@ -42,7 +42,15 @@ def _get_scale(w):
     return max([max(abs(x.real), abs(x.imag)) for x in w])
 
 
+def _choose_modes(w):
+    # Draw one mode per row of a (count x m) weight matrix
+    cumulated = np.cumsum(w, axis=1)
+    r = np.random.random(w.shape[0]) * cumulated[:, -1]
+    return np.minimum((cumulated <= r[:, np.newaxis]).sum(axis=1), w.shape[1] - 1)
+
+
 class Clifford2017Backend(ASamplingBackend):
+    _BATCH_SIZE = 8192
 
     @property
     def name(self) -> str:
@@ -86,3 +94,44 @@ class Clifford2017Backend(ASamplingBackend):
             mode_seq.append(next_mode)
             output_state[next_mode] += 1
         return BasicState(output_state)
+
+    def sample_many(self, count: int) -> np.ndarray:
+        r"""Request `count` samples from the circuit given an input state
+
+        The `us` matrix is prepared once, then the random permutations and the mode choices of each step of the
+        algorithm are drawn for a whole batch of samples at once. Only the sub-permanent computations remain per
+        sample.
+
+        :param count: number of samples
+        :return: a (count x m) occupation array, each row being a sampled output state
+        """
+        n = self._input_state.n
+        m = self._input_state.m
+        res = np.zeros((count, m), dtype=np.int64)
+        if n == 0:
+            res[:] = list(self._input_state)
+            return res
+        us = self._prepare_us()
+        for start in range(0, count, self._BATCH_SIZE):
+            size = min(self._BATCH_SIZE, count - start)
+            perms = np.argsort(np.random.random((size, n)), axis=1)
+            mode_seq = np.empty((size, n), dtype=np.int64)
+            mode_seq[:, 0] = _choose_modes(_square(us[perms[:, 0]]))
+            if n > 1:
+                # The sub-permanents of a 2x1 matrix are its two coefficients swapped: the second step is vectorized
+                A0, A1 = us[perms[:, 0]], us[perms[:, 1]]
+                mode0 = mode_seq[:, 0:1]
+                w = _square(np.take_along_axis(A1, mode0, axis=1) * A0 + np.take_along_axis(A0, mode0, axis=1) * A1)
+                mode_seq[:, 1] = _choose_modes(w)
+            for mode_limit in range(3, n + 1):
+                w = np.empty((size, m))
+                for idx in range(size):
+                    A = us[perms[idx, :mode_limit]]
+                    sub_perm = np.array(xq.sub_permanents_cx(
+                        np.copy(np.reshape(A[:, mode_seq[idx, :mode_limit - 1]], (-1, mode_limit - 1)))))
+                    sub_perm /= _get_scale(sub_perm)
+                    w[idx] = _square(np.dot(sub_perm.transpose(), A))
+                mode_seq[:, mode_limit - 1] = _choose_modes(w)
+            rows = np.repeat(np.arange(size), n)
+            np.add.at(res[start:start + size], (rows, mode_seq.ravel()), 1)
+        return res
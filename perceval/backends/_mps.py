@@ -32,27 +32,75 @@ import copy
 
 import numpy as np
 from math import factorial
-from scipy.special import comb
+from functools import lru_cache
 from collections import defaultdict
 
-from ._abstract_backends import AProbAmpliBackend
-from perceval.utils import BasicState
+from ._abstract_backends import AProbAmpliBackend, ASamplingBackend, _as_state_array
+from ._clifford2017 import _choose_modes
+from perceval.utils import BasicState, BasicStateArray, BSDistribution, global_params
 from perceval.components import ACircuit
 
 
-class MPSBackend(AProbAmpliBackend):
+def _empty_tensor():
+    return np.array([0])
+
+
+def _tensor_dict():
+    # Module level factories (instead of lambdas) keep the backend picklable
+    return defaultdict(_empty_tensor)
+
+
+@lru_cache(maxsize=16)
+def _transition_terms(d: int):
+    r"""Unitary independent part of the 2-mode transition tensor, for photon counts up to d-1.
+
+    Element (i1, i2, a, b) of the tensor sums over (k1, k2), with k1 + k2 = a, the terms
+    C(i1, k1) C(i2, k2) sqrt(a! b! / (i1! i2!)) u00^k1 u01^k2 u10^(i1-k1) u11^(i2-k2)
+
+    :return: the flat indexes in the (d, d, d, d) tensor, the coefficients, and the exponents (k1, k2, i1-k1, i2-k2)
+        of each non-zero term
+    """
+    i1, i2, k1, k2 = np.meshgrid(*[np.arange(d)] * 4, indexing='ij')
+    valid = (k1 <= i1) & (k2 <= i2) & (i1 + i2 < d)
+    i1, i2, k1, k2 = i1[valid], i2[valid], k1[valid], k2[valid]
+    a = k1 + k2
+    b = i1 + i2 - a
+    binomials = np.array([[factorial(i) // (factorial(k) * factorial(i - k)) if k <= i else 0 for k in range(d)]
+                          for i in range(d)], dtype=float)
+    factorials = np.array([factorial(i) for i in range(d)], dtype=float)
+    coefficients = binomials[i1, k1] * binomials[i2, k2] * np.sqrt(factorials[a] * factorials[b]
+                                                                   / (factorials[i1] * factorials[i2]))
+    indexes = np.ravel_multi_index((i1, i2, a, b), (d, d, d, d))
+    return indexes, coefficients, (k1, k2, i1 - k1, i2 - k2)
+
+
+def _transition_tensor(u, d: int) -> np.ndarray:
+    indexes, coefficients, exponents = _transition_terms(d)
+    powers = [u[i, j] ** np.arange(d) for i, j in ((0, 0), (0, 1), (1, 0), (1, 1))]
+    terms = coefficients * powers[0][exponents[0]] * powers[1][exponents[1]] * powers[2][exponents[2]] \
+        * powers[3][exponents[3]]
+    size = d ** 4
+    big_u = np.bincount(indexes, terms.real, size) + 1j * np.bincount(indexes, terms.imag, size)
+    return big_u.reshape(d, d, d, d)
+
+
+class MPSBackend(AProbAmpliBackend, ASamplingBackend):
     """Step-by-step circuit propagation algorithm, works on a circuit.
     Approximate the probability amplitudes with a cutoff.
     - For now only supports Phase shifters and Beam Splitters
     - TODO: link to the quandelibc computation
     """
+    _TRANSITION_CACHE_SIZE = 1024  # Transition tensors kept for distinct 2-mode unitaries
+    _SAMPLING_BATCH_SIZE = 8192
 
     def __init__(self):
         super().__init__()
         self._s_min = 1e-8
         self._cutoff = None
         self._compiled_input = None
-        self._res = defaultdict(lambda: defaultdict(lambda: np.array([0])))
+        self._res = defaultdict(_tensor_dict)
+        self._transition_cache = {}
+        self._einsum_paths = {}
         # Doubts : Nested dictionary why?
         self._current_input = None
 
@@ -87,7 +135,9 @@ class MPSBackend(AProbAmpliBackend):
 
     def compile(self) -> bool:
         C = self._circuit
-        var = [float(p) for p in C.get_parameters()]
+        var = C.version
+        if var is None:
+            var = [float(p) for p in C.get_parameters()]
         if self._compiled_input and self._compiled_input[0] == var and self._input_state in self._res:
             return False
         self._compiled_input = copy.copy((var, self._input_state))
@@ -107,20 +157,147 @@ class MPSBackend(AProbAmpliBackend):
         for r, c in C:
             self.apply(r, c)
 
-        self._res[tuple(self._input_state)]["gamma"] = self._gamma.copy()
-        self._res[tuple(self._input_state)]["sv"] = self.sv.copy()
+        res = self._res[tuple(self._input_state)]
+        res["gamma"] = self._gamma.copy()
+        res["sv"] = self.sv.copy()
+        res.pop("environments", None)  # Computed from the previous gamma and sv
         return True
 
     def prob_amplitude(self, output_state: BasicState) -> complex:
         # TODO: put in quandelibc
         m = self._input_state.m
-        mps_in_list = []
         self._current_input = tuple(self._input_state)
-        for k in range(m - 1):
-            mps_in_list.append(self._res[tuple(self._input_state)]["gamma"][k, :, :, output_state[k]])
-            mps_in_list.append(self._sv_diag(k))
-        mps_in_list.append(self._res[tuple(self._input_state)]["gamma"][self._input_state.m-1, :, :, output_state[self._input_state.m-1]])
-        return np.linalg.multi_dot(mps_in_list)[0, 0]
+        gamma = self._res[self._current_input]["gamma"]
+        sv = self._res[self._current_input]["sv"]
+        # Only the first row of the matrix product is needed: it is propagated as a vector, singular values multiplying
+        # its coefficients (instead of multiplying by a diagonal matrix)
+        row = gamma[0, 0, :, output_state[0]]
+        for k in range(1, m):
+            row = (row * sv[k - 1]) @ gamma[k, :, :, output_state[k]]
+        return row[0]
+
+    def prob_amplitudes(self, output_states) -> np.ndarray:
+        r"""Compute the probability amplitudes of a batch of output states
+
+        The tensor network is contracted for all output states simultaneously: the first rows of the matrix products of
+        all states are propagated together, as a (count x cutoff) matrix multiplied, for each mode, by one matrix per
+        occupation number.
+
+        :param output_states: the output states, as a `BasicStateArray`, a (count x m) occupation array or an iterable
+            of non-annotated basic states
+        :return: a complex vector of the amplitudes, in the order of the output states
+        """
+        occupations = _as_state_array(output_states, self._input_state.m).occupations.astype(np.intp)
+        m = self._input_state.m
+        self._current_input = tuple(self._input_state)
+        gamma = self._res[self._current_input]["gamma"]
+        sv = self._res[self._current_input]["sv"]
+        rows = gamma[0, 0][:, occupations[:, 0]].T
+        for k in range(1, m):
+            rows = rows * sv[k - 1]
+            new_rows = np.zeros_like(rows)
+            # States sharing the same occupation of mode k are multiplied by the same matrix
+            for occupation in np.unique(occupations[:, k]).tolist():
+                selected = occupations[:, k] == occupation
+                new_rows[selected] = rows[selected] @ gamma[k, :, :, occupation]
+            rows = new_rows
+        return rows[:, 0]
+
+    def _environments(self) -> list:
+        r"""Right environments of the MPS of the current input state
+
+        Environment k is the (cutoff x cutoff) matrix E_k = sum R R^dagger over all the occupations of modes k to m-1,
+        R being the product of the tensors of these modes (right boundary included). The probability of the
+        occupations of modes 0 to k-1 is then x E_k x^dagger, where x is the row reached by the contraction of modes 0
+        to k-1, multiplied by the singular values of bond k-1. They are computed once per input state.
+        """
+        res = self._res[tuple(self._input_state)]
+        if "environments" not in res:
+            gamma = res["gamma"]
+            sv = res["sv"]
+            m = self._input_state.m
+            last = gamma[m - 1, :, 0, :]
+            environments = [None] * m
+            environments[m - 1] = last @ last.conj().T
+            for k in range(m - 2, 0, -1):
+                scaled = sv[k][:, np.newaxis] * environments[k + 1] * sv[k][np.newaxis, :]
+                environments[k] = np.einsum('abo,bc,dco->ad', gamma[k], scaled, gamma[k].conj())
+            res["environments"] = environments
+        return res["environments"]
+
+    def _next_mode_probabilities(self, rows: np.ndarray, k: int):
+        r"""For each row (contraction of modes 0 to k-1) and each occupation of mode k, compute the row reached when
+        contracting mode k, and the probability of the occupations up to mode k"""
+        m = self._input_state.m
+        gamma = self._res[tuple(self._input_state)]["gamma"]
+        sv = self._res[tuple(self._input_state)]["sv"]
+        if k == 0:
+            next_rows = np.broadcast_to(gamma[0, 0].T[np.newaxis], (rows.shape[0], self.d, self._cutoff))
+        else:
+            next_rows = ((rows * sv[k - 1]) @ gamma[k].reshape(self._cutoff, -1)) \
+                .reshape(rows.shape[0], self._cutoff, self.d).transpose(0, 2, 1)
+        if k == m - 1:
+            probs = np.abs(next_rows[:, :, 0]) ** 2
+        else:
+            scaled = next_rows * sv[k]
+            probs = np.sum((scaled @ self._environments()[k + 1]) * scaled.conj(), axis=2).real
+        return next_rows, np.maximum(probs, 0)
+
+    def sample_many(self, count: int) -> np.ndarray:
+        r"""Sample output states mode by mode, each occupation being drawn from its probability conditioned on the
+        occupations already drawn
+
+        :param count: number of samples
+        :return: a (count x m) occupation array, each row being a sampled output state
+        """
+        m = self._input_state.m
+        res = np.zeros((count, m), dtype=np.int64)
+        for start in range(0, count, self._SAMPLING_BATCH_SIZE):
+            size = min(self._SAMPLING_BATCH_SIZE, count - start)
+            rows = np.zeros((size, self._cutoff), dtype=complex)
+            for k in range(m):
+                next_rows, probs = self._next_mode_probabilities(rows, k)
+                occupations = _choose_modes(probs)
+                res[start:start + size, k] = occupations
+                rows = next_rows[np.arange(size), occupations]
+        return res
+
+    def sample(self) -> BasicState:
+        return BasicState(self.sample_many(1)[0].tolist())
+
+    def prob_vector(self, threshold: float = None):
+        r"""Compute the output probabilities of the current input state, enumerating output states mode by mode and
+        pruning any partial state whose probability is below a threshold
+
+        :param threshold: pruning threshold, defaults to `global_params['min_p']`
+        :return: a tuple (probabilities, output states) where output states is a `BasicStateArray` containing only the
+            states above the threshold
+        """
+        if threshold is None:
+            threshold = global_params['min_p']
+        m = self._input_state.m
+        n = self._input_state.n
+        prefixes = np.zeros((1, 0), dtype=np.int64)
+        rows = np.zeros((1, self._cutoff), dtype=complex)
+        probs = np.ones(1)
+        for k in range(m):
+            next_rows, next_probs = self._next_mode_probabilities(rows, k)
+            photons = prefixes.sum(axis=1)[:, np.newaxis] + np.arange(self.d)[np.newaxis, :]
+            kept = (next_probs > threshold) & (photons <= n)
+            if k == m - 1:
+                kept &= photons == n
+            parent, occupation = np.nonzero(kept)
+            prefixes = np.concatenate([prefixes[parent], occupation[:, np.newaxis]], axis=1)
+            rows = next_rows[parent, occupation]
+            probs = next_probs[parent, occupation]
+        return probs, BasicStateArray(prefixes.astype(np.uint8 if n < 256 else np.uint16))
+
+    def prob_distribution(self, threshold: float = None) -> BSDistribution:
+        probs, states = self.prob_vector(threshold)
+        bsd = BSDistribution()
+        for state, prob in zip(states, probs.tolist()):
+            bsd[state] = prob
+        return bsd
 
     @staticmethod
     def preferred_command() -> str:
@@ -128,45 +305,21 @@ class MPSBackend(AProbAmpliBackend):
 
 # ################ From here, everything must be in quandelibc ##############################
 
-    def _transition_matrix_1_mode(self, u):
-        d = self.d
-
-        big_u = np.zeros((d, d), dtype='complex_')
-        for i in range(d):
-            big_u[i, i] = u[0, 0] ** i
-
-        return big_u
-
     def update_state_1_mode(self, k, u):
-        self._gamma[k] = np.tensordot(self._gamma[k], self._transition_matrix_1_mode(u), axes=(2, 0))
+        self._gamma[k] *= u[0, 0] ** np.arange(self.d)
 
     def update_state(self, k, u):
-
-        if 0 < k < self._input_state.m - 2:
-            theta = np.tensordot(self._sv_diag(k - 1), self._gamma[k, :], axes=(1, 0))
-            theta = np.tensordot(theta, self._sv_diag(k), axes=(1, 0))
-            theta = np.tensordot(theta, self._gamma[k + 1, :], axes=(2, 0))
-            theta = np.tensordot(theta, self._sv_diag(k + 1), axes=(2, 0))
-            theta = np.tensordot(theta, self._transition_matrix(u), axes=([1, 2], [0, 1]))
-            theta = theta.swapaxes(1, 2).swapaxes(0, 1).swapaxes(2, 3)
-            theta = theta.reshape(self.d * self._cutoff, self.d * self._cutoff)
-
-        elif k == 0:
-            theta = np.tensordot(self._gamma[k, :], self._sv_diag(k), axes=(1, 0))
-            theta = np.tensordot(theta, self._gamma[k + 1, :], axes=(2, 0))
-            theta = np.tensordot(theta, self._sv_diag(k + 1), axes=(2, 0))
-            theta = np.tensordot(theta, self._transition_matrix(u),
-                                 axes=([1, 2], [0, 1]))  # Pretty weird thing... To check
-            theta = theta.swapaxes(1, 2).swapaxes(0, 1).swapaxes(2, 3)
-            theta = theta.reshape(self.d * self._cutoff, self.d * self._cutoff)
-
-        elif k == self._input_state.m - 2:
-            theta = np.tensordot(self._sv_diag(k - 1), self._gamma[k, :], axes=(1, 0))
-            theta = np.tensordot(theta, self._sv_diag(k), axes=(1, 0))
-            theta = np.tensordot(theta, self._gamma[k + 1, :], axes=(2, 0))
-            theta = np.tensordot(theta, self._transition_matrix(u), axes=([1, 3], [0, 1]))
-            theta = theta.swapaxes(1, 2).swapaxes(0, 1).swapaxes(2, 3)
-            theta = theta.reshape(self.d * self._cutoff, self.d * self._cutoff)
+        # theta[(i', a), (j', c)] = sum_{b, i, j} s_{k-1}[a] gamma_k[a, b, i] s_k[b] gamma_k+1[b, c, j] s_k+1[c] U[i, j, i', j']
+        # where s_{k-1} (resp. s_k+1) is not applied on the first (resp. last) pair of modes
+        left = self._gamma[k] * self.sv[k][np.newaxis, :, np.newaxis]
+        if k > 0:
+            left *= self.sv[k - 1][:, np.newaxis, np.newaxis]
+        right = self._gamma[k + 1]
+        if k == 0 or k < self._input_state.m - 2:
+            right = right * self.sv[k + 1][np.newaxis, :, np.newaxis]
+        theta = np.einsum('abi,bcj,ijxy->xayc', left, right, self._transition_matrix(u),
+                          optimize=self._einsum_path(left.shape, right.shape))
+        theta = theta.reshape(self.d * self._cutoff, self.d * self._cutoff)
 
         v, s, w = np.linalg.svd(theta)
 
@@ -189,30 +342,21 @@ class MPSBackend(AProbAmpliBackend):
         else:
             self._gamma[k + 1] = w
 
+    def _einsum_path(self, left_shape, right_shape):
+        key = (left_shape, right_shape, self.d)
+        if key not in self._einsum_paths:
+            d = self.d
+            self._einsum_paths[key] = np.einsum_path('abi,bcj,ijxy->xayc', np.empty(left_shape), np.empty(right_shape),
+                                                     np.empty((d, d, d, d)), optimize='optimal')[0]
+        return self._einsum_paths[key]
+
     def _transition_matrix(self, u):
         "This function computes the elements (I,J) = (i_k, i_k+1, j_k, j_k+1) of the matrix U_k,k+1."
-        d = self.d
-        big_u = np.zeros((d,d,d,d), dtype = 'complex_')
-        for i1 in range(d):
-            for i2 in range(d):
-                itot = i1 + i2
-                u1, u2, u3, u4 = u[0,0], u[0,1], u[1, 0], u[1, 1]
-                outputs = np.zeros((d,d), dtype = 'complex_')
-                if itot <= self.n:
-                    for k1 in range(i1+1):
-                        for k2 in range(i2+1):
-                            outputs[k1 + k2, itot - (k1 + k2)] += comb(i1, k1)*comb(i2, k2)\
-                            *(u1**k1*u2**k2*u3**(i1-k1)*u4**(i2-k2))\
-                            *(np.sqrt(factorial(k1+k2)*factorial(itot-k1-k2)))
-
-                big_u[i1,i2,:] = outputs/(np.sqrt(factorial(i1)*factorial(i2)))
+        key = (u.tobytes(), self.d)
+        big_u = self._transition_cache.get(key)
+        if big_u is None:
+            if len(self._transition_cache) >= self._TRANSITION_CACHE_SIZE:
+                self._transition_cache.clear()
+            big_u = _transition_tensor(u, self.d)
+            self._transition_cache[key] = big_u
         return big_u
-
-    def _sv_diag(self, k):
-        if self._res[self._current_input]["sv"].any():
-            sv = self._res[self._current_input]["sv"]
-        else:
-            sv = self.sv
-        sv_diag = np.zeros((self._cutoff, self._cutoff))
-        np.fill_diagonal(sv_diag, sv[k, :])
-        return sv_diag
@@ -28,16 +28,31 @@
 # SOFTWARE.
 
 import math
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 
 import exqalibur as xq
-from ._abstract_backends import AProbAmpliBackend
+from ._abstract_backends import AProbAmpliBackend, _as_state_array
 from perceval.utils import BasicState
+from perceval.utils.state_array import prodnfact_array
+
+
+def _permanent(u_st: np.ndarray) -> complex:
+    return xq.permanent_cx(u_st, n_threads=1)
 
 
 class NaiveBackend(AProbAmpliBackend):
     """Naive algorithm, no clever calculation path, does not cache anything,
-       recompute all states on the fly"""
+       recompute all states on the fly
+
+    :param n_threads: number of threads computing the permanents of a batch of amplitudes (see `prob_amplitudes`)
+    """
+
+    def __init__(self, n_threads: int = 1):
+        super().__init__()
+        assert isinstance(n_threads, int) and n_threads >= 1, "Thread count must be a positive integer"
+        self._n_threads = n_threads
 
     @property
     def name(self) -> str:
@@ -62,3 +77,35 @@ class NaiveBackend(AProbAmpliBackend):
                         rowidx += 1
                 colidx += 1
         return xq.permanent_cx(u_st, n_threads=1)/math.sqrt(p)
+
+    def prob_amplitudes(self, output_states) -> np.ndarray:
+        r"""Compute the probability amplitudes of a batch of output states
+
+        The n x n sub-matrices of all the output states are extracted at once with fancy indexing, then their
+        permanents are computed by `n_threads` threads.
+
+        :param output_states: the output states, as a `BasicStateArray`, a (count x m) occupation array or an iterable
+            of non-annotated basic states
+        :return: a complex vector of the amplitudes, in the order of the output states
+        """
+        occupations = _as_state_array(output_states, self._input_state.m).occupations
+        n = self._input_state.n
+        m = self._input_state.m
+        res = np.zeros(len(occupations), dtype=complex)
+        valid = np.flatnonzero(occupations.sum(axis=1) == n)
+        if n == 0:
+            res[valid] = 1
+            return res
+        occupations = occupations[valid]
+        # Row indexes of each sub-matrix: the output modes, repeated by their occupation numbers
+        rows = np.repeat(np.tile(np.arange(m), len(occupations)), occupations.ravel()).reshape(len(occupations), n)
+        cols = np.repeat(np.arange(m), list(self._input_state))
+        sub_matrices = np.asarray(self._umat)[rows[:, :, np.newaxis], cols[np.newaxis, np.newaxis, :]]
+        norms = np.sqrt(prodnfact_array(occupations) * self._input_state.prodnfact())
+        if self._n_threads > 1:
+            with ThreadPoolExecutor(self._n_threads) as executor:
+                permanents = list(executor.map(_permanent, sub_matrices))
+        else:
+            permanents = [_permanent(u_st) for u_st in sub_matrices]
+        res[valid] = np.array(permanents, dtype=complex) / norms
+        return res
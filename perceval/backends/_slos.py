@@ -28,29 +28,25 @@
 # SOFTWARE.
 
 from ._abstract_backends import AProbAmpliBackend
-from perceval.utils import allstate_iterator, Matrix, BasicState, BSDistribution, StateVector
+from ._slos_cache import SLOSPathCache
+from perceval.utils import Matrix, BasicState, BasicStateArray, BSDistribution, StateVector, global_params
+from perceval.utils.state_array import pack_occupations, packed_keys_view
 
+from itertools import compress
 import exqalibur as xq
 import numpy as np
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 
 class _Path:
     """A `Path` is the minimal computing graph for covering a set of input states"""
 
     def __init__(self, n, m, states, targets, backend):
-        self._n = n
-        self._m = m
-        self._backend = backend
-        self.coefs = Matrix.zeros((backend._mk_l[n], 1), use_symbolic=self._backend._symb)
-        if n == 0:
-            self.coefs.fill(1)
-
+        self._setup(n, m, backend)
         if targets is None:
             targets = [list(state) for state in states]
         self._targets = []
         self._states = []
-        self._children = {}
         for t, s in zip(targets, states):
             if sum(t) == 0:
                 backend._state_mapping[s] = self
@@ -59,6 +55,51 @@ class _Path:
                 self._states.append(s)
         self._decompose()
 
+    def _setup(self, n, m, backend):
+        self._n = n
+        self._m = m
+        self._backend = backend
+        self.coefs = Matrix.zeros((backend._mk_l[n], 1), use_symbolic=self._backend._symb)
+        if n == 0:
+            self.coefs.fill(1)
+        self._children = {}
+
+    def to_tree(self, states: List[BasicState]) -> np.ndarray:
+        r"""Serialize the path tree and the mapping of `states` to its nodes in a flat int32 array:
+        [node count, state count, parent index of each node, mode of each node, node index of each state]
+        (nodes are listed in pre-order, the root having -1 as parent and mode)"""
+        parents = []
+        modes = []
+        node_index = {}
+        to_visit = [(self, -1, -1)]
+        while to_visit:
+            node, parent, mode = to_visit.pop()
+            node_index[id(node)] = len(parents)
+            parents.append(parent)
+            modes.append(mode)
+            to_visit += [(child, node_index[id(node)], mk) for mk, child in reversed(node._children.items())]
+        state_nodes = [node_index[id(self._backend._state_mapping[s])] for s in states]
+        return np.array([len(parents), len(state_nodes)] + parents + modes + state_nodes, dtype=np.int32)
+
+    @staticmethod
+    def from_tree(tree: np.ndarray, states: List[BasicState], m: int, backend) -> '_Path':
+        r"""Rebuild a path tree serialized by `to_tree`, without decomposing the input states again"""
+        node_count, state_count = int(tree[0]), int(tree[1])
+        parents = tree[2:2 + node_count].tolist()
+        modes = tree[2 + node_count:2 + 2 * node_count].tolist()
+        nodes = []
+        for parent, mode in zip(parents, modes):
+            node = _Path.__new__(_Path)
+            if parent < 0:
+                node._setup(0, m, backend)
+            else:
+                node._setup(nodes[parent]._n + 1, m, backend)
+                nodes[parent]._children[mode] = node
+            nodes.append(node)
+        for state, idx in zip(states, tree[2 + 2 * node_count:2 + 2 * node_count + state_count].tolist()):
+            backend._state_mapping[state] = nodes[idx]
+        return nodes[0]
+
     def _decompose(self):
         targets = self._targets
         states = self._states
@@ -102,6 +143,20 @@ class _Path:
         for mk, child in self._children.items():
             child.compute(u, self.coefs, mk)
 
+    def compute_batch(self, unitaries: np.ndarray, parent_coefs: np.ndarray = None, mk: int = None):
+        r"""Same as `compute` for a stack of K unitaries: coefficients are stored in `batch_coefs`, a (m_k x K)
+        array"""
+        if parent_coefs is None:
+            self.batch_coefs = np.ones((self._backend._mk_l[self._n], len(unitaries)), dtype=complex)
+        else:
+            self.batch_coefs = np.zeros((self._backend._mk_l[self._n], len(unitaries)), dtype=complex)
+            for j, (parent_idx, child_idx) in enumerate(self._backend._layer_transfers(self._n)):
+                # A photon coming from input mode mk is added in mode j; each child is reached at most once per mode
+                self.batch_coefs[child_idx] += parent_coefs[parent_idx] * unitaries[:, j, mk]
+
+        for mk, child in self._children.items():
+            child.compute_batch(unitaries, self.batch_coefs, mk)
+
 
 class SLOSBackend(AProbAmpliBackend):
     def __init__(self, mask=None, n=None, use_symbolic=False):
@@ -111,6 +166,22 @@ class SLOSBackend(AProbAmpliBackend):
         self._mask_str = mask
         self._n = n
         self._mask = None
+        self._path_cache: Optional[SLOSPathCache] = None
+
+    def set_path_cache(self, cache: Optional[SLOSPathCache]):
+        r"""Use a persistent cache for the compute paths (and masked output states), shared across processes and runs
+
+        :param cache: the cache, or None to disable it
+        """
+        self._path_cache = cache
+
+    def __copy__(self):
+        # Computation caches are not shared, so that a copy can be used concurrently with the original backend
+        backend = SLOSBackend(self._mask_str, self._n, self._symb)
+        backend._path_cache = self._path_cache
+        if self._circuit is not None:
+            backend.set_circuit(self._circuit)
+        return backend
 
     @property
     def name(self) -> str:
@@ -119,6 +190,9 @@ class SLOSBackend(AProbAmpliBackend):
     def _reset(self):
         self._fsms = [[]]
         self._fsas = {}
+        self._fsa_states: Dict[int, BasicStateArray] = {}
+        self._fsa_prodnfacts: Dict[int, np.ndarray] = {}
+        self._transfers: Dict[int, List[Tuple[np.ndarray, np.ndarray]]] = {}
         self._mk_l: List[int] = [1]
         self._path_roots: List[_Path] = []
         self._state_mapping: Dict[BasicState, _Path] = {}
@@ -132,6 +206,8 @@ class SLOSBackend(AProbAmpliBackend):
         previous_circuit = self._circuit
         assert not circuit.requires_polarization, "Circuit must not contain polarized components"
         self._input_state = None
+        if self._track_circuit(circuit):
+            return  # Coefficients are up to date
         self._circuit = circuit
         self._umat = circuit.compute_unitary(use_symbolic=self._symb)
         if self._path_roots and previous_circuit.m == circuit.m:
@@ -152,19 +228,21 @@ class SLOSBackend(AProbAmpliBackend):
         # after calculation, we only need to keep fsa for input_state n
         # during calculation we need to keep current fsa and previous fsa
         m = self._circuit.m
-        current_fsa = xq.FSArray(m, 0) if len(self._fsas) == 0 else self._fsas[max(self._fsas.keys())]
+        # top_fsa is always the array of the highest photon count deployed so far, from which the next layers grow
+        top_fsa = xq.FSArray(m, 0) if len(self._fsas) == 0 else self._fsas[len(self._fsms) - 1]
         for input_state in input_list:
             n = input_state.n
-            if n < len(self._fsms) and n not in self._fsas:
-                # we are missing the intermediate states - let us retrieve/load it back
-                current_fsa = xq.FSArray(m, n, self._mask) if self._mask else xq.FSArray(m, n)
+            if n < len(self._fsms):
+                if n not in self._fsas:
+                    # we are missing the intermediate states - let us retrieve/load it back
+                    self._fsas[n] = xq.FSArray(m, n, self._mask) if self._mask else xq.FSArray(m, n)
+                continue
             for k in range(len(self._fsms), n + 1):
-                fsa_n_m1 = current_fsa
-                current_fsa = xq.FSArray(m, k, self._mask) if self._mask else xq.FSArray(m, k)
-                self._mk_l.append(current_fsa.count())
-                self._fsms.append(xq.FSMap(current_fsa, fsa_n_m1, True))
-            if n not in self._fsas:
-                self._fsas[n] = current_fsa
+                fsa_n_m1 = top_fsa
+                top_fsa = xq.FSArray(m, k, self._mask) if self._mask else xq.FSArray(m, k)
+                self._mk_l.append(top_fsa.count())
+                self._fsms.append(xq.FSMap(top_fsa, fsa_n_m1, True))
+            self._fsas[n] = top_fsa
 
     def preprocess(self, input_list: List[BasicState]) -> bool:
         # now check if we have a path for the input states
@@ -177,7 +255,17 @@ class SLOSBackend(AProbAmpliBackend):
             return False
 
         self._deploy(input_list)  # build the necessary fsa/fsms
-        new_path = _Path(0, self._circuit.m, input_list, None, self)
+        m = self._circuit.m
+        if self._path_cache is None:
+            new_path = _Path(0, m, input_list, None, self)
+        else:
+            key = SLOSPathCache.key("path", m, self._mask_str, self._n, [str(s) for s in input_list])
+            tree = self._path_cache.load(key)
+            if tree is None:
+                new_path = _Path(0, m, input_list, None, self)
+                self._path_cache.store(key, new_path.to_tree(input_list))
+            else:
+                new_path = _Path.from_tree(tree, input_list, m, self)
         new_path.compute(self._umat)
         self._path_roots.append(new_path)
         return True
@@ -190,30 +278,126 @@ class SLOSBackend(AProbAmpliBackend):
         non_normalized_result = self._state_mapping[self._input_state].coefs[output_idx, 0]
         return non_normalized_result * np.sqrt(output_state.prodnfact() / self._input_state.prodnfact())
 
-    def prob_distribution(self) -> BSDistribution:
+    def _output_states(self, n: int) -> BasicStateArray:
+        r"""Occupation matrix view of the output FSArray of n photons, computed once per (m, n, mask)"""
+        if n not in self._fsa_states:
+            if n not in self._fsas:
+                self._fsas[n] = xq.FSArray(self._circuit.m, n, self._mask) if self._mask \
+                    else xq.FSArray(self._circuit.m, n)
+            if self._mask is None or self._path_cache is None:
+                self._fsa_states[n] = BasicStateArray.from_fsarray(self._fsas[n], masked=self._mask is not None)
+            else:
+                # Masked Fock spaces are read state by state from the FSArray, which is worth caching
+                key = SLOSPathCache.key("states", self._circuit.m, n, self._mask_str, self._n)
+                occupations = self._path_cache.load(key)
+                if occupations is None:
+                    self._fsa_states[n] = BasicStateArray.from_fsarray(self._fsas[n], masked=True)
+                    self._path_cache.store(key, self._fsa_states[n].occupations)
+                else:
+                    self._fsa_states[n] = BasicStateArray(occupations)
+        return self._fsa_states[n]
+
+    def _output_prodnfacts(self, n: int) -> np.ndarray:
+        r"""prodnfact of every output state of n photons, computed once per (m, n, mask)"""
+        if n not in self._fsa_prodnfacts:
+            norm_coefs = np.ones(self._fsas[n].count(), dtype=complex)
+            self._fsas[n].norm_coefs(norm_coefs)  # Multiplies each coefficient by sqrt(prodnfact)
+            self._fsa_prodnfacts[n] = np.round(norm_coefs.real ** 2)
+        return self._fsa_prodnfacts[n]
+
+    def _layer_transfers(self, n: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        r"""For each mode j, the indexes of the states of n-1 photons to which a photon can be added in mode j, and the
+        indexes of the resulting states of n photons. This is the array equivalent of the FSMap of n photons."""
+        if n not in self._transfers:
+            parents = self._output_states(n - 1).occupations
+            children = self._output_states(n).occupations
+            child_keys = packed_keys_view(pack_occupations(children))
+            order = np.argsort(child_keys)
+            sorted_keys = child_keys[order]
+            transfers = []
+            for j in range(self._circuit.m):
+                targets = parents.astype(children.dtype)
+                targets[:, j] += 1
+                keys = packed_keys_view(pack_occupations(targets))
+                pos = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+                found = sorted_keys[pos] == keys  # A mask can exclude some of the targets
+                transfers.append((np.flatnonzero(found), order[pos[found]]))
+            self._transfers[n] = transfers
+        return self._transfers[n]
+
+    def batch_prob_vector(self, unitaries: np.ndarray, input_states: List[BasicState]) \
+            -> Dict[BasicState, Tuple[np.ndarray, BasicStateArray]]:
+        r"""Compute the output probabilities of several input states, for a stack of K unitaries of the circuit size
+        (e.g. a sweep over the circuit parameters), in a single pass over the precompiled compute paths.
+
+        The unitary of the current circuit is left untouched.
+
+        :param unitaries: a (K x m x m) array of unitary matrices
+        :param input_states: the input states
+        :return: a dictionary mapping each input state to a tuple (probabilities, output states), the probabilities
+            being a (K x output state count) array
+        """
+        unitaries = np.asarray(unitaries, dtype=complex)
+        m = self._circuit.m
+        assert unitaries.ndim == 3 and unitaries.shape[1:] == (m, m), f"Expected a stack of {m}x{m} unitaries"
+        assert not self._symb, "Batched computation does not support symbolic unitaries"
+        self.preprocess(input_states)
+        for path in self._path_roots:
+            path.compute_batch(unitaries)
+        result = {}
+        for state in input_states:
+            coefs = self._state_mapping[state].batch_coefs.T
+            probs = abs(coefs)**2 * self._output_prodnfacts(state.n) / state.prodnfact()
+            result[state] = (probs, self._output_states(state.n))
+        return result
+
+    def _coefs_vector(self) -> np.ndarray:
         istate = self._input_state
-        c = np.copy(self._state_mapping[istate].coefs).reshape(self._fsas[istate.n].count())
+        return np.copy(self._state_mapping[istate].coefs).reshape(self._fsas[istate.n].count())
+
+    def prob_vector(self) -> Tuple[np.ndarray, BasicStateArray]:
+        r"""Compute the output probabilities of the current input state, without building any output `BasicState`
+
+        :return: a tuple (probabilities, output states) where output states is a lazy `BasicStateArray` indexed the
+            same way as the probabilities
+        """
+        return self.all_prob(self._input_state), self._output_states(self._input_state.n)
+
+    def prob_distribution(self) -> BSDistribution:
+        probs = self.all_prob(self._input_state)
+        nonzero = probs > global_params['min_p']
         bsd = BSDistribution()
-        iprodnfact = istate.prodnfact()
-        for output_state, unnormed_pa in zip(allstate_iterator(self._input_state, self._mask), c):
-            bsd.add(output_state, (abs(unnormed_pa) ** 2) * output_state.prodnfact() / iprodnfact)
+        # Output states are generated by the FSArray itself, only for non-null probabilities
+        dict.update(bsd, zip(compress(self._fsas[self._input_state.n], nonzero), probs[nonzero].tolist()))
         return bsd
 
     def all_prob(self, input_state: BasicState):
         """SLOS specific signature, to enhance optimization in some computations"""
         self.set_input_state(input_state)
-        c = np.copy(self._state_mapping[self._input_state].coefs).reshape(self._fsas[self._input_state.n].count())
-        c = abs(c)**2 / self._input_state.prodnfact()
-        for idx, (output_state, _) in enumerate(zip(allstate_iterator(self._input_state, self._mask), c)):
-            c[idx] = c[idx] * output_state.prodnfact()
-        return c
+        c = self._coefs_vector()
+        return abs(c)**2 * self._output_prodnfacts(input_state.n) / input_state.prodnfact()
 
-    def evolve(self) -> StateVector:
+    def amplitude_vector(self) -> Tuple[np.ndarray, BasicStateArray]:
+        r"""Compute the output probability amplitudes of the current input state, without building any output
+        `BasicState`
+
+        :return: a tuple (amplitudes, output states) where output states is a lazy `BasicStateArray` indexed the
+            same way as the amplitudes
+        """
         istate = self._input_state
-        c = np.copy(self._state_mapping[istate].coefs).reshape(self._fsas[istate.n].count())
+        c = self._coefs_vector() * np.sqrt(self._output_prodnfacts(istate.n) / istate.prodnfact())
+        return c, self._output_states(istate.n)
+
+    def evolve(self) -> StateVector:
+        c, _ = self.amplitude_vector()
+        fsa = self._fsas[self._input_state.n]
         res = StateVector()
-        iprodnfact = istate.prodnfact()
-        for output_state, pa in zip(allstate_iterator(self._input_state, self._mask), c):
-            res[output_state] = pa * np.sqrt(output_state.prodnfact() / iprodnfact)
+        if self._symb:
+            for output_state, pa in zip(fsa, c):
+                res[output_state] = pa
+        else:
+            nonzero = abs(c) >= global_params["min_complex_component"]
+            for output_state, pa in zip(compress(fsa, nonzero), c[nonzero].tolist()):
+                res[output_state] = pa
         res.normalize()
         return res
@@ -0,0 +1,145 @@
+# MIT License
+#
+# Copyright (c) 2022 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# As a special exception, the copyright holders of exqalibur library give you
+# permission to combine exqalibur with code included in the standard release of
+# Perceval under the MIT license (or modified versions of such code). You may
+# copy and distribute such a combined system following the terms of the MIT
+# license for both exqalibur and Perceval. This exception for the usage of
+# exqalibur is limited to the python bindings used by Perceval.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import hashlib
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class SLOSPathCache:
+    r"""On-disk cache of the data structures SLOS builds before computing anything
+
+    Two kinds of entries are stored, each in its own `.npy` file which is memory-mapped when it is requested:
+
+    * compute path trees, keyed by (m, mask, input state list)
+    * output state occupation matrices of masked Fock spaces, keyed by (m, n, mask)
+
+    exqalibur FSArray and FSMap objects cannot be serialized; they are rebuilt by the backend, which is cheap compared
+    to the data cached here. When the total size of the cache exceeds `max_size`, the least recently used entries are
+    deleted.
+
+    :param directory: cache directory (created if needed). Can be shared by several processes.
+    :param max_size: size budget of the cache, in bytes
+    """
+
+    _EXTENSION = ".npy"
+
+    def __init__(self, directory: str, max_size: int = 1 << 28):
+        assert max_size > 0, "Cache size budget must be positive"
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._max_size = max_size
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def directory(self) -> str:
+        return self._directory
+
+    @staticmethod
+    def key(kind: str, *parts) -> str:
+        r"""Compute the entry name of a `kind` entry identified by `parts`"""
+        digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+        return f"{kind}_{digest}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._directory, key + self._EXTENSION)
+
+    def load(self, key: str) -> Optional[np.ndarray]:
+        r"""Memory-map an entry, or return None (a miss) if it is not in the cache"""
+        path = self._path(key)
+        try:
+            data = np.load(path, mmap_mode='r')
+            os.utime(path)  # Marks the entry as recently used
+        except (OSError, ValueError):
+            self._misses += 1
+            return None
+        self._hits += 1
+        return data
+
+    def store(self, key: str, data: np.ndarray):
+        r"""Write an entry, then evict the least recently used entries until the cache fits its size budget"""
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.ascontiguousarray(data))
+        os.replace(tmp_path, path)  # Readers never see a partially written entry
+        self._evict(keep=path)
+
+    def _entries(self) -> List[os.DirEntry]:
+        with os.scandir(self._directory) as it:
+            return [entry for entry in it if entry.is_file() and entry.name.endswith(self._EXTENSION)]
+
+    def _evict(self, keep: str = None):
+        entries = []
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+            except OSError:  # Deleted by another process
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(e[1] for e in entries)
+        for _, size, path in sorted(entries):
+            if total <= self._max_size:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                self._evictions += 1
+            except OSError:
+                pass
+            total -= size
+
+    @property
+    def size(self) -> int:
+        r"""Total size of the cache entries, in bytes"""
+        size = 0
+        for entry in self._entries():
+            try:
+                size += entry.stat().st_size
+            except OSError:
+                pass
+        return size
+
+    def clear(self):
+        r"""Delete all entries"""
+        for entry in self._entries():
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        r"""Hit, miss and eviction counts since the cache object creation, and the current cache size"""
+        return {'hits': self._hits, 'misses': self._misses, 'evictions': self._evictions, 'size': self.size}
@@ -28,7 +28,7 @@
 # SOFTWARE.
 
 from abc import ABC
-from typing import Dict, Union, List
+from typing import Dict, Union, List, Optional
 import sympy as sp
 import copy
 
@@ -64,6 +64,24 @@ class AParametrizedComponent(AComponent):
         super().__init__(m, name)
         self._params = {}
         self._vars = {}
+        self._structure_version = Parameter._new_version()
+
+    def _structure_changed(self):
+        """To be called when the component changes in any other way than through its parameter values"""
+        self._structure_version = Parameter._new_version()
+
+    @property
+    def version(self) -> Optional[int]:
+        """
+        Version of the component, which grows each time one of its parameters (or its structure) changes. None when
+        changes cannot be tracked (e.g. expression parameters).
+        """
+        version = self._structure_version
+        for p in self._params.values():
+            if p._is_expression:
+                return None
+            version = max(version, p._version)
+        return version
 
     @property
     def vars(self) -> Dict[str, Parameter]:
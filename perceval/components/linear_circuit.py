@@ -90,6 +90,30 @@ class ACircuit(AParametrizedComponent, ABC):
             return matrix_double(u)
         return u
 
+    def compute_unitary_derivatives(self) -> List[Tuple[Parameter, np.ndarray]]:
+        """Compute the derivatives of the numeric unitary matrix with respect to each variable parameter.
+
+        The default implementation uses finite differences, central ones except at the bounds of a parameter;
+        components override it with analytic formulas.
+
+        :return: a list of (parameter, derivative matrix)
+        """
+        step = 1e-6
+        stepped = copy.deepcopy(self)  # Parameters are stepped on a copy, the ones of this circuit are left untouched
+        derivatives = []
+        for p, stepped_p in zip(self.get_parameters(), stepped.get_parameters()):
+            value = float(p)
+            # Steps stay within the bounds, where they would be rejected or wrapped around (periodic parameters)
+            upper = value + step if p.max is None or value + step <= p.max else value
+            lower = value - step if p.min is None or value - step >= p.min else value
+            stepped_p.set_value(upper)
+            u_upper = np.asarray(stepped.compute_unitary(use_symbolic=False))
+            stepped_p.set_value(lower)
+            u_lower = np.asarray(stepped.compute_unitary(use_symbolic=False))
+            stepped_p.set_value(value)
+            derivatives.append((p, (u_upper - u_lower) / (upper - lower)))
+        return derivatives
+
     @property
     def requires_polarization(self):
         return self._supports_polarization
@@ -277,6 +301,87 @@ class ACircuit(AParametrizedComponent, ABC):
         pass
 
 
+class _CompiledUnitary:
+    """Numeric unitary of a circuit, recomputed incrementally when some of its components change.
+
+    The unitary of each component is kept along with its version, and the products of the first i components (prefixes)
+    and of the last N-i ones (suffixes) are cached. Components are applied as updates of the rows (resp. columns) of
+    their modes only, so that applying a 2-mode component costs O(m). When the parameters of some components change,
+    only the segment between the first and the last changed components is recomputed, then the unitary is
+    suffix @ (segment @ prefix).
+    """
+
+    def __init__(self, m: int, components: List):
+        self._m = m
+        self._components = list(components)
+        n = len(components)
+        self._ranges = [(r[0], r[-1] + 1) for r, _ in components]
+        self._versions = [None] * n
+        self._blocks = [None] * n
+        self._prefix = [None] * (n + 1)
+        self._prefix[0] = np.eye(m, dtype=complex)
+        self._suffix = [None] * (n + 1)
+        self._suffix[n] = np.eye(m, dtype=complex)
+        self._prefix_valid = 0  # prefix[i] is valid for any i <= _prefix_valid
+        self._suffix_valid = n  # suffix[i] is valid for any i >= _suffix_valid
+        self._u = None
+        self._last_version = None
+
+    def matches(self, components: List) -> bool:
+        return len(components) == len(self._components) and \
+            all(r == cr and c is cc for (r, c), (cr, cc) in zip(components, self._components))
+
+    def _update_blocks(self) -> List[int]:
+        changed = []
+        for idx, (_, c) in enumerate(self._components):
+            version = c.version
+            if version is None or version != self._versions[idx]:
+                self._versions[idx] = version
+                self._blocks[idx] = np.asarray(c.compute_unitary(use_symbolic=False))
+                changed.append(idx)
+        return changed
+
+    def _apply_rows(self, u: np.ndarray, idx: int) -> np.ndarray:
+        start, stop = self._ranges[idx]
+        res = u.copy()
+        res[start:stop] = self._blocks[idx] @ u[start:stop]
+        return res
+
+    def _apply_columns(self, u: np.ndarray, idx: int) -> np.ndarray:
+        start, stop = self._ranges[idx]
+        res = u.copy()
+        res[:, start:stop] = u[:, start:stop] @ self._blocks[idx]
+        return res
+
+    def compute(self) -> np.ndarray:
+        if self._last_version == Parameter.last_version():
+            return self._u  # No change at all since the last computation
+        changed = self._update_blocks()
+        if None not in self._versions:
+            self._last_version = Parameter.last_version()
+        if not changed:
+            return self._u
+        first, last = changed[0], changed[-1]
+        # Partial products containing a changed component are not valid anymore
+        self._prefix_valid = min(self._prefix_valid, first)
+        self._suffix_valid = max(self._suffix_valid, last + 1)
+        # Extend the valid prefix and suffix up to the changed segment...
+        for idx in range(self._prefix_valid, first):
+            self._prefix[idx + 1] = self._apply_rows(self._prefix[idx], idx)
+        for idx in range(self._suffix_valid - 1, last, -1):
+            self._suffix[idx] = self._apply_columns(self._suffix[idx + 1], idx)
+        self._suffix_valid = last + 1
+        # ...then recompute the segment
+        for idx in range(first, last + 1):
+            self._prefix[idx + 1] = self._apply_rows(self._prefix[idx], idx)
+        self._prefix_valid = last + 1
+        if last + 1 == len(self._components):
+            self._u = self._prefix[last + 1]
+        else:
+            self._u = self._suffix[last + 1] @ self._prefix[last + 1]
+        return self._u
+
+
 class Circuit(ACircuit):
     """Class to represent any circuit composed of one or multiple components
 
@@ -290,10 +395,21 @@ class Circuit(ACircuit):
         assert m > 0, "invalid size"
         super().__init__(m, name)
         self._components = []
+        self._compiled_unitary: Optional[_CompiledUnitary] = None
 
     def is_composite(self):
         return True
 
+    @property
+    def version(self) -> Optional[int]:
+        version = self._structure_version
+        for _, c in self._components:
+            c_version = c.version
+            if c_version is None:
+                return None
+            version = max(version, c_version)
+        return version
+
     def __iter__(self):
         """
         Iterator on a circuit, recursively returns components applying in circuit order
@@ -406,6 +522,7 @@ class Circuit(ACircuit):
                 self._components.append((nprange, sc))
         else:
             self._components.append((port_range, component))
+        self._structure_changed()
         return self
 
     def _compute_unitary(self,
@@ -417,6 +534,10 @@ class Circuit(ACircuit):
                                  use_symbolic: bool,
                                  use_polarization: bool) -> Matrix:
         """compute the unitary matrix corresponding to the current circuit"""
+        if not use_symbolic and not use_polarization and self._components:
+            if self._compiled_unitary is None or not self._compiled_unitary.matches(self._components):
+                self._compiled_unitary = _CompiledUnitary(self._m, self._components)
+            return MatrixN(self._compiled_unitary.compute())
         u = None
         multiplier = 2 if use_polarization else 1
         for r, c in self._components:
@@ -449,6 +570,7 @@ class Circuit(ACircuit):
                 component.inverse(v=v, h=h)
             _new_components.append((range, component))
         self._components = _new_components
+        self._structure_changed()
 
     def compute_unitary(self,
                         use_symbolic: bool = False,
@@ -546,7 +668,8 @@ class Circuit(ACircuit):
                       precision: float = 1e-6,
                       max_try: int = 10,
                       allow_error: bool = False,
-                      ignore_identity_block: bool = True):
+                      ignore_identity_block: bool = True,
+                      n_workers: int = 1):
         r"""Decompose a given unitary matrix U into a circuit with a specified component type
 
         :param U: the matrix to decompose
@@ -565,6 +688,8 @@ class Circuit(ACircuit):
         :param allow_error: allow decomposition error - when the actual solution is not locally reachable
         :param ignore_identity_block: If true, do not insert a component when it's not needed (component is an identity)
                                       Otherwise, insert a component everytime (default True).
+        :param n_workers: if greater than 1, the `max_try` trials are run in a pool of `n_workers` processes, and
+                          stopped at the first success
         :return: a circuit
         """
         if not Matrix(U).is_unitary() or Matrix(U).is_symbolic():
@@ -580,23 +705,25 @@ class Circuit(ACircuit):
             for constraint in constraints:
                 assert isinstance(constraint, (list, tuple)) and len(constraint) == len(component.get_parameters()),\
                     "there should as many component in each constraint than free parameters in the component"
-        while count < max_try:
-            if shape == "triangle":
-                lc = decomposition.decompose_triangle(U, component, phase_shifter_fn, permutation, precision,
-                                                      constraints, allow_error=allow_error,
-                                                      ignore_identity_block=ignore_identity_block)
-            else:
-                lc = decomposition.decompose_rectangle(U, component, phase_shifter_fn, permutation, precision,
-                                                       constraints, allow_error=allow_error,
-                                                       ignore_identity_block=ignore_identity_block)
-            if lc is not None:
-                C = Circuit(N)
-                for range, component in lc:
-                    C.add(range, component, merge=merge)
-                if inverse_v or inverse_h:
-                    C.inverse(v=inverse_v, h=inverse_h)
-                return C
-            count += 1
+        decompose_fn = decomposition.decompose_triangle if shape == "triangle" \
+            else decomposition.decompose_rectangle
+        decompose_args = (U, component, phase_shifter_fn, permutation, precision, constraints)
+        decompose_kwargs = {"allow_error": allow_error, "ignore_identity_block": ignore_identity_block}
+        if n_workers > 1:
+            lc = decomposition.decompose_parallel(decompose_fn, max_try, n_workers, *decompose_args,
+                                                  **decompose_kwargs)
+        else:
+            lc = None
+            while lc is None and count < max_try:
+                lc = decompose_fn(*decompose_args, **decompose_kwargs)
+                count += 1
+        if lc is not None:
+            C = Circuit(N)
+            for range, component in lc:
+                C.add(range, component, merge=merge)
+            if inverse_v or inverse_h:
+                C.inverse(v=inverse_v, h=inverse_h)
+            return C
 
         return None
 
@@ -685,6 +812,7 @@ class Circuit(ACircuit):
             else:
                 nlc.append((r, c))
         self._components = nlc
+        self._structure_changed()
         return pidx
 
     def replace(self, p: int, pattern: ACircuit, merge: bool = False):
@@ -699,6 +827,7 @@ class Circuit(ACircuit):
             else:
                 nlc.append((r, c))
         self._components = nlc
+        self._structure_changed()
 
     def _check_brother_node(self, p0, p1):
         r"""check that component at p0 is a brother node than component at p1 - p0 < p1
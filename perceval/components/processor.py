@@ -26,17 +26,43 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 from numpy import Inf
 
 from .abstract_processor import AProcessor, ProcessorType
 from .port import LogicalState
 from .source import Source
 from .linear_circuit import ACircuit
-from perceval.utils import SVDistribution, BSDistribution, BSSamples, BasicState, StateVector
-from perceval.backends import ABackend, ASamplingBackend, BACKEND_LIST
+from perceval.utils import SVDistribution, BSDistribution, BSSamples, BasicState, StateVector, CompactBSDistribution, \
+    PostSelect, BasicStateArray
+from perceval.backends import ABackend, ASamplingBackend, SLOSBackend, BACKEND_LIST
 
+from collections import defaultdict
 from multipledispatch import dispatch
-from typing import Dict, Callable, Union, List
+from typing import Dict, Callable, Union, List, Optional, Iterator
+
+
+_sampling_processor = None
+_sampling_inputs = None
+
+
+def _init_sampling_worker(processor, input_svd: SVDistribution):
+    global _sampling_processor, _sampling_inputs
+    _sampling_processor = processor
+    _sampling_inputs = input_svd
+    _sampling_processor.backend.set_circuit(_sampling_processor.linear_circuit())
+
+
+def _sample_shots_worker(count: int, seed: np.random.SeedSequence):
+    py_seed, np_seed = seed.generate_state(2)
+    random.seed(int(py_seed))
+    np.random.seed(np_seed)
+    output, not_selected, not_selected_physical = _sampling_processor._sample_shots(_sampling_inputs, count)
+    # Basic states cannot be pickled, they are sent back as strings
+    return [str(state) for state in output], not_selected, not_selected_physical
 
 
 class Processor(AProcessor):
@@ -55,6 +81,9 @@ class Processor(AProcessor):
 
     :param source: the Source used by the processor (defaults to perfect source)
     """
+    _SAMPLING_CHUNK_SIZE = 4096  # Shots drawn between two progress updates (and cancellation checks)
+    _PARALLEL_CHUNK_SIZE = 1024  # Shots sampled by a worker process with the same random streams
+
     def __init__(self, backend: Union[ABackend, str], m_circuit: Union[int, ACircuit] = None, source: Source = Source(),
                  name: str = None):
         super().__init__()
@@ -74,6 +103,9 @@ class Processor(AProcessor):
         else:
             self.backend = backend
         self._simulator = None
+        self._compact_output: bool = False
+        self._workers: int = 1
+        self._random_seed: Optional[int] = None
 
     def type(self) -> ProcessorType:
         return ProcessorType.SIMULATOR
@@ -159,6 +191,20 @@ class Processor(AProcessor):
         if 'min_detected_photons' in self._parameters:
             self._min_detected_photons = self._parameters['min_detected_photons']
 
+    def compact_output(self, value: bool):
+        r"""
+        Compute probs results as a CompactBSDistribution (array-backed) instead of a BSDistribution. Both expose the
+        same mapping API, but the compact one handles output distributions of millions of states.
+
+        :param value: enables the compact output when True, otherwise disables it.
+        """
+        self._compact_output = value
+        self._simulator = None
+
+    @property
+    def is_compact_output(self) -> bool:
+        return self._compact_output
+
     def _circuit_changed(self):
         # Override parent's method to reset the internal simulator as soon as the component list changes
         self._simulator = None
@@ -188,8 +234,20 @@ class Processor(AProcessor):
             return modes_with_photons >= self._min_detected_photons
         return output_state.n >= self._min_detected_photons
 
-    def samples(self, count: int, progress_callback=None) -> Dict:
-        assert isinstance(self.backend, ASamplingBackend), "A sampling backend is required to call samples method"
+    def set_parallel_workers(self, workers: int, random_seed: Optional[int] = None):
+        r"""
+        Run `samples` on several worker processes. Shots are split into chunks, each chunk being sampled with its own
+        random streams, all derived from a single seed. Results only depend on this seed, not on the worker count.
+
+        :param workers: number of worker processes (1 for a serial execution)
+        :param random_seed: seed from which the random streams of the chunks are derived. If None, it is drawn from
+            NumPy global random generator (see `perceval.random_seed`)
+        """
+        assert isinstance(workers, int) and workers >= 1, "Worker count must be a positive integer"
+        self._workers = workers
+        self._random_seed = random_seed
+
+    def _sampling_input_distribution(self):
         pre_physical_perf = 1
         # Rework input map so that it contains only states with enough photons
         input_svd = SVDistribution()
@@ -200,52 +258,145 @@ class Processor(AProcessor):
                 input_svd[sv] = p
             else:
                 pre_physical_perf -= p
+        return input_svd, pre_physical_perf
 
+    def samples(self, count: int, progress_callback=None) -> Dict:
+        assert isinstance(self.backend, ASamplingBackend), "A sampling backend is required to call samples method"
+        input_svd, pre_physical_perf = self._sampling_input_distribution()
+
+        if self._workers > 1:
+            output, not_selected, not_selected_physical = self._parallel_samples(input_svd, count, progress_callback)
+        else:
+            self.backend.set_circuit(self.linear_circuit())
+            output, not_selected, not_selected_physical = self._sample_shots(input_svd, count, progress_callback)
+
+        physical_perf = pre_physical_perf * (count + not_selected) / (count + not_selected + not_selected_physical)
+        logical_perf = count / (count + not_selected)
+        return {'results': output, 'physical_perf': physical_perf, 'logical_perf': logical_perf}
+
+    def samples_iterator(self, count: int = None, chunk_size: int = 10000,
+                         progress_callback: Callable = None) -> Iterator[Dict]:
+        r"""
+        Sample output states chunk by chunk, so that the memory footprint does not depend on the total shot count.
+
+        Each chunk is a dictionary containing the `chunk_size` samples (or less, for the last chunk) as a
+        `BasicStateArray` in its 'results' key, and the physical and logical performances measured while sampling it.
+
+        Chunks are sampled in the calling process: the worker count set by `set_parallel_workers` is not used.
+
+        :param count: total number of samples, the iterator never ends if None
+        :param chunk_size: number of samples per chunk
+        :param progress_callback: called before yielding each chunk, only if `count` is given
+        """
+        assert isinstance(self.backend, ASamplingBackend), "A sampling backend is required to call samples method"
+        assert chunk_size > 0, "Chunk size must be a positive integer"
+        input_svd, pre_physical_perf = self._sampling_input_distribution()
         self.backend.set_circuit(self.linear_circuit())
+        output_m = self.circuit_size - len(self.heralds)  # Heralded modes are removed by the post-processing
+        done = 0
+        while count is None or done < count:
+            size = chunk_size if count is None else min(chunk_size, count - done)
+            output, not_selected, not_selected_physical = self._sample_shots(input_svd, size)
+            done += size
+            if progress_callback and count:
+                progress_callback(done / count, "sampling")
+            yield {'results': BasicStateArray.from_states(output, output_m),
+                   'physical_perf': pre_physical_perf * (size + not_selected) /
+                                    (size + not_selected + not_selected_physical),
+                   'logical_perf': size / (size + not_selected)}
+
+    def _sample_shots(self, input_svd: SVDistribution, count: int, progress_callback: Callable = None):
         output = BSSamples()
-        selected_inputs = []
-        idx = 0
         not_selected_physical = 0
         not_selected = 0
+        selection_cache = {}
         while len(output) < count:
-            if idx == len(selected_inputs):
-                idx = 0
-                selected_inputs = input_svd.sample(count)
-            selected_bs = selected_inputs[idx][0]
-            idx += 1
-
-            # Sampling
-            if selected_bs.has_annotations:  # In case of annotations, input must be separately sampled, then recombined
-                bs_list = selected_bs.separate_state()
-                sampled_components = []
-                for bs in bs_list:
-                    self.backend.set_input_state(bs)
-                    sampled_components.append(self.backend.sample())
-                sampled_state = sampled_components.pop()
-                for component in sampled_components:
-                    sampled_state = sampled_state.merge(component)
-            else:
-                self.backend.set_input_state(selected_bs)
-                sampled_state = self.backend.sample()
-
-            # Post-processing
-            if not self._state_selected_physical(sampled_state):
-                not_selected_physical += 1
-                continue
-            if self._state_selected(sampled_state):
-                output.append(self.postprocess_output(sampled_state))
-            else:
-                not_selected += 1
+            selected_inputs = input_svd.sample(min(count - len(output), self._SAMPLING_CHUNK_SIZE))
+            for sampled_state in self._sample_inputs(selected_inputs):
+                # Post-processing
+                if sampled_state not in selection_cache:
+                    selection_cache[sampled_state] = (self._state_selected_physical(sampled_state),
+                                                      self._state_selected(sampled_state),
+                                                      self.postprocess_output(sampled_state))
+                selected_physical, selected, output_state = selection_cache[sampled_state]
+                if not selected_physical:
+                    not_selected_physical += 1
+                elif selected:
+                    output.append(output_state)
+                else:
+                    not_selected += 1
 
             # Progress handling
             if progress_callback:
                 exec_request = progress_callback(len(output)/count, "sampling")
                 if exec_request is not None and 'cancel_requested' in exec_request and exec_request['cancel_requested']:
                     break
-
-        physical_perf = pre_physical_perf * (count + not_selected) / (count + not_selected + not_selected_physical)
-        logical_perf = count / (count + not_selected)
-        return {'results': output, 'physical_perf': physical_perf, 'logical_perf': logical_perf}
+        return output, not_selected, not_selected_physical
+
+    def _parallel_samples(self, input_svd: SVDistribution, count: int, progress_callback: Callable = None):
+        # Shots are split into fixed size chunks, each one sampled with its own random streams derived from the random
+        # seed, and results are merged in the chunk order, so that they only depend on the seed
+        chunk_size = self._PARALLEL_CHUNK_SIZE
+        chunk_sizes = [min(chunk_size, count - start) for start in range(0, count, chunk_size)]
+        chunk_count = len(chunk_sizes)
+        seed = self._random_seed if self._random_seed is not None else np.random.randint(2**31)
+        seeds = np.random.SeedSequence(seed).spawn(chunk_count)
+        output = BSSamples()
+        not_selected_physical = 0
+        not_selected = 0
+        states = {}
+        executor = ProcessPoolExecutor(self._workers, initializer=_init_sampling_worker, initargs=(self, input_svd))
+        futures = [executor.submit(_sample_shots_worker, size, chunk_seed)
+                   for size, chunk_seed in zip(chunk_sizes, seeds)]
+        try:
+            for future in futures:
+                chunk_output, chunk_not_selected, chunk_not_selected_physical = future.result()
+                for state in chunk_output:
+                    if state not in states:
+                        states[state] = BasicState(state)
+                    output.append(states[state])
+                not_selected += chunk_not_selected
+                not_selected_physical += chunk_not_selected_physical
+
+                # Progress handling
+                if progress_callback:
+                    exec_request = progress_callback(len(output)/count, "sampling")
+                    if exec_request is not None and 'cancel_requested' in exec_request \
+                            and exec_request['cancel_requested']:
+                        break
+        finally:
+            # On cancellation, chunks which have not started are dropped, and the ones being sampled end in the
+            # background instead of being waited for
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+        return output, not_selected, not_selected_physical
+
+    def _sample_inputs(self, selected_inputs: List[StateVector]) -> List[BasicState]:
+        r"""Sample one output state for each of the selected input states
+
+        Shots are grouped by input state, so that the backend samples all the shots of a given input state at once.
+        The output states are returned in the order of the input states.
+        """
+        shots_per_input = defaultdict(list)
+        for idx, sv in enumerate(selected_inputs):
+            shots_per_input[sv[0]].append(idx)
+        res = [None] * len(selected_inputs)
+        for selected_bs, indexes in shots_per_input.items():
+            if selected_bs.has_annotations:
+                # In case of annotations, input must be separately sampled, then recombined
+                occupations = 0
+                for bs in selected_bs.separate_state():
+                    self.backend.set_input_state(bs)
+                    occupations = occupations + self.backend.sample_many(len(indexes))
+            else:
+                self.backend.set_input_state(selected_bs)
+                occupations = self.backend.sample_many(len(indexes))
+            unique_occupations, inverse = np.unique(occupations, axis=0, return_inverse=True)
+            states = [BasicState(row) for row in unique_occupations.tolist()]
+            for idx, state_idx in zip(indexes, inverse.ravel()):
+                res[idx] = states[state_idx]
+        return res
 
     def probs(self, progress_callback: Callable = None) -> Dict:
         # assert self._inputs_map is not None, "Input is missing, please call with_inputs()"
@@ -253,6 +404,46 @@ class Processor(AProcessor):
             from perceval.simulators import SimulatorFactory  # Avoids a circular import
             self._simulator = SimulatorFactory.build(self)
         res = self._simulator.probs_svd(self._inputs_map, progress_callback=progress_callback)
+        return self._postprocess_probs(res)
+
+    def probs_sweep(self, circuit_params_list: List[Dict[str, float]], progress_callback: Callable = None) -> List[Dict]:
+        r"""
+        Compute probs for a list of circuit parameter values. With a SLOS backend and a unitary, non-polarized
+        processor, all the unitaries are computed by the backend in a single pass. Parameters keep the last values of
+        the list.
+
+        :param circuit_params_list: a list of {parameter name: value} dictionaries
+        :return: the list of probs results, in the same order
+        """
+        parameters = self.get_circuit_parameters()
+        # Polarized circuits are simulated by a PolarizationSimulator, which does not support batched unitaries
+        if not self._is_unitary or not isinstance(self.backend, SLOSBackend) \
+                or self.linear_circuit().requires_polarization:
+            results = []
+            for idx, circuit_params in enumerate(circuit_params_list):
+                for name, value in circuit_params.items():
+                    parameters[name].set_value(value)
+                self._circuit_changed()
+                results.append(self.probs())
+                if progress_callback is not None:
+                    progress_callback((idx + 1) / len(circuit_params_list), 'probs')
+            return results
+
+        unitaries = []
+        for circuit_params in circuit_params_list:
+            for name, value in circuit_params.items():
+                parameters[name].set_value(value)
+            unitaries.append(np.asarray(self.linear_circuit().compute_unitary(use_symbolic=False)))
+        if self._simulator is None:
+            from perceval.simulators import SimulatorFactory  # Avoids a circular import
+            self._simulator = SimulatorFactory.build(self)
+        results = self._simulator.probs_svd_batch(self._inputs_map, np.array(unitaries), progress_callback)
+        self._circuit_changed()  # The simulator circuit does not match the current parameter values anymore
+        return [self._postprocess_probs(res) for res in results]
+
+    def _postprocess_probs(self, res: Dict) -> Dict:
+        if isinstance(res['results'], CompactBSDistribution):
+            return self._postprocess_compact_probs(res)
         lperf = 1
         pperf = 1
         postprocessed_res = BSDistribution()
@@ -270,6 +461,35 @@ class Processor(AProcessor):
         res['results'] = postprocessed_res
         return res
 
+    def _postprocess_compact_probs(self, res: Dict) -> Dict:
+        # Vectorized version of the post-processing of probs, using the occupation matrix of the output states
+        dist = res['results']
+        occupations = dist.state_array.occupations
+        probs = dist.value_array
+        photon_count = (occupations > 0).sum(axis=1) if self.is_threshold else occupations.sum(axis=1)
+        physical = photon_count >= self._min_detected_photons
+        logical = physical.copy()
+        for mode, expected in self.heralds.items():
+            logical &= occupations[:, mode] == expected
+        if isinstance(self._postselect, PostSelect):
+            logical &= self._postselect.select(occupations)
+        elif self._postselect is not None:  # Deprecated free post-processing function
+            logical &= np.fromiter(map(self._postselect, dist.state_array), dtype=bool, count=len(probs))
+        pperf = 1 - probs[~physical].sum()
+        lperf = 1 - probs[physical & ~logical].sum()
+        occupations = occupations[logical]
+        if self.heralds:
+            occupations = np.delete(occupations, list(self.heralds.keys()), axis=1)
+        if self.is_threshold:
+            occupations = np.minimum(occupations, 1)
+        postprocessed_res = CompactBSDistribution()
+        postprocessed_res.accumulate(CompactBSDistribution(occupations, probs[logical]))  # Merges duplicated states
+        postprocessed_res.normalize()
+        res['logical_perf'] = res['logical_perf']*lperf if 'logical_perf' in res else lperf
+        res['physical_perf'] = res['physical_perf']*pperf if 'physical_perf' in res else pperf
+        res['results'] = postprocessed_res
+        return res
+
     @property
     def available_commands(self) -> List[str]:
         return ["samples" if self.backend.preferred_command() == "sample" else "probs"]
@@ -28,6 +28,7 @@
 # SOFTWARE.
 from copy import copy
 from enum import Enum
+from typing import List, Tuple
 
 import numpy as np
 import sympy as sp
@@ -125,6 +126,26 @@ class BS(ACircuit):
         umat[1, 0] *= u10_mul*sin_theta
         return umat
 
+    # Entries of the unitary depending on each phase parameter
+    _PHASE_MASKS = {"phi_tl": np.array([[1, 0], [1, 0]]), "phi_tr": np.array([[1, 1], [0, 0]]),
+                    "phi_bl": np.array([[0, 1], [0, 1]]), "phi_br": np.array([[0, 0], [1, 1]])}
+
+    def compute_unitary_derivatives(self) -> List[Tuple[Parameter, np.ndarray]]:
+        u = np.asarray(self.compute_unitary(use_symbolic=False))
+        derivatives = []
+        for name, p in self._params.items():
+            if p.fixed:
+                continue
+            if name == "theta":
+                phases = sum(float(self._params[phi]) * mask for phi, mask in self._PHASE_MASKS.items())
+                cos_theta = np.cos(float(self._theta) / 2)
+                sin_theta = np.sin(float(self._theta) / 2)
+                d_amplitudes = np.array([[-sin_theta, cos_theta], [cos_theta, -sin_theta]]) / 2
+                derivatives.append((p, np.asarray(self._matrix_template(False)) * np.exp(1j * phases) * d_amplitudes))
+            else:
+                derivatives.append((p, 1j * u * self._PHASE_MASKS[name]))
+        return derivatives
+
     def _matrix_template(self, use_symbolic):
         if self._convention == BSConvention.Rx:
             if use_symbolic:
@@ -199,6 +220,11 @@ class PS(ACircuit):
         else:
             return Matrix([[np.cos(float(self._phi)) + 1j * np.sin(float(self._phi))]], False)
 
+    def compute_unitary_derivatives(self) -> List[Tuple[Parameter, np.ndarray]]:
+        if self._phi.fixed:
+            return []
+        return [(self._phi, 1j * np.asarray(self.compute_unitary(use_symbolic=False)))]
+
     def get_variables(self, map_param_kid=None):
         parameters = {}
         if map_param_kid is None:
@@ -353,6 +379,7 @@ class Unitary(ACircuit):
             self._u = np.flip(self._u)
         if h:
             self._u = self._u.inv()
+        self._structure_changed()
 
     def describe(self, _=None):
         params = [f"Matrix('''{self._u}''')"]
@@ -30,5 +30,8 @@
 from .job_status import JobStatus, RunningStatus
 from .job import Job
 from .local_job import LocalJob
+from .local_stream_job import LocalStreamJob
+from .job_group import JobGroup
 from .remote_job import RemoteJob
 from .remote_processor import RemoteProcessor
+from .rpc_handler import RPCHandler, AsyncRPCHandler
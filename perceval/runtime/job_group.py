@@ -0,0 +1,184 @@
+# MIT License
+#
+# Copyright (c) 2022 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# As a special exception, the copyright holders of exqalibur library give you
+# permission to combine exqalibur with code included in the standard release of
+# Perceval under the MIT license (or modified versions of such code). You may
+# copy and distribute such a combined system following the terms of the MIT
+# license for both exqalibur and Perceval. This exception for the usage of
+# exqalibur is limited to the python bindings used by Perceval.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .job import Job
+from .remote_job import RemoteJob
+
+
+class JobGroup:
+    r"""Group of started jobs (local or remote), polled together
+
+    On each refresh tick, the statuses of all the unfinished jobs of the group are refreshed at once: the cloud API has
+    no batched status request, so the requests of remote jobs are pipelined in a thread pool over the pooled
+    connections of their RPC handlers. As soon as a job succeeds, its results are fetched in the background.
+
+    >>> group = JobGroup([Sampler(processor).sample_count.execute_async(1000) for processor in processors])
+    >>> for job, results in group.as_completed():
+    ...     print(job.name, results)
+
+    :param jobs: the jobs, already started with `execute_async`
+    :param refresh_delay: delay between two refresh ticks, in seconds
+    :param max_workers: maximum number of status or result requests running at the same time
+    """
+
+    def __init__(self, jobs: Iterable[Job] = (), refresh_delay: float = 1, max_workers: int = 8):
+        self._jobs: List[Job] = []
+        self._done: List[bool] = []
+        self._results: Dict[int, Future] = {}
+        self._refresh_delay = refresh_delay
+        self._executor = ThreadPoolExecutor(max_workers)
+        for job in jobs:
+            self.add(job)
+
+    def add(self, job: Job):
+        self._jobs.append(job)
+        self._done.append(False)
+
+    @property
+    def jobs(self) -> List[Job]:
+        return list(self._jobs)
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def __iter__(self) -> Iterator[Job]:
+        return iter(self._jobs)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def refresh(self) -> List[Job]:
+        r"""Refresh the status of every unfinished job (one refresh tick)
+
+        :return: the jobs which completed during this tick
+        """
+        pending = [i for i, done in enumerate(self._done) if not done]
+        remote = [i for i in pending if isinstance(self._jobs[i], RemoteJob)]
+        # Remote status requests are sent concurrently, local statuses are read directly
+        statuses = dict(zip(remote, self._executor.map(lambda i: self._jobs[i].status, remote)))
+        completed = []
+        for i in pending:
+            status = statuses[i] if i in statuses else self._jobs[i].status
+            if status.completed:
+                self._done[i] = True
+                completed.append(self._jobs[i])
+                if status.success:
+                    self._results[i] = self._executor.submit(self._jobs[i].get_results)
+        return completed
+
+    def _index(self, job: Job) -> int:
+        for i, j in enumerate(self._jobs):
+            if j is job:
+                return i
+        raise ValueError("Job is not part of the group")
+
+    def result(self, job: Job) -> Any:
+        r"""Results of a completed job of the group, waiting for them to be fetched. None if the job failed or was
+        canceled."""
+        i = self._index(job)
+        assert self._done[i], "Job is not completed"
+        future = self._results.get(i)
+        return future.result() if future is not None else None
+
+    def _tick_until(self, condition, timeout: Optional[float]) -> bool:
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            self.refresh()
+            if condition():
+                return True
+            if deadline is not None and time.time() >= deadline:
+                return False
+            delay = self._refresh_delay if deadline is None else min(self._refresh_delay, deadline - time.time())
+            time.sleep(max(delay, 0))
+
+    def wait_any(self, timeout: Optional[float] = None) -> Optional[Job]:
+        r"""Wait until at least one job of the group is completed
+
+        :param timeout: maximum waiting time, in seconds (None waits forever)
+        :return: a completed job (the first one of the group), or None after the timeout
+        """
+        if not self._jobs:
+            return None
+        if self._tick_until(lambda: any(self._done), timeout):
+            return self._jobs[self._done.index(True)]
+        return None
+
+    def wait_all(self, timeout: Optional[float] = None) -> bool:
+        r"""Wait until all the jobs of the group are completed
+
+        :param timeout: maximum waiting time, in seconds (None waits forever)
+        :return: True if all the jobs are completed, False after the timeout
+        """
+        return self._tick_until(lambda: all(self._done), timeout)
+
+    def as_completed(self, timeout: Optional[float] = None) -> Iterator[Tuple[Job, Any]]:
+        r"""Yield the jobs as they complete, along with their results (None for failed or canceled jobs)
+
+        Jobs already completed are yielded first. Results are fetched concurrently, in the background, as soon as jobs
+        succeed.
+
+        :param timeout: maximum total waiting time, in seconds (None waits forever). `TimeoutError` is raised when it
+            is exceeded.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        yielded = set()
+        while len(yielded) < len(self._jobs):
+            self.refresh()
+            ready = [i for i, done in enumerate(self._done) if done and i not in yielded]
+            for i in ready:
+                yielded.add(i)
+                yield self._jobs[i], self.result(self._jobs[i])
+            if ready or len(yielded) == len(self._jobs):
+                continue
+            if deadline is not None and time.time() >= deadline:
+                raise TimeoutError(f"{len(self._jobs) - len(yielded)} jobs are not completed")
+            delay = self._refresh_delay if deadline is None else min(self._refresh_delay, deadline - time.time())
+            time.sleep(max(delay, 0))
+
+    def results(self, timeout: Optional[float] = None) -> List[Any]:
+        r"""Wait for all the jobs, and return their results in the group order (None for failed or canceled jobs)"""
+        if not self.wait_all(timeout):
+            raise TimeoutError(f"{self._done.count(False)} jobs are not completed")
+        return [self.result(job) for job in self._jobs]
+
+    def cancel_all(self):
+        r"""Cancel every unfinished job of the group"""
+        for i, job in enumerate(self._jobs):
+            if not self._done[i] and not job.is_complete:
+                job.cancel()
@@ -49,7 +49,7 @@ class LocalJob(Job):
     @property
     def status(self) -> JobStatus:
         # for local job
-        if self._status.running and not self._worker.is_alive():
+        if self._status.running and self._worker is not None and not self._worker.is_alive():
             self._status.stop_run()
         return self._status
 
@@ -0,0 +1,103 @@
+# MIT License
+#
+# Copyright (c) 2022 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# As a special exception, the copyright holders of exqalibur library give you
+# permission to combine exqalibur with code included in the standard release of
+# Perceval under the MIT license (or modified versions of such code). You may
+# copy and distribute such a combined system following the terms of the MIT
+# license for both exqalibur and Perceval. This exception for the usage of
+# exqalibur is limited to the python bindings used by Perceval.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+from typing import Any, Callable, Dict, Iterator
+
+from .local_job import LocalJob
+from .job_status import RunningStatus
+
+
+class LocalStreamJob(LocalJob):
+    r"""
+    Local job running a generator function, which yields results chunk by chunk. Chunks are dictionaries containing a
+    'results' key and performance values ('physical_perf', 'logical_perf').
+
+    Chunks are folded into the job results as soon as they are produced, and are not kept afterwards, so that memory
+    usage does not grow with the acquisition length. They can also be consumed directly with `iterate`.
+
+    :param fn: generator function
+    :param fold: function (accumulated results, chunk results) -> accumulated results. If None, chunk results are
+        dropped and only performance values are returned
+    :param init_results: function building the initial value of the accumulated results (None if not given)
+    """
+    def __init__(self, fn: Callable[..., Iterator[Dict]], fold: Callable[[Any, Any], Any] = None,
+                 init_results: Callable[[], Any] = None,
+                 delta_parameters=None):
+        super().__init__(self._consume, delta_parameters=delta_parameters)
+        self._stream_fn = fn
+        self._fold = fold
+        self._init_results = init_results
+
+    def _chunks(self, *args, **kwargs) -> Iterator[Dict]:
+        for chunk in self._stream_fn(*args, **kwargs):
+            yield chunk
+            if self._cancel_requested:
+                break
+
+    def _consume(self, *args, **kwargs) -> Dict:
+        accumulated = self._init_results() if self._init_results is not None else None
+        selected = 0
+        logical_weight = 0
+        physical_weight = 0
+        for chunk in self._chunks(*args, **kwargs):
+            if self._fold is not None:
+                accumulated = self._fold(accumulated, chunk['results'])
+            # Performances of the whole acquisition are weighted harmonic means of the chunk ones
+            chunk_selected = len(chunk['results'])
+            chunk_logical_count = chunk_selected / chunk['logical_perf']
+            selected += chunk_selected
+            logical_weight += chunk_logical_count
+            physical_weight += chunk_logical_count / chunk['physical_perf']
+        return {'results': accumulated,
+                'physical_perf': logical_weight / physical_weight if physical_weight else 1,
+                'logical_perf': selected / logical_weight if logical_weight else 1}
+
+    def iterate(self, *args, **kwargs) -> Iterator[Dict]:
+        r"""
+        Execute the job in the current thread, yielding the result chunks as they are produced. The job status is
+        updated along the way, and `cancel` stops the iteration after the current chunk.
+        """
+        assert self._status.waiting, "job has already been executed"
+        if 'progress_callback' not in kwargs:
+            kwargs['progress_callback'] = self._progress_cb
+        args, kwargs = self._adapt_parameters(args, kwargs)
+        self._status.start_run()
+        completed = False
+        try:
+            for chunk in self._chunks(*args, **kwargs):
+                yield chunk
+            completed = True
+        except Exception as e:
+            self._status.stop_run(RunningStatus.ERROR, str(type(e))+": "+str(e))
+            raise
+        finally:
+            if self._status.running:
+                if completed and not self._cancel_requested:
+                    self._status.stop_run()
+                else:
+                    self._status.stop_run(RunningStatus.CANCELED, "User has canceled the job")
@@ -28,12 +28,13 @@
 # SOFTWARE.
 import json
 import time
-from typing import Any
+from typing import Any, Callable, Iterator, Optional
 from requests.exceptions import HTTPError, ConnectionError
 
 from .job import Job
 from .job_status import JobStatus, RunningStatus
 from perceval.serialization import deserialize, serialize
+from perceval.serialization.lazy_deserialize import iter_json_object
 
 
 def _extract_job_times(response):
@@ -190,23 +191,73 @@ class RemoteJob(Job):
         else:
             raise RuntimeError('Job is not waiting or running, cannot cancel it')
 
-    def get_results(self) -> Any:
+    def _fetch_results(self) -> str:
         job_status = self.status
         if not job_status.completed:
             raise RuntimeError('The job is still running, results are not available yet.')
         if job_status.status == RunningStatus.ERROR:
             raise RuntimeError(f'The job failed: {job_status.stop_message}')
         response = self._rpc_handler.get_job_results(self._id)
-        results = deserialize(json.loads(response['results']))
-        if "job_context" in results and 'result_mapping' in results["job_context"]:
-            path_parts = results["job_context"]["result_mapping"]
-            module = __import__(path_parts[0], fromlist=path_parts[1])
-            result_mapping_function = getattr(module, path_parts[1])
-            # retrieve delta parameters from the response
-            self._delta_parameters = results["job_context"].get("mapping_delta_parameters", {})
-            if "results_list" in results:
-                for res in results["results_list"]:
-                    res["results"] = result_mapping_function(res["results"], **self._delta_parameters)
-            else:
-                results["results"] = result_mapping_function(results["results"], **self._delta_parameters)
+        return response['results']
+
+    def _result_mapping(self, job_context) -> Optional[Callable]:
+        if not job_context or 'result_mapping' not in job_context:
+            return None
+        path_parts = job_context["result_mapping"]
+        module = __import__(path_parts[0], fromlist=path_parts[1])
+        result_mapping_function = getattr(module, path_parts[1])
+        # retrieve delta parameters from the response
+        self._delta_parameters = job_context.get("mapping_delta_parameters", {})
+        return lambda results: result_mapping_function(results, **self._delta_parameters)
+
+    @staticmethod
+    def _map_results(results, mapping: Optional[Callable]):
+        if mapping is not None:
+            results["results"] = mapping(results["results"])
+        return results
+
+    def get_results(self, lazy: bool = False) -> Any:
+        r"""Retrieve and deserialize the results of the job
+
+        :param lazy: if True, dictionaries and lists of the results are returned as `LazyDict` and `LazyList`, whose
+            values are only deserialized when accessed, so that unused fields are never decoded
+        """
+        results = deserialize(json.loads(self._fetch_results()), lazy=lazy)
+        mapping = self._result_mapping(results.get("job_context"))
+        if "results_list" in results:
+            for res in results["results_list"]:
+                self._map_results(res, mapping)
+        else:
+            self._map_results(results, mapping)
         return results
+
+    def iter_results(self, lazy: bool = False) -> Iterator[dict]:
+        r"""Yield the results of each iteration of the job as soon as they are decoded, without waiting for the whole
+        response to be decoded. The results of a job without iterations are yielded as a single dictionary.
+
+        Iteration results are streamed when the job context precedes them in the response; otherwise they are
+        yielded once the job context is reached.
+
+        :param lazy: if True, results are yielded as `LazyDict`, see `get_results`
+        """
+        fields = {}
+        pending = []
+        has_iterations = False
+        for key, value in iter_json_object(self._fetch_results(), stream_key="results_list"):
+            if key != "results_list":
+                fields[key] = value
+                continue
+            has_iterations = True
+            if "job_context" in fields:
+                mapping = self._result_mapping(deserialize(fields["job_context"]))
+                for res in value:
+                    yield self._map_results(deserialize(res, lazy=lazy), mapping)
+            else:
+                pending = [deserialize(res, lazy=lazy) for res in value]
+        if not has_iterations:
+            results = deserialize(fields, lazy=lazy)
+            yield self._map_results(results, self._result_mapping(results.get("job_context")))
+            return
+        mapping = self._result_mapping(deserialize(fields.get("job_context")))
+        for res in pending:
+            yield self._map_results(res, mapping)
@@ -26,10 +26,20 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
+import asyncio
+import gzip
+import json
 import urllib
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, Iterable, Optional
 
 import requests
 from requests import HTTPError
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .job_status import RunningStatus
 
 _ENDPOINT_PLATFORM_DETAILS = '/api/platform/'
 _ENDPOINT_JOB_CREATE = '/api/job'
@@ -37,54 +47,100 @@ _ENDPOINT_JOB_STATUS = '/api/job/status/'
 _ENDPOINT_JOB_CANCEL = '/api/job/cancel/'
 _ENDPOINT_JOB_RESULT = '/api/job/result/'
 
+_RETRY_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+_FINAL_JOB_STATUSES = (RunningStatus.SUCCESS, RunningStatus.ERROR, RunningStatus.CANCELED, RunningStatus.UNKNOWN)
+
 
 class RPCHandler:
-    def __init__(self, name, url, token):
+    r"""Cloud API client
+
+    All calls share a pooled HTTP session, so that connections (and TLS handshakes) are reused across calls and jobs.
+    Connection errors are retried, as well as the responses of idempotent requests with a transient error status
+    (408, 429, 5xx), with an exponential backoff. Job creation requests are never resent once they reached the server.
+
+    :param name: platform name
+    :param url: cloud API URL
+    :param token: authentication token
+    :param retries: maximum number of retries of a request
+    :param backoff_factor: the n-th retry waits backoff_factor * 2^(n-1) seconds
+    :param pool_maxsize: number of connections kept alive, i.e. of requests which can run concurrently without opening
+        new connections
+    :param compress_requests: gzip the job creation payloads (the cloud API has to accept gzip request bodies).
+        Responses are always accepted gzipped.
+    :param timeout: timeout of each request, in seconds (None waits forever)
+    """
+
+    def __init__(self, name, url, token, retries: int = 3, backoff_factor: float = 0.5, pool_maxsize: int = 10,
+                 compress_requests: bool = False, timeout: float = None):
         self.name = name
         self.url = url
         self.token = token
         self.headers = {
-            'Authorization': f'Bearer {token}'
+            'Authorization': f'Bearer {token}',
+            'Accept-Encoding': 'gzip, deflate'
         }
+        self._compress_requests = compress_requests
+        self._timeout = timeout
+        self._session = requests.Session()
+        self._session.headers.update(self.headers)
+        retry = Retry(total=retries, backoff_factor=backoff_factor, status_forcelist=_RETRY_STATUS_CODES,
+                      raise_on_status=False)
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=1, pool_maxsize=pool_maxsize)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+
+    def close(self):
+        self._session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
     def build_endpoint(self, endpoint):
         return f"{self.url}{endpoint}"
 
     def fetch_platform_details(self):
         endpoint = f"{self.url}{_ENDPOINT_PLATFORM_DETAILS}{urllib.parse.quote_plus(self.name)}"
-        resp = requests.get(endpoint,
-                            headers=self.headers)
+        resp = self._session.get(endpoint, timeout=self._timeout)
         resp.raise_for_status()
         return resp.json()
 
     def create_job(self, payload):
         endpoint = f"{self.url}{_ENDPOINT_JOB_CREATE}"
-        request = requests.post(endpoint,
-                                headers=self.headers,
-                                json=payload)
+        if self._compress_requests:
+            request = self._session.post(endpoint,
+                                         data=gzip.compress(json.dumps(payload).encode('utf-8')),
+                                         headers={'Content-Type': 'application/json', 'Content-Encoding': 'gzip'},
+                                         timeout=self._timeout)
+        else:
+            request = self._session.post(endpoint,
+                                         json=payload,
+                                         timeout=self._timeout)
 
-        json = {}
+        jsonres = {}
         try:
             jsonres = request.json()
-        except:
+        except ValueError:
             pass
 
         if request.status_code != 200:
-            raise HTTPError(jsonres['error'])
+            raise HTTPError(jsonres.get('error', f'Job creation failed with status {request.status_code}'),
+                            response=request)
 
         return jsonres['job_id']
 
     def cancel_job(self, job_id: str):
         endpoint = f"{self.url}{_ENDPOINT_JOB_CANCEL}{str(job_id)}"
-        request = requests.post(endpoint,
-                                headers=self.headers)
+        request = self._session.post(endpoint, timeout=self._timeout)
         request.raise_for_status()
 
     def get_job_status(self, job_id: str):
         endpoint = self.build_endpoint(_ENDPOINT_JOB_STATUS) + str(job_id)
 
         # requests may throw an IO Exception, let the user deal with it
-        res = requests.get(endpoint, headers=self.headers)
+        res = self._session.get(endpoint, timeout=self._timeout)
         res.raise_for_status()
         return res.json()
 
@@ -92,6 +148,85 @@ class RPCHandler:
         endpoint = self.build_endpoint(_ENDPOINT_JOB_RESULT) + str(job_id)
 
         # requests may throw an IO Exception, let the user deal with it
-        res = requests.get(endpoint, headers=self.headers)
+        res = self._session.get(endpoint, timeout=self._timeout)
         res.raise_for_status()
         return res.json()
+
+
+class AsyncRPCHandler:
+    r"""asyncio variant of the cloud API client
+
+    Calls are coroutines running the requests of a pooled `RPCHandler` in a thread pool, so that many jobs can be
+    created and polled concurrently from a single event loop while sharing the same connections.
+
+    >>> async def run(handler, payloads):
+    ...     job_ids = await asyncio.gather(*[handler.create_job(p) for p in payloads])
+    ...     statuses = await handler.wait_for_jobs(job_ids)
+
+    :param name: platform name
+    :param url: cloud API URL
+    :param token: authentication token
+    :param max_concurrency: number of requests run at the same time (and of connections kept alive)
+    :param kwargs: other `RPCHandler` parameters (retries, backoff_factor, compress_requests, timeout)
+    """
+
+    def __init__(self, name, url, token, max_concurrency: int = 10, **kwargs):
+        self._handler = RPCHandler(name, url, token, pool_maxsize=max_concurrency, **kwargs)
+        self._executor = ThreadPoolExecutor(max_concurrency)
+
+    @property
+    def sync_handler(self) -> RPCHandler:
+        r"""The underlying synchronous handler, sharing the same connections (e.g. to build a `RemoteJob`)"""
+        return self._handler
+
+    @property
+    def name(self):
+        return self._handler.name
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self._handler.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    async def _call(self, method, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(method, *args))
+
+    async def fetch_platform_details(self):
+        return await self._call(self._handler.fetch_platform_details)
+
+    async def create_job(self, payload):
+        return await self._call(self._handler.create_job, payload)
+
+    async def cancel_job(self, job_id: str):
+        return await self._call(self._handler.cancel_job, job_id)
+
+    async def get_job_status(self, job_id: str):
+        return await self._call(self._handler.get_job_status, job_id)
+
+    async def get_job_results(self, job_id: str):
+        return await self._call(self._handler.get_job_results, job_id)
+
+    async def wait_for_jobs(self, job_ids: Iterable[str], poll_interval: float = 1,
+                            timeout: Optional[float] = None) -> Dict[str, dict]:
+        r"""Poll the status of several jobs concurrently until they are all completed, failed or canceled (or in a
+        status unknown to this client)
+
+        :param job_ids: the job ids
+        :param poll_interval: delay between two status requests of a job, in seconds
+        :param timeout: maximum waiting time for all the jobs, in seconds (None waits forever)
+        :return: the final status response of each job
+        :raises asyncio.TimeoutError: if the jobs are not all done after `timeout` seconds
+        """
+        async def wait(job_id):
+            while True:
+                status = await self.get_job_status(job_id)
+                if RunningStatus.from_server_response(status['status']) in _FINAL_JOB_STATUSES:
+                    return job_id, status
+                await asyncio.sleep(poll_interval)
+
+        return dict(await asyncio.wait_for(asyncio.gather(*[wait(job_id) for job_id in job_ids]), timeout))
@@ -30,5 +30,8 @@
 from .serialize import serialize, serialize_to_file
 from ._state_serialization import deserialize_state, deserialize_state_list
 from .deserialize import deserialize, deserialize_circuit, circuit_from_file, deserialize_matrix, matrix_from_file, \
-      deserialize_float, deserialize_file
+      deserialize_float, deserialize_file, register_deserializer
 from .serialize_binary import serialize_binary
+from ._columnar_serialization import deserialize_columnar
+from .result_store import ResultStore, save_result_store
+from .lazy_deserialize import LazyDict, LazyList, iter_json_object
@@ -0,0 +1,168 @@
+# MIT License
+#
+# Copyright (c) 2022 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# As a special exception, the copyright holders of exqalibur library give you
+# permission to combine exqalibur with code included in the standard release of
+# Perceval under the MIT license (or modified versions of such code). You may
+# copy and distribute such a combined system following the terms of the MIT
+# license for both exqalibur and Perceval. This exception for the usage of
+# exqalibur is limited to the python bindings used by Perceval.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Versioned binary columnar format of BSDistribution, BSCount and BSSamples.
+
+A payload starts with a fixed size header (little-endian):
+    magic (b"PCVC"), format version (uint8), kind (uint8), compression (uint8), occupation item size in bytes (uint8),
+    mode count (uint32), row count (uint64)
+followed by a body, compressed as a whole if required:
+    - BSDistribution: row count x m occupation matrix, then a float64 column of probabilities
+    - BSCount: row count x m occupation matrix, then an int64 column of counts
+    - BSSamples: row count x m occupation matrix of the distinct samples, then the sample count (uint64) and a column of
+      indexes in the distinct samples (uint8, uint16 or uint32, the smallest fitting the row count)
+"""
+
+import struct
+import zlib
+from typing import Optional, Union
+
+import numpy as np
+
+from perceval.utils import BasicStateArray, BSDistribution, BSCount, BSSamples
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+COLUMNAR_VERSION = 1
+_MAGIC = b"PCVC"
+_HEADER = struct.Struct("<4sBBBBIQ")
+_SAMPLE_COUNT = struct.Struct("<Q")
+
+_KINDS = {BSDistribution: 1, BSCount: 2, BSSamples: 3}
+_COMPRESSIONS = {None: 0, "zlib": 1, "lz4": 2}
+
+
+def _compress(body: bytes, compression: Optional[str]) -> bytes:
+    if compression == "zlib":
+        return zlib.compress(body)
+    if compression == "lz4":
+        assert lz4_frame is not None, "lz4 compression requires the lz4 package"
+        return lz4_frame.compress(body)
+    return body
+
+
+def _decompress(body: bytes, compression_code: int) -> bytes:
+    if compression_code == _COMPRESSIONS["zlib"]:
+        return zlib.decompress(body)
+    if compression_code == _COMPRESSIONS["lz4"]:
+        assert lz4_frame is not None, "lz4 compression requires the lz4 package"
+        return lz4_frame.decompress(body)
+    return body
+
+
+def _occupations(states, m: int) -> np.ndarray:
+    occupations = BasicStateArray.from_states(states, m).occupations
+    if occupations.dtype.itemsize > 2:
+        raise ValueError("Occupation numbers exceed the columnar format capacity")
+    return occupations
+
+
+def _index_dtype(distinct_count: int) -> np.dtype:
+    for dtype in (np.uint8, np.uint16):
+        if distinct_count <= np.iinfo(dtype).max + 1:
+            return np.dtype(dtype)
+    return np.dtype(np.uint32)
+
+
+def _index_samples(samples: BSSamples):
+    r"""Index of each sample in the list of distinct samples, and this list"""
+    # Samples usually share a few state objects: hashing their id is much cheaper than hashing the states themselves
+    by_id = {}
+    by_value = {}
+    order = np.empty(len(samples), dtype=np.uint32)
+    for i, state in enumerate(samples):
+        index = by_id.get(id(state))
+        if index is None:
+            index = by_id[id(state)] = by_value.setdefault(state, len(by_value))
+        order[i] = index
+    return order, list(by_value)
+
+
+def serialize_columnar(obj: Union[BSDistribution, BSCount, BSSamples], compression: Optional[str] = None) -> bytes:
+    r"""Serialize a BSDistribution, a BSCount or a BSSamples to the binary columnar format
+
+    :param obj: the object to serialize, made of non-annotated basic states
+    :param compression: None, "zlib" or "lz4" (requires the lz4 package)
+    :return: the binary payload
+    """
+    assert compression in _COMPRESSIONS, f"Unknown compression {compression}"
+    kind = _KINDS[type(obj)]
+    if isinstance(obj, BSSamples):
+        order, states = _index_samples(obj)
+        m = states[0].m if states else 0
+        occupations = _occupations(states, m)
+        body = occupations.tobytes() + _SAMPLE_COUNT.pack(len(order)) + order.astype(_index_dtype(len(states))).tobytes()
+    else:
+        states = list(obj.keys())
+        m = states[0].m if states else 0
+        occupations = _occupations(states, m)
+        dtype = np.float64 if isinstance(obj, BSDistribution) else np.int64
+        values = np.fromiter(obj.values(), dtype=dtype, count=len(states))
+        body = occupations.tobytes() + values.tobytes()
+    header = _HEADER.pack(_MAGIC, COLUMNAR_VERSION, kind, _COMPRESSIONS[compression], occupations.dtype.itemsize, m,
+                          len(states))
+    return header + _compress(body, compression)
+
+
+def is_columnar(data: bytes) -> bool:
+    return data[:len(_MAGIC)] == _MAGIC
+
+
+def deserialize_columnar(data: bytes) -> Union[BSDistribution, BSCount, BSSamples]:
+    r"""Deserialize a payload of the binary columnar format
+
+    :param data: the binary payload
+    :return: a BSDistribution, a BSCount or a BSSamples depending on the serialized type
+    """
+    magic, version, kind, compression_code, itemsize, m, count = _HEADER.unpack_from(data)
+    assert magic == _MAGIC, "Invalid columnar payload"
+    assert version <= COLUMNAR_VERSION, f"Unsupported columnar format version {version}"
+    body = _decompress(data[_HEADER.size:], compression_code)
+    occupation_size = count * m * itemsize
+    occupations = np.frombuffer(body, dtype=np.uint8 if itemsize == 1 else np.uint16, count=count * m).reshape(count, m)
+    states = list(BasicStateArray(occupations))
+    if kind == _KINDS[BSSamples]:
+        sample_count, = _SAMPLE_COUNT.unpack_from(body, occupation_size)
+        order = np.frombuffer(body, dtype=_index_dtype(count), count=sample_count,
+                              offset=occupation_size + _SAMPLE_COUNT.size)
+        return BSSamples(map(states.__getitem__, order.tolist()))
+    if kind == _KINDS[BSDistribution]:
+        result = BSDistribution()
+        values = np.frombuffer(body, dtype=np.float64, count=count, offset=occupation_size)
+    else:
+        assert kind == _KINDS[BSCount], f"Unknown columnar payload kind {kind}"
+        result = BSCount()
+        values = np.frombuffer(body, dtype=np.int64, count=count, offset=occupation_size)
+    # Keys and values are already checked, the type assertions of __setitem__ are not needed
+    dict.update(result, zip(states, values.tolist()))
+    return result
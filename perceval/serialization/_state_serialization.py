@@ -68,13 +68,9 @@ def deserialize_statevector(s) -> StateVector:
 
 
 def serialize_bssamples(bss: BSSamples) -> str:
-    bs_set = []
-    order = []
-    for s in bss:
-        if s not in bs_set:
-            bs_set.append(s)
-        order.append(bs_set.index(s))
-    return ';'.join([serialize_state(bs) for bs in bs_set]) + '/' + ';'.join([str(i) for i in order])
+    bs_index = {}
+    order = [str(bs_index.setdefault(s, len(bs_index))) for s in bss]
+    return ';'.join([serialize_state(bs) for bs in bs_index]) + '/' + ';'.join(order)
 
 
 def deserialize_bssamples(serialized_bss: str) -> BSSamples:
@@ -28,13 +28,13 @@
 # SOFTWARE.
 import json
 from os import path
-from typing import Union
-import json
+from typing import Any, Callable, Dict, Union
 
 from perceval.components import Circuit
 from perceval.utils import Matrix, BSDistribution, SVDistribution, BasicState, BSCount
 from perceval.serialization import _matrix_serialization, deserialize_state
 from ._state_serialization import deserialize_statevector, deserialize_bssamples
+from ._columnar_serialization import deserialize_columnar, is_columnar
 import perceval.serialization._component_deserialization as _cd
 from perceval.serialization import _schema_circuit_pb2 as pb
 from base64 import b64decode
@@ -43,6 +43,7 @@ from zlib import decompress
 
 _MATRIX_PREFIX = ":PCVL:Matrix:"
 _CIRCUIT_PREFIX = ":PCVL:ACircuit:"
+_COLUMNAR_PREFIX = "bin:"
 
 
 def deserialize_float(floatstring):
@@ -123,10 +124,69 @@ def deserialize_bscount(serial_bsc):
     return bsc
 
 
-def deserialize(obj):
+_TAG_PREFIX = ":PCVL:"
+_ZIP_PREFIX = ":PCVL:zip:"
+
+
+def _columnar_or(text_decoder: Callable[[str], Any], tag: str) -> Callable[[str], Any]:
+    def decoder(payload: str):
+        if not payload.startswith(_COLUMNAR_PREFIX):
+            return text_decoder(payload)
+        r = deserialize_columnar(b64decode(payload[len(_COLUMNAR_PREFIX):]))
+        assert type(r).__name__ == tag, f"Columnar payload does not contain a {tag}"
+        return r
+    return decoder
+
+
+# Maps each :PCVL: tag to the decoder of the payload following it
+_DESERIALIZERS: Dict[str, Callable[[str], Any]] = {
+    "BasicState": BasicState,
+    "StateVector": deserialize_statevector,
+    "SVDistribution": deserialize_svdistribution,
+    "BSDistribution": _columnar_or(deserialize_bsdistribution, "BSDistribution"),
+    "BSCount": _columnar_or(deserialize_bscount, "BSCount"),
+    "BSSamples": _columnar_or(deserialize_bssamples, "BSSamples"),
+    "Matrix": lambda payload: deserialize_matrix(b64decode(payload)),
+    "ACircuit": lambda payload: deserialize_circuit(b64decode(payload)),
+}
+
+
+def register_deserializer(tag: str, decoder: Callable[[str], Any]):
+    r"""Register the decoder of the values serialized as ":PCVL:<tag>:<payload>"
+
+    :param tag: the type tag
+    :param decoder: a function building the object from its payload
+    """
+    _DESERIALIZERS[tag] = decoder
+
+
+def _deserialize_tagged(obj: str):
+    if obj.startswith(_ZIP_PREFIX):
+        # STEPS: remove prefix -> decode b64 encoding -> decompress -> decode utf-8 (byte-> str)
+        obj = decompress(b64decode(obj[len(_ZIP_PREFIX):])).decode('utf-8')
+    end = obj.find(":", len(_TAG_PREFIX))
+    tag = obj[len(_TAG_PREFIX):end] if end != -1 else ""
+    decoder = _DESERIALIZERS.get(tag)
+    if decoder is None:
+        raise NotImplementedError(f"No deserializer found for {tag}")
+    return decoder(obj[end + 1:])
+
+
+def deserialize(obj, lazy: bool = False):
+    r"""Deserialize any supported type, recursively through dictionaries and lists
+
+    :param obj: the serialized object
+    :param lazy: if True, dictionaries and lists are returned as `LazyDict` and `LazyList` which only deserialize (and
+        decompress) a value when it is accessed
+    """
     if isinstance(obj, bytes):
+        if is_columnar(obj):
+            return deserialize_columnar(obj)
         raise TypeError("Generic deserialize function does not handle binary representation. "
                         "Use specialized functions (e.g. deserialize_circuit) instead.")
+    if lazy and isinstance(obj, (dict, list)):
+        from .lazy_deserialize import LazyDict, LazyList  # Avoids a circular import
+        return LazyDict(obj) if isinstance(obj, dict) else LazyList(obj)
     if isinstance(obj, dict):
         r = {}
         for k, v in obj.items():
@@ -135,36 +195,8 @@ def deserialize(obj):
         r = []
         for k in obj:
             r.append(deserialize(k))
-    elif isinstance(obj, str) and obj.startswith(":PCVL:"):
-        if obj.startswith(":PCVL:zip:"):
-            # if zip found -> update obj
-            # STEPS: remove prefix -> decode b64 encoding -> decompress -> decode utf-8 (byte-> str)
-            zip_prefix = ":PCVL:zip:"
-            obj = obj[len(zip_prefix):]
-            obj = b64decode(obj)
-            obj = (decompress(obj)).decode('utf-8')
-
-        p = obj[6:].find(":")
-        cl = obj[6:p+6]
-        sobj = obj[p+7:]
-        if cl == "BasicState":
-            r = BasicState(sobj)
-        elif cl == "StateVector":
-            r = deserialize_statevector(sobj)
-        elif cl == "SVDistribution":
-            r = deserialize_svdistribution(sobj)
-        elif cl == "BSDistribution":
-            r = deserialize_bsdistribution(sobj)
-        elif cl == "BSCount":
-            r = deserialize_bscount(sobj)
-        elif cl == "BSSamples":
-            r = deserialize_bssamples(sobj)
-        elif cl == "Matrix":
-            r = deserialize_matrix(obj)
-        elif cl == "ACircuit":
-            r = deserialize_circuit(obj)
-        else:
-            raise NotImplementedError(f"No deserializer found for {cl}")
+    elif isinstance(obj, str) and obj.startswith(_TAG_PREFIX):
+        r = _deserialize_tagged(obj)
     else:
         r = obj
     return r
@@ -0,0 +1,225 @@
+# MIT License
+#
+# Copyright (c) 2022 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# As a special exception, the copyright holders of exqalibur library give you
+# permission to combine exqalibur with code included in the standard release of
+# Perceval under the MIT license (or modified versions of such code). You may
+# copy and distribute such a combined system following the terms of the MIT
+# license for both exqalibur and Perceval. This exception for the usage of
+# exqalibur is limited to the python bindings used by Perceval.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Lazy deserialization: containers deserializing their values on first access, and incremental JSON decoding.
+"""
+
+import json
+from collections.abc import MutableMapping, MutableSequence
+from typing import Any, Iterator, Tuple
+
+from .deserialize import deserialize, _deserialize_tagged, _TAG_PREFIX
+
+
+class _Pending:
+    r"""A serialized value which has not been deserialized yet"""
+    __slots__ = ("raw",)
+
+    def __init__(self, raw):
+        self.raw = raw
+
+
+def _wrap(value):
+    if isinstance(value, (dict, list)) or (isinstance(value, str) and value.startswith(_TAG_PREFIX)):
+        return _Pending(value)
+    return value
+
+
+def _resolve(value):
+    if not isinstance(value, _Pending):
+        return value
+    raw = value.raw
+    if isinstance(raw, dict):
+        return LazyDict(raw)
+    if isinstance(raw, list):
+        return LazyList(raw)
+    return _deserialize_tagged(raw)
+
+
+class LazyDict(MutableMapping):
+    r"""Dictionary built from a serialized dictionary, whose values are deserialized (and decompressed) the first time
+    they are accessed. Keys are deserialized at once. Nested dictionaries and lists are lazy as well.
+
+    :param serialized: the serialized dictionary
+    """
+
+    def __init__(self, serialized: dict):
+        self._data = {deserialize(k): _wrap(v) for k, v in serialized.items()}
+
+    def __getitem__(self, key):
+        value = self._data[key]
+        if isinstance(value, _Pending):
+            value = _resolve(value)
+            self._data[key] = value
+        return value
+
+    def __setitem__(self, key, value):
+        self._data[key] = value
+
+    def __delitem__(self, key):
+        del self._data[key]
+
+    def __iter__(self) -> Iterator:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key) -> bool:
+        return key in self._data
+
+    def is_decoded(self, key) -> bool:
+        r"""Tell if the value of `key` has already been deserialized"""
+        return not isinstance(self._data[key], _Pending)
+
+    def copy(self) -> dict:
+        return dict(self)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class LazyList(MutableSequence):
+    r"""List built from a serialized list, whose elements are deserialized (and decompressed) the first time they are
+    accessed. Nested dictionaries and lists are lazy as well.
+
+    :param serialized: the serialized list
+    """
+
+    def __init__(self, serialized: list):
+        self._data = [_wrap(v) for v in serialized]
+
+    def _resolve_at(self, index: int):
+        value = self._data[index]
+        if isinstance(value, _Pending):
+            value = _resolve(value)
+            self._data[index] = value
+        return value
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._resolve_at(i) for i in range(*index.indices(len(self)))]
+        return self._resolve_at(index)
+
+    def __setitem__(self, index, value):
+        self._data[index] = value
+
+    def __delitem__(self, index):
+        del self._data[index]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def insert(self, index: int, value):
+        self._data.insert(index, value)
+
+    def is_decoded(self, index: int) -> bool:
+        r"""Tell if the element at `index` has already been deserialized"""
+        return not isinstance(self._data[index], _Pending)
+
+    def copy(self) -> list:
+        return list(self)
+
+    def __add__(self, other) -> list:
+        return list(self) + list(other)
+
+    def __radd__(self, other) -> list:
+        return list(other) + list(self)
+
+    def __eq__(self, other):
+        if isinstance(other, LazyList):
+            other = list(other)
+        return list(self) == other
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+_DECODER = json.JSONDecoder()
+_WHITESPACES = " \t\n\r"
+
+
+def _skip(text: str, pos: int, expected: str = None) -> int:
+    while pos < len(text) and text[pos] in _WHITESPACES:
+        pos += 1
+    if expected is not None:
+        if pos >= len(text) or text[pos] not in expected:
+            raise json.JSONDecodeError(f"Expecting one of '{expected}'", text, pos)
+    return pos
+
+
+def iter_json_object(text: str, stream_key: str = None) -> Iterator[Tuple[str, Any]]:
+    r"""Decode the top-level JSON object of `text` incrementally, yielding its (key, value) pairs in document order
+
+    If the value of `stream_key` is a list, it is yielded as an iterator decoding one element at a time, which lets a
+    caller process the first elements of a large list before the rest of the document is decoded. This iterator has to
+    be consumed before moving to the next pair, otherwise its remaining elements are skipped.
+
+    :param text: a JSON document whose root is an object
+    :param stream_key: the key whose list value is streamed
+    """
+    pos = _skip(text, 0, "{") + 1
+    pos = _skip(text, pos)
+    if text[pos:pos + 1] == "}":
+        return
+    while True:
+        key, pos = _DECODER.raw_decode(text, _skip(text, pos, '"'))
+        pos = _skip(text, _skip(text, pos, ":") + 1)
+        if key == stream_key and text[pos:pos + 1] == "[":
+            end = [pos + 1]
+            elements = _iter_json_array(text, end)
+            yield key, elements
+            for _ in elements:  # Skips the elements the caller did not consume
+                pass
+            pos = end[0]
+        else:
+            value, pos = _DECODER.raw_decode(text, pos)
+            yield key, value
+        pos = _skip(text, pos, ",}")
+        if text[pos] == "}":
+            return
+        pos += 1
+
+
+def _iter_json_array(text: str, position: list) -> Iterator:
+    # position[0] is just after the opening bracket, and is updated to just after the closing one
+    pos = _skip(text, position[0])
+    if text[pos:pos + 1] == "]":
+        position[0] = pos + 1
+        return
+    while True:
+        value, pos = _DECODER.raw_decode(text, _skip(text, pos))
+        position[0] = pos
+        yield value
+        pos = _skip(text, pos, ",]")
+        if text[pos] == "]":
+            position[0] = pos + 1
+            return
+        pos += 1
@@ -0,0 +1,289 @@
+# MIT License
+#
+# Copyright (c) 2022 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# As a special exception, the copyright holders of exqalibur library give you
+# permission to combine exqalibur with code included in the standard release of
+# Perceval under the MIT license (or modified versions of such code). You may
+# copy and distribute such a combined system following the terms of the MIT
+# license for both exqalibur and Perceval. This exception for the usage of
+# exqalibur is limited to the python bindings used by Perceval.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import bisect
+import struct
+from typing import Optional, Type, Union
+
+import numpy as np
+
+from perceval.utils import BasicState, BasicStateArray, BSDistribution, BSCount, BSSamples
+from perceval.utils.state_array import pack_occupations, packed_keys_view, _occupation_dtype
+
+_MAGIC = b"PCVS"
+_VERSION = 1
+# magic, version, kind, occupation item size, mode count, row count, index offset (0 when there is no index)
+_HEADER = struct.Struct("<4sBBBxIQQ")
+
+_KINDS = {BSDistribution: 1, BSCount: 2, BSSamples: 3}
+_VALUE_DTYPES = {BSDistribution: np.float64, BSCount: np.int64}
+
+ResultType = Union[BSDistribution, BSCount, BSSamples]
+
+
+class _SortedRows:
+    r"""Sequence of the rows of an occupation matrix in the order of a sort index, read lazily for `bisect`"""
+
+    def __init__(self, occupations: np.ndarray, index: np.ndarray):
+        self._occupations = occupations
+        self._index = index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __getitem__(self, i: int) -> tuple:
+        return tuple(self._occupations[self._index[i]].tolist())
+
+
+class ResultStore:
+    r"""Memory-mappable file storing a BSDistribution, a BSCount or a BSSamples
+
+    The file is made of a fixed size header, then one record per row (the occupations of an output state, followed by
+    its probability or its count, none for samples), then an optional index sorting the rows by output state.
+    Occupations and values are exposed as memory-mapped views, and the probability (or count) of a single output state
+    is found by binary search in the index without reading the rest of the file. Rows can be appended chunk by chunk,
+    e.g. from a streaming simulation; a state appearing in several rows has the sum of their values.
+
+    >>> with ResultStore.create("probs.pcvs", BSDistribution, m=12) as store:
+    ...     store.append(chunk_bsd)
+    ...     store.build_index()
+    >>> ResultStore("probs.pcvs").lookup(BasicState([1, 0, ...]))
+
+    :param filepath: path of an existing store
+    :param mode: "r" to read the store, "a" to also append rows to it
+    """
+
+    def __init__(self, filepath: str, mode: str = "r"):
+        assert mode in ("r", "a"), "Result store mode must be 'r' or 'a'"
+        self._filepath = filepath
+        self._file = open(filepath, "rb" if mode == "r" else "r+b")
+        self._writable = mode == "a"
+        magic, version, kind, itemsize, m, count, index_offset = _HEADER.unpack(self._file.read(_HEADER.size))
+        assert magic == _MAGIC, f"{filepath} is not a result store"
+        assert version <= _VERSION, f"Unsupported result store version {version}"
+        self._type: Type[ResultType] = next(t for t, k in _KINDS.items() if k == kind)
+        self._m = m
+        self._count = count
+        self._index_offset = index_offset
+        self._itemsize = itemsize
+        fields = [("occupations", np.uint8 if itemsize == 1 else np.uint16, (m,))]
+        if self._type in _VALUE_DTYPES:
+            fields.append(("value", _VALUE_DTYPES[self._type]))
+        self._record_dtype = np.dtype(fields)
+        self._records = None
+        self._index = None
+
+    @staticmethod
+    def create(filepath: str, result_type: Type[ResultType], m: int, max_occupation: int = 255) -> "ResultStore":
+        r"""Create an empty store, opened in append mode
+
+        :param filepath: path of the file, overwritten if it exists
+        :param result_type: BSDistribution, BSCount or BSSamples
+        :param m: number of modes of the stored states
+        :param max_occupation: highest occupation number of a mode, which sets the width of the occupation numbers
+        """
+        assert result_type in _KINDS, f"Cannot store {result_type.__name__} objects"
+        itemsize = np.dtype(_occupation_dtype(max_occupation)).itemsize
+        with open(filepath, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, _KINDS[result_type], itemsize, m, 0, 0))
+        return ResultStore(filepath, mode="a")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self._records = None
+        self._index = None
+        self._file.close()
+
+    @property
+    def result_type(self) -> Type[ResultType]:
+        return self._type
+
+    @property
+    def m(self) -> int:
+        return self._m
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def has_index(self) -> bool:
+        return self._index_offset != 0
+
+    @property
+    def _records_end(self) -> int:
+        return _HEADER.size + self._count * self._record_dtype.itemsize
+
+    def _write_header(self):
+        self._file.seek(0)
+        self._file.write(_HEADER.pack(_MAGIC, _VERSION, _KINDS[self._type], self._itemsize, self._m, self._count,
+                                      self._index_offset))
+        self._file.flush()
+
+    def _memmap(self):
+        if self._records is None:
+            if self._count == 0:
+                self._records = np.zeros(0, dtype=self._record_dtype)
+            else:
+                self._records = np.memmap(self._filepath, dtype=self._record_dtype, mode="r", offset=_HEADER.size,
+                                          shape=(self._count,))
+        return self._records
+
+    @property
+    def occupations(self) -> np.ndarray:
+        r"""(row count x m) memory-mapped occupation matrix"""
+        return self._memmap()["occupations"]
+
+    @property
+    def values(self) -> Optional[np.ndarray]:
+        r"""Memory-mapped probabilities or counts of the rows, None for samples"""
+        if self._type not in _VALUE_DTYPES:
+            return None
+        return self._memmap()["value"]
+
+    def append(self, chunk: Union[ResultType, BasicStateArray], values: np.ndarray = None):
+        r"""Append rows at the end of the store. An existing index is dropped, see `build_index`.
+
+        :param chunk: a result of the store type, or a `BasicStateArray` (e.g. a chunk of `Processor.samples_iterator`)
+        :param values: probabilities or counts of the states of a `BasicStateArray` chunk (not for samples)
+        """
+        assert self._writable, "Result store is opened in read-only mode"
+        if isinstance(chunk, BasicStateArray):
+            occupations = chunk.occupations
+        else:
+            assert isinstance(chunk, self._type), f"Cannot append a {type(chunk).__name__} to a {self._type.__name__}" \
+                                                  " store"
+            states = list(chunk) if isinstance(chunk, BSSamples) else list(chunk.keys())
+            occupations = BasicStateArray.from_states(states, self._m).occupations
+            if self._type in _VALUE_DTYPES:
+                values = np.fromiter(chunk.values(), dtype=_VALUE_DTYPES[self._type], count=len(states))
+        assert occupations.shape[1] == self._m, f"Expected states of {self._m} modes"
+        assert (values is not None) == (self._type in _VALUE_DTYPES), "Values are required for distributions and " \
+                                                                      "counts, and only for them"
+        occupation_dtype = self._record_dtype["occupations"].base
+        if occupations.size and int(occupations.max()) > np.iinfo(occupation_dtype).max:
+            raise ValueError("Occupation numbers exceed the store capacity, see max_occupation")
+        records = np.empty(len(occupations), dtype=self._record_dtype)
+        records["occupations"] = occupations
+        if values is not None:
+            assert len(values) == len(occupations), "State and value counts differ"
+            records["value"] = values
+
+        self._records = None
+        self._index = None
+        self._file.seek(self._records_end)
+        self._file.write(records.tobytes())
+        self._file.truncate()  # Drops the index
+        self._count += len(records)
+        self._index_offset = 0
+        self._write_header()
+
+    def build_index(self):
+        r"""Sort the rows by output state and write this order at the end of the file, enabling `lookup`"""
+        assert self._writable, "Result store is opened in read-only mode"
+        occupations = np.asarray(self.occupations)
+        index = np.lexsort(occupations.T[::-1]).astype(np.uint64) if self._count else np.zeros(0, dtype=np.uint64)
+        self._file.seek(self._records_end)
+        self._file.write(index.tobytes())
+        self._file.truncate()
+        self._index_offset = self._records_end
+        self._index = None
+        self._write_header()
+
+    def _sort_index(self) -> np.ndarray:
+        if self._index is None:
+            self._index = np.memmap(self._filepath, dtype=np.uint64, mode="r", offset=self._index_offset,
+                                    shape=(self._count,)) if self._count else np.zeros(0, dtype=np.uint64)
+        return self._index
+
+    def lookup(self, state: BasicState) -> Union[float, int]:
+        r"""Probability (or count) of an output state, 0 if it is not stored
+
+        With an index, rows are found by binary search, reading O(log(row count)) rows of the file. Otherwise, the
+        occupation matrix is scanned.
+        """
+        assert self._type in _VALUE_DTYPES, "Lookup requires a distribution or a count store"
+        assert state.m == self._m, f"Expected a state of {self._m} modes"
+        target = tuple(state)
+        values = self.values
+        if self.has_index:
+            index = self._sort_index()
+            rows = _SortedRows(self.occupations, index)
+            start = bisect.bisect_left(rows, target)
+            stop = bisect.bisect_right(rows, target, lo=start)
+            matches = index[start:stop]
+        else:
+            matches = np.flatnonzero((self.occupations == np.array(target)).all(axis=1))
+        return values[matches].sum().item() if len(matches) else self._type_zero()
+
+    def _type_zero(self) -> Union[float, int]:
+        return 0. if self._type is BSDistribution else 0
+
+    def load(self) -> ResultType:
+        r"""Read the whole store, the values of identical states being summed"""
+        occupations = np.asarray(self.occupations)
+        if self._type is BSSamples:
+            return BSSamples(BasicStateArray(occupations))
+        result = self._type()
+        if not self._count:
+            return result
+        _, first, inverse = np.unique(packed_keys_view(pack_occupations(np.ascontiguousarray(occupations))),
+                                      return_index=True, return_inverse=True)
+        summed = np.bincount(inverse, weights=np.asarray(self.values, dtype=np.float64))
+        if self._type is BSCount:
+            summed = np.round(summed).astype(np.int64)
+        order = np.sort(first)
+        summed = summed[np.argsort(first)]
+        dict.update(result, zip(BasicStateArray(occupations[order]), summed.tolist()))
+        return result
+
+
+def save_result_store(result: ResultType, filepath: str, index: bool = True):
+    r"""Write a BSDistribution, a BSCount or a BSSamples to a new memory-mappable result store
+
+    :param result: the result to store, made of non-annotated states
+    :param filepath: path of the file, overwritten if it exists
+    :param index: build the sort index enabling single state lookups (not for samples)
+    """
+    if isinstance(result, BSSamples):
+        states, values = list(result), None
+    else:
+        states = list(result.keys())
+        values = np.fromiter(result.values(), dtype=_VALUE_DTYPES[type(result)], count=len(states))
+    m = states[0].m if states else 0
+    occupations = BasicStateArray.from_states(states, m).occupations
+    max_occupation = int(occupations.max()) if occupations.size else 0
+    with ResultStore.create(filepath, type(result), m, max_occupation) as store:
+        store.append(BasicStateArray(occupations), values)
+        if index and values is not None:
+            store.build_index()
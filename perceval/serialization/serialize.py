@@ -34,6 +34,7 @@ from zlib import compress as zlib_compress
 from ._matrix_serialization import serialize_matrix
 from ._circuit_serialization import serialize_circuit
 from ._state_serialization import serialize_state, serialize_statevector, serialize_bssamples
+from ._columnar_serialization import serialize_columnar
 from perceval.components import ACircuit
 from perceval.utils import Matrix, BasicState, SVDistribution, BSDistribution, BSCount, BSSamples, StateVector, \
     simple_float
@@ -59,8 +60,14 @@ def _handle_compression(serialized_obj: str, do_compress: bool) -> str:
     return ":PCVL:zip:" + serialized_string_compressed_byt2str
 
 
+def _handle_columnar(obj, tag: str, do_compress: bool) -> str:
+    # The binary payload is compressed by itself, rather than its base64 representation
+    payload = serialize_columnar(obj, compression="zlib" if do_compress else None)
+    return f":PCVL:{tag}:bin:" + b64encode(payload).decode('utf-8')
+
+
 @dispatch(ACircuit, compress=(list, bool))
-def serialize(circuit: ACircuit, compress=True) -> str:
+def serialize(circuit: ACircuit, compress=True, binary=False) -> str:
     tag = 'ACircuit'
     compress = _handle_compress_parameter(compress, tag)
     return _handle_compression(
@@ -69,7 +76,7 @@ def serialize(circuit: ACircuit, compress=True) -> str:
 
 
 @dispatch(Matrix, compress=(list, bool))
-def serialize(m: Matrix, compress=False) -> str:
+def serialize(m: Matrix, compress=False, binary=False) -> str:
     tag = "Matrix"
     compress = _handle_compress_parameter(compress, tag)
     return _handle_compression(f":PCVL:{tag}:" + b64encode(serialize_matrix(m).SerializeToString()).decode('utf-8'),
@@ -77,7 +84,7 @@ def serialize(m: Matrix, compress=False) -> str:
 
 
 @dispatch(BasicState, compress=(list, bool))
-def serialize(obj, compress=False) -> str:
+def serialize(obj, compress=False, binary=False) -> str:
     tag = "BasicState"
     compress = _handle_compress_parameter(compress, tag)
     return _handle_compression(f":PCVL:{tag}:" + serialize_state(obj), do_compress=compress)
@@ -85,14 +92,14 @@ def serialize(obj, compress=False) -> str:
 
 
 @dispatch(StateVector, compress=(list, bool))
-def serialize(sv, compress=False) -> str:
+def serialize(sv, compress=False, binary=False) -> str:
     tag = "StateVector"
     compress = _handle_compress_parameter(compress, tag)
     return _handle_compression(f":PCVL:{tag}:" + serialize_statevector(sv), do_compress=compress)
 
 
 @dispatch(SVDistribution, compress=(list, bool))
-def serialize(dist: SVDistribution, compress=False) -> str:
+def serialize(dist: SVDistribution, compress=False, binary=False) -> str:
     tag = "SVDistribution"
     compress = _handle_compress_parameter(compress, tag)
     serial_svd = f":PCVL:{tag}:{{" \
@@ -103,9 +110,11 @@ def serialize(dist: SVDistribution, compress=False) -> str:
 
 
 @dispatch(BSDistribution, compress=(list, bool))
-def serialize(dist: BSDistribution, compress=False) -> str:
+def serialize(dist: BSDistribution, compress=False, binary=False) -> str:
     tag = "BSDistribution"
     compress = _handle_compress_parameter(compress, tag)
+    if binary:
+        return _handle_columnar(dist, tag, do_compress=compress)
     serial_bsd = f":PCVL:{tag}:{{" \
            + ";".join(["%s=%s" % (serialize_state(k), simple_float(v, nsimplify=False)[1]) for k, v in dist.items()]) \
            + "}"
@@ -113,9 +122,11 @@ def serialize(dist: BSDistribution, compress=False) -> str:
 
 
 @dispatch(BSCount, compress=(list, bool))
-def serialize(obj, compress=False) -> str:
+def serialize(obj, compress=False, binary=False) -> str:
     tag = "BSCount"
     compress = _handle_compress_parameter(compress, tag)
+    if binary:
+        return _handle_columnar(obj, tag, do_compress=compress)
     serial_bsc = f":PCVL:{tag}:{{" \
            + ";".join(["%s=%s" % (serialize_state(k), str(v)) for k, v in obj.items()]) \
            + "}"
@@ -123,34 +134,36 @@ def serialize(obj, compress=False) -> str:
 
 
 @dispatch(BSSamples, compress=(list, bool))
-def serialize(obj, compress=True) -> str:
+def serialize(obj, compress=True, binary=False) -> str:
     tag = "BSSamples"
     compress = _handle_compress_parameter(compress, tag)
+    if binary:
+        return _handle_columnar(obj, tag, do_compress=compress)
     return _handle_compression(f":PCVL:{tag}:" + serialize_bssamples(obj), do_compress=compress)
 
 
 @dispatch(dict, compress=(list, bool))
-def serialize(obj, compress=False) -> dict:
+def serialize(obj, compress=False, binary=False) -> dict:
     r = {}
     for k, v in obj.items():
-        r[serialize(k, compress=compress)] = serialize(v, compress=compress)
+        r[serialize(k, compress=compress, binary=binary)] = serialize(v, compress=compress, binary=binary)
     return r
 
 
 @dispatch(list, compress=(list, bool))
-def serialize(obj, compress=False) -> list:
+def serialize(obj, compress=False, binary=False) -> list:
     r = []
     for k in obj:
-        r.append(serialize(k, compress=compress))
+        r.append(serialize(k, compress=compress, binary=binary))
     return r
 
 
 @dispatch(object, compress=(list, bool))
-def serialize(obj, compress=False) -> object:
+def serialize(obj, compress=False, binary=False) -> object:
     return obj
 
 
-def serialize_to_file(obj, filepath: str, compress=False) -> None:
-    serial_repr = serialize(obj, compress=compress)
+def serialize_to_file(obj, filepath: str, compress=False, binary=False) -> None:
+    serial_repr = serialize(obj, compress=compress, binary=binary)
     with open(filepath, mode="w") as f:
         f.write(json.dumps(serial_repr))
@@ -28,17 +28,21 @@
 # SOFTWARE.
 
 """
-Functions which output the binary representation of objects having a protobuf serializer
-This binary representation loses all knowledge about the type of the input object and have to be deserialized using
-specialized deserialize functions (e.g. deserialize_circuit)
+Functions which output the binary representation of objects having a protobuf or a columnar serializer
+The protobuf binary representation loses all knowledge about the type of the input object and have to be deserialized
+using specialized deserialize functions (e.g. deserialize_circuit)
+The columnar representation of BSDistribution, BSCount and BSSamples is versioned and typed, it is deserialized with
+deserialize_columnar
 """
 
 from multipledispatch import dispatch
 
 from ._circuit_serialization import serialize_circuit
 from ._matrix_serialization import serialize_matrix
+from ._columnar_serialization import serialize_columnar
 from perceval.components.linear_circuit import ACircuit
 from perceval.utils.matrix import Matrix
+from perceval.utils.statevector import BSDistribution, BSCount, BSSamples
 
 
 @dispatch(ACircuit)
@@ -49,3 +53,18 @@ def serialize_binary(circuit: ACircuit):
 @dispatch(Matrix)
 def serialize_binary(matrix: Matrix):
     return serialize_matrix(matrix).SerializeToString()
+
+
+@dispatch(BSDistribution)
+def serialize_binary(dist: BSDistribution, compression: str = None):
+    return serialize_columnar(dist, compression)
+
+
+@dispatch(BSCount)
+def serialize_binary(bsc: BSCount, compression: str = None):
+    return serialize_columnar(bsc, compression)
+
+
+@dispatch(BSSamples)
+def serialize_binary(samples: BSSamples, compression: str = None):
+    return serialize_columnar(samples, compression)
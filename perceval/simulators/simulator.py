@@ -29,13 +29,62 @@
 from ._simulator_utils import _to_bsd, _inject_annotation, _merge_sv, _annot_state_mapping
 from .simulator_interface import ISimulator
 from perceval.components import ACircuit
-from perceval.utils import BasicState, BSDistribution, StateVector, SVDistribution, PostSelect, global_params
-from perceval.backends import AProbAmpliBackend
+from perceval.utils import BasicState, BSDistribution, StateVector, SVDistribution, PostSelect, global_params, \
+    CompactBSDistribution
+from perceval.backends import AProbAmpliBackend, SLOSBackend
 
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from copy import copy
 from multipledispatch import dispatch
 from numbers import Number
-from typing import Callable, Set, Union, Optional
+from typing import Callable, Dict, List, Set, Tuple, Union, Optional
+
+import numpy as np
+
+
+# Worker side of the parallel probs_svd
+_worker_backend: Optional[AProbAmpliBackend] = None
+_worker_distributions: Optional[List[CompactBSDistribution]] = None
+
+
+def _init_worker(backend: AProbAmpliBackend = None, distributions: List[CompactBSDistribution] = None):
+    global _worker_backend, _worker_distributions
+    _worker_backend = backend
+    _worker_distributions = distributions
+
+
+def _compute_distributions(input_states: List[str], backend: AProbAmpliBackend = None) -> List[CompactBSDistribution]:
+    backend = backend or _worker_backend
+    results = []
+    for input_state in input_states:
+        backend.set_input_state(BasicState(input_state))
+        # Distributions are kept as arrays to be recombined with vectorized tensor products
+        probs, output_states = backend.prob_vector()
+        nonzero = probs > global_params['min_p']
+        results.append(CompactBSDistribution(output_states[nonzero], probs[nonzero]))
+    return results
+
+
+def _recombine_input(prob0: float, sv_data: List[Tuple[float, List[int]]],
+                     distributions: List[CompactBSDistribution], p_threshold: float) -> CompactBSDistribution:
+    """Recombine the evolved distributions of the separated states given a single input state vector"""
+    result_bsd = CompactBSDistribution()
+    for probampli, instate_list in sv_data:
+        prob_sv = abs(probampli)**2
+        evolved_in_s = CompactBSDistribution()
+        for in_s in instate_list:
+            evolved_in_s = CompactBSDistribution.tensor_product(evolved_in_s, distributions[in_s],
+                                                                merge_modes=True,
+                                                                prob_threshold=p_threshold/(prob_sv*prob0))
+        result_bsd.accumulate(evolved_in_s, prob_sv)
+    result_bsd.consolidate()
+    return result_bsd
+
+
+def _recombine_inputs(inputs: List[Tuple[float, List]], p_threshold: float,
+                      distributions: List[CompactBSDistribution] = None) -> List[CompactBSDistribution]:
+    distributions = distributions or _worker_distributions
+    return [_recombine_input(prob0, sv_data, distributions, p_threshold) for prob0, sv_data in inputs]
 
 
 class Simulator(ISimulator):
@@ -49,12 +98,16 @@ class Simulator(ISimulator):
 
     def __init__(self, backend: AProbAmpliBackend):
         self._backend = backend
+        self._circuit: Optional[ACircuit] = None
+        self._circuit_version: Optional[int] = None
         self._invalidate_cache()
         self._postselect: PostSelect = PostSelect()
         self._logical_perf: float = 1
         self._physical_perf: float = 1
         self._rel_precision: float = 1e-6  # Precision relative to the highest probability of interest in probs_svd
         self._min_detected_photons: int = 0
+        self._compact: bool = False
+        self._workers: int = 1
 
     @property
     def precision(self):
@@ -73,6 +126,32 @@ class Simulator(ISimulator):
         """
         self._min_detected_photons = value
 
+    def set_compact_output(self, value: bool):
+        """
+        Make probs_svd compute and return a CompactBSDistribution (array-backed) instead of a BSDistribution. This
+        scales to output distributions of millions of states.
+
+        :param value: enables the compact output when True, otherwise disables it
+        """
+        self._compact = value
+
+    def set_parallel_workers(self, workers: int):
+        """
+        Run probs_svd on several workers. The distinct separated input states, then the input state vectors, are
+        partitioned between workers. SLOS backends run in a thread pool, other backends in a process pool (in which
+        case the backend has to be picklable). Results are identical to the serial execution.
+
+        :param workers: number of workers (1 for a serial execution)
+        """
+        assert isinstance(workers, int) and workers >= 1, "Worker count must be a positive integer"
+        self._workers = workers
+
+    def _create_executor(self, **initargs) -> Executor:
+        if isinstance(self._backend, SLOSBackend):
+            return ThreadPoolExecutor(self._workers)
+        return ProcessPoolExecutor(self._workers, initializer=_init_worker, initargs=(initargs.get('backend'),
+                                                                                         initargs.get('distributions')))
+
     @property
     def logical_perf(self):
         return self._logical_perf
@@ -93,8 +172,13 @@ class Simulator(ISimulator):
 
         :param circuit: a unitary circuit without polarized components
         """
+        version = circuit.version
+        if circuit is self._circuit and version is not None and version == self._circuit_version:
+            return  # Cached results are still valid
         self._invalidate_cache()
         self._backend.set_circuit(circuit)
+        self._circuit = circuit
+        self._circuit_version = version
 
     @dispatch(BasicState, BasicState)
     def prob_amplitude(self, input_state: BasicState, output_state: BasicState) -> complex:
@@ -179,11 +263,24 @@ class Simulator(ISimulator):
                 self.DEBUG_evolve_count += 1
 
     def _probs_cache(self, input_list: Set[BasicState]):
-        for state in input_list:
-            if state not in self._probd:
-                self._backend.set_input_state(state)
-                self._probd[state] = self._backend.prob_distribution()
-                self.DEBUG_evolve_count += 1
+        missing = [state for state in input_list if state not in self._probd]
+        if self._workers == 1 or len(missing) < 2:
+            distributions = _compute_distributions(missing, self._backend)
+        else:
+            groups = [missing[i::self._workers] for i in range(self._workers) if missing[i::self._workers]]
+            with self._create_executor(backend=self._backend) as executor:
+                if isinstance(executor, ThreadPoolExecutor):
+                    # Each thread computes its own group on a private copy of the backend
+                    futures = [executor.submit(_compute_distributions, group, copy(self._backend))
+                               for group in groups]
+                else:
+                    futures = [executor.submit(_compute_distributions, [str(s) for s in group]) for group in groups]
+                distributions = [None] * len(missing)
+                for i, future in enumerate(futures):
+                    distributions[i::self._workers] = future.result()
+        for state, distribution in zip(missing, distributions):
+            self._probd[state] = distribution
+            self.DEBUG_evolve_count += 1
 
     def _merge_probability_dist(self, input_list) -> BSDistribution:
         results = BSDistribution()
@@ -197,6 +294,12 @@ class Simulator(ISimulator):
         if not self._postselect.has_condition:
             bsd.normalize()
             return bsd
+        if isinstance(bsd, CompactBSDistribution):
+            selected = self._postselect.select(bsd.state_array.occupations)
+            self._logical_perf -= bsd.value_array[~selected].sum()
+            result = CompactBSDistribution(bsd.state_array[selected], bsd.value_array[selected])
+            result.normalize()
+            return result
         result = BSDistribution()
         for state, prob in bsd.items():
             if self._postselect(state):
@@ -232,10 +335,48 @@ class Simulator(ISimulator):
         :param progress_callback: A function with the signature `func(progress: float, message: str)`
 
         :return: A dictionary of the form { "results": BSDistribution, "physical_perf": float, "logical_perf": float }
-        * results is the post-selected output state distribution
+        * results is the post-selected output state distribution (a CompactBSDistribution if the compact output is
+          enabled)
         * physical_perf is the performance computed from the detected photon filter
         * logical_perf is the performance computed from the post-selection
         """
+        decomposed_input, p_threshold = self._decompose_svd(input_dist)
+        input_set = set([state for s in decomposed_input for t in s[1] for state in t[1]])
+        self._probs_cache(input_set)
+        return self._recombine(decomposed_input, input_set, p_threshold, progress_callback)
+
+    def probs_svd_batch(self, input_dist: SVDistribution, unitaries: np.ndarray,
+                        progress_callback: Optional[Callable] = None) -> List[Dict]:
+        """
+        Compute probs_svd for a stack of K unitaries replacing the circuit one (e.g. a sweep over the circuit
+        parameters). The SLOS backend computes all the separated input states for all the unitaries in a single pass.
+
+        :param input_dist: A state vector distribution describing the input to simulate
+        :param unitaries: a (K x m x m) array of unitary matrices
+        :param progress_callback: A function with the signature `func(progress: float, message: str)`
+
+        :return: the list of the K probs_svd results
+        """
+        assert isinstance(self._backend, SLOSBackend), "Batched computation requires a SLOS backend"
+        decomposed_input, p_threshold = self._decompose_svd(input_dist)
+        input_set = set([state for s in decomposed_input for t in s[1] for state in t[1]])
+        prob_vectors = self._backend.batch_prob_vector(unitaries, list(input_set))
+        physical_perf = self._physical_perf
+        results = []
+        for k in range(len(unitaries)):
+            self._probd = {}
+            for state, (probs, output_states) in prob_vectors.items():
+                nonzero = probs[k] > global_params['min_p']
+                self._probd[state] = CompactBSDistribution(output_states[nonzero], probs[k][nonzero])
+            self._physical_perf = physical_perf
+            results.append(self._recombine(decomposed_input, input_set, p_threshold))
+            if self._cancel_requested(progress_callback, (k + 1) / len(unitaries)):
+                raise RuntimeError("Cancel requested")
+        self._probd = {}  # Cached distributions have to match the circuit
+        return results
+
+    def _decompose_svd(self, input_dist: SVDistribution) -> Tuple[List, float]:
+        self._physical_perf = 1
 
         """Trim input SVD given _rel_precision threshold"""
         max_p = 0
@@ -276,37 +417,67 @@ class Simulator(ISimulator):
                 decomposed_input.append((prob, [(abs(pa)**2, st.separate_state(keep_annotations=False)) for st, pa in sv.items()]))
             else:
                 self._physical_perf -= prob
-        input_set = set([state for s in decomposed_input for t in s[1] for state in t[1]])
-        self._probs_cache(input_set)
+        return decomposed_input, p_threshold
 
+    def _recombine(self, decomposed_input: List, input_set: Set[BasicState], p_threshold: float,
+                   progress_callback: Optional[Callable] = None) -> Dict:
         """Reconstruct output probability distribution"""
-        res = BSDistribution()
-        for idx, (prob0, sv_data) in enumerate(decomposed_input):
-            """First, recombine evolved state vectors given a single input"""
-            result_bsd = BSDistribution()
-            for probampli, instate_list in sv_data:
-                prob_sv = abs(probampli)**2
-                evolved_in_s = BSDistribution()
-                for in_s in instate_list:
-                    evolved_in_s = BSDistribution.tensor_product(evolved_in_s, self._probd[in_s],
-                                                                 merge_modes=True,
-                                                                 prob_threshold=p_threshold/(prob_sv*prob0))
-                    self.DEBUG_merge_count += 1
-                for bs, p in evolved_in_s.items():
-                    result_bsd[bs] += prob_sv*p
-
-            """Then, add the resulting distribution the """
-            for bs, p in result_bsd.items():
-                res[bs] += p*prob0
-
-            if progress_callback:
-                exec_request = progress_callback((idx + 1) / len(decomposed_input), 'probs')
-                if exec_request is not None and 'cancel_requested' in exec_request and exec_request['cancel_requested']:
+        # Separated input states are replaced by their index in the distribution list (which makes inputs picklable)
+        input_list = list(input_set)
+        input_index = {state: idx for idx, state in enumerate(input_list)}
+        distributions = [self._probd[state] for state in input_list]
+        indexed_input = [(prob0, [(pa, [input_index[st] for st in instate_list]) for pa, instate_list in sv_data])
+                         for prob0, sv_data in decomposed_input]
+        self.DEBUG_merge_count += sum(len(t[1]) for s in decomposed_input for t in s[1])
+
+        res = CompactBSDistribution()
+        if self._workers == 1:
+            for idx, (prob0, sv_data) in enumerate(indexed_input):
+                res.accumulate(_recombine_input(prob0, sv_data, distributions, p_threshold), prob0)
+                if self._cancel_requested(progress_callback, (idx + 1) / len(indexed_input)):
                     raise RuntimeError("Cancel requested")
-        return {'results': self._post_select_on_distribution(res),
+        else:
+            self._parallel_recombination(res, indexed_input, distributions, p_threshold, progress_callback)
+        res = self._post_select_on_distribution(res)
+        return {'results': res if self._compact else res.to_bsd(),
                 'physical_perf': self._physical_perf,
                 'logical_perf': self._logical_perf}
 
+    @staticmethod
+    def _cancel_requested(progress_callback: Optional[Callable], progress: float) -> bool:
+        if progress_callback:
+            exec_request = progress_callback(progress, 'probs')
+            if exec_request is not None and 'cancel_requested' in exec_request and exec_request['cancel_requested']:
+                return True
+        return False
+
+    def _parallel_recombination(self, res: CompactBSDistribution, indexed_input: List,
+                                distributions: List[CompactBSDistribution], p_threshold: float,
+                                progress_callback: Optional[Callable]):
+        # Inputs are split into contiguous chunks, and partial results are accumulated in the input order, so that the
+        # summation order (hence the result) is the same as in the serial execution
+        chunk_size = max(1, -(-len(indexed_input) // (4 * self._workers)))
+        chunks = [indexed_input[i:i + chunk_size] for i in range(0, len(indexed_input), chunk_size)]
+        executor = self._create_executor(distributions=distributions)
+        if isinstance(executor, ThreadPoolExecutor):
+            futures = [executor.submit(_recombine_inputs, chunk, p_threshold, distributions) for chunk in chunks]
+        else:
+            futures = [executor.submit(_recombine_inputs, chunk, p_threshold) for chunk in chunks]
+        try:
+            done = 0
+            for chunk, future in zip(chunks, futures):
+                for (prob0, _), result_bsd in zip(chunk, future.result()):
+                    res.accumulate(result_bsd, prob0)
+                done += len(chunk)
+                if self._cancel_requested(progress_callback, done / len(indexed_input)):
+                    raise RuntimeError("Cancel requested")
+        finally:
+            # On cancellation, chunks which have not started are dropped, and the ones being recombined end in the
+            # background instead of being waited for
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+
     def evolve(self, input_state: Union[BasicState, StateVector]) -> StateVector:
         """
         Evolve a state through the circuit
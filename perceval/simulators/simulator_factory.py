@@ -64,6 +64,7 @@ class SimulatorFactory:
         sim_losses = False
         convert_to_circuit = False
         min_detected_photons = None
+        compact_output = False
         m = 0
         if isinstance(circuit, ACircuit):
             sim_polarization = circuit.requires_polarization
@@ -75,6 +76,7 @@ class SimulatorFactory:
                 if backend is None:
                     backend = circuit.backend
                 min_detected_photons = circuit.parameters.get('min_detected_photons')
+                compact_output = circuit.is_compact_output
                 circuit = circuit.components
 
             for _, cp in circuit:
@@ -99,6 +101,7 @@ class SimulatorFactory:
         simulator = Simulator(backend)
         if min_detected_photons is not None:
             simulator.set_min_detected_photon_filter(min_detected_photons)
+        simulator.set_compact_output(compact_output)
         if sim_polarization:
             simulator = PolarizationSimulator(simulator)
         if sim_delay:
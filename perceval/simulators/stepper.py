@@ -27,32 +27,87 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 from collections import defaultdict
-from typing import List, Union, Callable, Dict
+from typing import List, Union, Callable, Dict, Tuple
 import copy
 
-from perceval.utils import StateVector, BasicState, BSDistribution, SVDistribution, allstate_iterator
-from perceval.components import ACircuit
+import numpy as np
+
+from perceval.utils import StateVector, BasicState, BasicStateArray, BSDistribution, SVDistribution, global_params
+from perceval.utils.state_array import pack_occupations, packed_keys_view, fock_space_occupations, _occupation_dtype
+from perceval.components import ACircuit, Circuit, PERM
 from perceval.backends import AProbAmpliBackend, BACKEND_LIST
 from .simulator_interface import ISimulator
 from ._simulator_utils import _to_bsd
 
 
+def _component_key(c: ACircuit) -> tuple:
+    r"""Cheap cache key of the transfer table of a component: its structure and the values of its parameters.
+
+    Unassigned parameters are identified by their unique id, so that components only differing by an unassigned symbol
+    get different keys. Components without parameters (e.g. Unitary, PERM), as well as composite circuits, are
+    identified by their numeric unitary matrix.
+    """
+    params = c.get_parameters(all_params=True)
+    if not params or isinstance(c, Circuit):
+        return type(c), c.m, np.asarray(c.compute_unitary(use_symbolic=False), dtype=complex).tobytes()
+    return type(c), c.name, c.m, tuple(float(p) if p.defined else p.pid for p in params)
+
+
+def _to_arrays(sv: StateVector) -> Tuple[np.ndarray, np.ndarray]:
+    r"""Occupation matrix and amplitude vector of a non-empty state vector of non-annotated states"""
+    states = list(sv)
+    amplitudes = np.array([sv[state] for state in states], dtype=complex)
+    occupations = BasicStateArray.from_states(states).occupations
+    return occupations.astype(_occupation_dtype(int(occupations.sum(axis=1).max())), copy=False), amplitudes
+
+
+def _to_state_vector(occupations: np.ndarray, amplitudes: np.ndarray) -> StateVector:
+    sv = StateVector()
+    for state, amplitude in zip(BasicStateArray(occupations), amplitudes.tolist()):
+        sv[state] = amplitude
+    return sv
+
+
+def _keys(occupations: np.ndarray) -> np.ndarray:
+    return packed_keys_view(pack_occupations(np.ascontiguousarray(occupations)))
+
+
+def _group_by(inverse: np.ndarray, count: int) -> List[np.ndarray]:
+    r"""Indexes of the rows sharing each value of `inverse` (as returned by `np.unique`)"""
+    order = np.argsort(inverse, kind="stable")
+    return np.split(order, np.cumsum(np.bincount(inverse, minlength=count))[:-1])
+
+
 class Stepper(ISimulator):
     """
     Step-by-step circuit propagation algorithm, main usage is on a circuit, but could work in degraded mode
     on a list of components [(r, comp)].
     """
-    def __init__(self, backend: AProbAmpliBackend = None):
+    def __init__(self, backend: AProbAmpliBackend = None, engine: str = "statevector", threshold: float = None):
+        r"""
+        :param backend: the probability amplitude backend computing the transfer of each component, SLOS by default
+        :param engine: "statevector" propagates a StateVector component by component, "array" keeps the state as a
+            packed-key sorted occupation matrix and an amplitude vector, and applies each component through its local
+            transfer matrix. The array engine is much faster for deep circuits and many photons.
+        :param threshold: with the array engine, amplitudes whose modulus falls below this threshold are pruned after
+            each component (defaults to global_params["min_complex_component"])
+        """
+        assert engine in ("statevector", "array"), f"Unknown Stepper engine '{engine}'"
         self._out = None
         self._backend = backend
         if backend is None:
             self._backend = BACKEND_LIST['SLOS']()
+        self._engine = engine
+        self._threshold = global_params["min_complex_component"] if threshold is None else threshold
         self._min_detected_photons = 0
         self._clear_cache()
         self._C = None
 
     def _clear_cache(self):
-        self._result_dict = defaultdict(lambda: {'_set': set()})
+        # Component key -> {packed sub-state key -> (output sub-state occupations, amplitudes)}
+        self._transfer_tables: Dict[tuple, Dict[bytes, Tuple[np.ndarray, np.ndarray]]] = defaultdict(dict)
+        # (component key, photon count) -> (local basis, basis keys, sorter, transfer matrix), for the array engine
+        self._transfer_matrices: Dict[tuple, Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = {}
         self._compiled_input = None
 
     def set_circuit(self, circuit: ACircuit):
@@ -71,32 +126,121 @@ class Stepper(ISimulator):
         """
         min_r = r[0]
         max_r = r[-1] + 1
-        key = c.describe()  # Can't use c; two identical pieces aren't considered equal if they aren't at the same place
-        # build list of never visited fockstates corresponding to subspace [min_r:max_r]
-        sub_input_state = {sliced_state for state in sv
-                           for sliced_state in (state[min_r:max_r],)
-                           if sliced_state not in self._result_dict[key]['_set']
-                           and state[:self._C.m].n >= self._min_detected_photons}
-        # get circuit probability for these input_states
-        if sub_input_state:
+        if not sv:
+            return StateVector()
+        occupations, amplitudes = _to_arrays(sv)
+        # Useless to compute states which will not be selected
+        active = occupations[:, :self._C.m].sum(axis=1) >= self._min_detected_photons
+        active_occupations = occupations[active]
+        sub_occupations = np.ascontiguousarray(active_occupations[:, min_r:max_r])
+        sub_keys, first, inverse = np.unique(_keys(sub_occupations), return_index=True, return_inverse=True)
+        sub_keys = sub_keys.tolist()
+
+        # Compute the transfer tables of never visited sub-states of [min_r:max_r], in bulk for each sub-state
+        tables = self._transfer_tables[_component_key(c)]
+        missing = [i for i, key in enumerate(sub_keys) if key not in tables]
+        if missing:
+            self._backend.set_circuit(c)
+            for i in missing:
+                self._backend.set_input_state(BasicState(sub_occupations[first[i]].tolist()))
+                transfer, outputs = self._backend.amplitude_vector()
+                tables[sub_keys[i]] = (outputs.occupations, np.asarray(transfer, dtype=complex))
+
+        # Now rebuild the new state vector: each input state is replaced by its outputs, through index arrays
+        new_occupations = [occupations[~active]]
+        new_amplitudes = [amplitudes[~active]]
+        active_amplitudes = amplitudes[active]
+        for key, rows in zip(sub_keys, _group_by(inverse, len(sub_keys))):
+            outputs, transfer = tables[key]
+            block = np.repeat(active_occupations[rows], len(outputs), axis=0)
+            block[:, min_r:max_r] = np.tile(outputs, (len(rows), 1))
+            new_occupations.append(block)
+            new_amplitudes.append(np.outer(active_amplitudes[rows], transfer).ravel())
+        new_occupations = np.concatenate(new_occupations)
+        new_amplitudes = np.concatenate(new_amplitudes)
+
+        # Sum the contributions to each output state
+        _, first, inverse = np.unique(_keys(new_occupations), return_index=True, return_inverse=True)
+        summed = np.bincount(inverse, new_amplitudes.real) + 1j * np.bincount(inverse, new_amplitudes.imag)
+        order = np.argsort(first)
+        return _to_state_vector(new_occupations[first[order]], summed[order])
+
+    def _local_transfer(self, c: ACircuit, key: tuple, n: int) \
+            -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        r"""Transfer matrix of a component restricted to the Fock space of n photons in its modes
+
+        :return: a tuple (basis, basis keys, sorter, transfer) where basis is the occupation matrix of the local Fock
+            space, sorter the indexes sorting its packed keys, and transfer[i, j] the amplitude of basis state i to basis
+            state j
+        """
+        cache_key = key + (n,)
+        if cache_key not in self._transfer_matrices:
+            basis = fock_space_occupations(c.m, n)
+            basis_keys = _keys(basis)
+            sorter = np.argsort(basis_keys)
+            transfer = np.zeros((len(basis), len(basis)), dtype=complex)
             self._backend.set_circuit(c)
-            mapping_input_output = {}
-            for input_state in sub_input_state:
-                self._backend.set_input_state(input_state)
-                mapping_input_output[input_state] = {output_state: self._backend.prob_amplitude(output_state)
-                                                     for output_state in allstate_iterator(input_state)}
-            self._result_dict[key].update(mapping_input_output)  # Union of the dictionaries
-            self._result_dict[key]['_set'] |= sub_input_state  # Union of sets
-        # now rebuild the new state vector
-        nsv = StateVector()
-        # May be faster in c++ (impossible to use comprehension here due to successive additions)
-        for state in sv:
-            if state[:self._C.m].n >= self._min_detected_photons:  # Useless to compute if the mode will not be selected
-                for output_state, prob_ampli in self._result_dict[key][state[min_r:max_r]].items():
-                    nsv[state.set_slice(slice(min_r, max_r), output_state)] += prob_ampli * sv[state]
+            for i, state in enumerate(basis.tolist()):
+                self._backend.set_input_state(BasicState(state))
+                amplitudes, outputs = self._backend.amplitude_vector()
+                targets = sorter[np.searchsorted(basis_keys, _keys(outputs.occupations.astype(basis.dtype)),
+                                                 sorter=sorter)]
+                transfer[i, targets] = amplitudes
+            self._transfer_matrices[cache_key] = (basis, basis_keys, sorter, transfer)
+        return self._transfer_matrices[cache_key]
+
+    def _apply_arrays(self, occupations: np.ndarray, amplitudes: np.ndarray, r: List[int], c: ACircuit) \
+            -> Tuple[np.ndarray, np.ndarray]:
+        r"""Array engine counterpart of `apply`, on an occupation matrix and its amplitude vector"""
+        min_r = r[0]
+        max_r = r[-1] + 1
+        if isinstance(c, PERM):
+            occupations = occupations.copy()
+            inv = np.argsort(c.perm_vector)
+            occupations[:, min_r:max_r] = occupations[:, min_r:max_r][:, inv]
+            return occupations, amplitudes
+
+        sub_n = occupations[:, min_r:max_r].sum(axis=1)
+        # States without photon in the component modes are left untouched, as well as states which will not be selected
+        moving = (sub_n > 0) & (occupations[:, :self._C.m].sum(axis=1) >= self._min_detected_photons)
+        new_occupations = [occupations[~moving]]
+        new_amplitudes = [amplitudes[~moving]]
+        key = _component_key(c)
+        for n in np.unique(sub_n[moving]).tolist():
+            rows = np.flatnonzero(moving & (sub_n == n))
+            basis, basis_keys, sorter, transfer = self._local_transfer(c, key, n)
+            # Gather the amplitudes into a (states sharing the other modes x local Fock space) matrix
+            sub_keys = _keys(occupations[rows, min_r:max_r])
+            local = sorter[np.searchsorted(basis_keys, sub_keys, sorter=sorter)]
+            rest = occupations[rows]
+            rest[:, min_r:max_r] = 0
+            _, first, inverse = np.unique(_keys(rest), return_index=True, return_inverse=True)
+            gathered = np.zeros((len(first), len(basis)), dtype=complex)
+            gathered[inverse, local] = amplitudes[rows]
+            evolved = gathered @ transfer
+            # Scatter the non-negligible amplitudes back to full states
+            groups, outputs = np.nonzero(abs(evolved) >= self._threshold)
+            block = rest[first[groups]]
+            block[:, min_r:max_r] = basis[outputs]
+            new_occupations.append(block)
+            new_amplitudes.append(evolved[groups, outputs])
+        new_occupations = np.concatenate(new_occupations)
+        new_amplitudes = np.concatenate(new_amplitudes)
+        order = np.argsort(_keys(new_occupations))
+        return new_occupations[order], new_amplitudes[order]
+
+    def _propagate_arrays(self, sv: StateVector) -> StateVector:
+        occupations, amplitudes = _to_arrays(sv)
+        order = np.argsort(_keys(occupations))
+        occupations, amplitudes = occupations[order], amplitudes[order]
+        for r, c in self._C:
+            if hasattr(c, "apply") and not isinstance(c, PERM):
+                occupations, amplitudes = _to_arrays(c.apply(r, _to_state_vector(occupations, amplitudes)))
+                order = np.argsort(_keys(occupations))
+                occupations, amplitudes = occupations[order], amplitudes[order]
             else:
-                nsv[state] = sv[state]
-        return nsv
+                occupations, amplitudes = self._apply_arrays(occupations, amplitudes, r, c)
+        return _to_state_vector(occupations, amplitudes)
 
     def probs(self, input_state) -> BSDistribution:
         return _to_bsd(self.evolve(input_state))
@@ -119,10 +263,15 @@ class Stepper(ISimulator):
             sv = StateVector(input_states)
         else:
             sv = input_states
-        var = [float(p) for _, c in self._C for p in c.get_parameters()]
+        var = [c.version for _, c in self._C]
+        if None in var:
+            var = [float(p) for _, c in self._C for p in c.get_parameters()]
         if self._compiled_input == (var, sv):
             return False
         self._compiled_input = copy.copy((var, sv))
+        if self._engine == "array":
+            self._out = self._propagate_arrays(sv)
+            return True
         for r, c in self._C:
             if hasattr(c, "apply"):
                 sv = c.apply(r, sv)
@@ -33,6 +33,9 @@ from .parameter import Parameter, P, Expression, E
 from .mlstr import mlstr
 from .statevector import BasicState, StateVector, SVDistribution, BSDistribution, BSCount, BSSamples, \
     tensorproduct, AnnotatedBasicState, allstate_iterator, anonymize_annotations
+from .state_array import BasicStateArray
+from .compact_distribution import CompactBSDistribution, CompactStateVector
+from .alias_sampler import AliasSampler
 from .polarization import Polarization, convert_polarized_state, build_spatial_output_states
 from .postselect import PostSelect
 from ._random import random_seed
@@ -28,6 +28,8 @@
 # SOFTWARE.
 
 import copy
+import random
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 
 import numpy as np
 import sympy as sp
@@ -60,6 +62,29 @@ def add_phases(phase_shifter_fn, D):
     return phases
 
 
+# Numeric inverse unitary of the component templates, as a function of their free parameters, keyed on the template
+# description
+_compiled_inverses = {}
+_COMPILED_INVERSES_MAX_SIZE = 32
+
+
+def _compiled_inverse(component):
+    r"""Return a function computing the numeric inverse unitary of a component from the values of its free parameters
+
+    The symbolic inversion and the lambdification are done once per component template and cached.
+    """
+    key = component.describe()
+    if key not in _compiled_inverses:
+        params_symbols = [x.spv for x in component.get_parameters()]
+        cU_inv = component.U.inv()
+        cU_inv.simplify()
+        f = sp.lambdify([params_symbols], cU_inv, modules=[np, scp])
+        if len(_compiled_inverses) >= _COMPILED_INVERSES_MAX_SIZE:
+            del _compiled_inverses[next(iter(_compiled_inverses))]
+        _compiled_inverses[key] = lambda p: np.asarray(f(p), dtype=complex)
+    return _compiled_inverses[key]
+
+
 def decompose_triangle(u,
                        component,
                        phase_shifter_fn,
@@ -70,7 +95,6 @@ def decompose_triangle(u,
                        ignore_identity_block):
     m = u.shape[0]
     params = component.get_parameters()
-    params_symbols = [x.spv for x in params]
     bounds = [not x.is_periodic and x.bounds or None for x in params]
 
     if constraints is None:
@@ -79,9 +103,7 @@ def decompose_triangle(u,
     if precision is None:
         precision = global_params["min_complex_component"]
 
-    cU = component.U
-    cU_inv = cU.inv()
-    cU_inv.simplify()
+    u_inv = _compiled_inverse(component)
 
     list_components = []
     for j in range(m - 1, 0, -1):
@@ -105,9 +127,12 @@ def decompose_triangle(u,
                         solve_cell = True
                         break
             if not solve_cell:
-                equation = cU_inv[0, 0] * u[n, j] + cU_inv[0, 1] * u[n + 1, j]
-                f = sp.lambdify([params_symbols], [equation], modules=[np, scp])
-                g = lambda *p: np.real(np.abs(f(*p)))
+                a, b = u[n, j], u[n + 1, j]
+
+                def g(p):
+                    inv = u_inv(p)
+                    return abs(inv[0, 0] * a + inv[0, 1] * b)
+
                 x0 = [p.random() for p in params]
                 # look for a constraint solution first
                 res = None
@@ -120,15 +145,10 @@ def decompose_triangle(u,
 
                 RI = Matrix.eye(m, use_symbolic=False)
                 instantiated_component = copy.deepcopy(component)
-                substitution = {}
-                for i, r in enumerate(res):
-                    substitution[params_symbols[i]] = r
-                    instantiated_component.get_parameters()[0].fix_value(res[i])
+                for r in res:
+                    instantiated_component.get_parameters()[0].fix_value(r)
 
-                RI[n, n] = complex(cU_inv[0, 0].subs(substitution))
-                RI[n, n + 1] = complex(cU_inv[0, 1].subs(substitution))
-                RI[n + 1, n] = complex(cU_inv[1, 0].subs(substitution))
-                RI[n + 1, n + 1] = complex(cU_inv[1, 1].subs(substitution))
+                RI[n:n + 2, n:n + 2] = u_inv(list(res))
 
                 u = RI @ u
                 list_components = [((n, n + 1), instantiated_component)] + list_components
@@ -141,6 +161,38 @@ def decompose_triangle(u,
     return list_components
 
 
+def _decompose_trial(seed, decompose_fn, *args, **kwargs):
+    random.seed(seed)
+    return decompose_fn(*args, **kwargs)
+
+
+def decompose_parallel(decompose_fn, max_try, n_workers, *args, **kwargs):
+    r"""Run up to `max_try` decomposition trials across a pool of `n_workers` processes
+
+    Each trial starts from its own random parameters. As soon as a trial succeeds, the trials which have not started
+    yet are cancelled, and the function returns without waiting for the running ones (which cannot be interrupted, and
+    end in the background).
+
+    :return: the component list of the first successful trial, None if all trials failed
+    """
+    executor = ProcessPoolExecutor(n_workers)
+    pending = set()
+    try:
+        pending = {executor.submit(_decompose_trial, random.getrandbits(32), decompose_fn, *args, **kwargs)
+                   for _ in range(max_try)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                lc = future.result()
+                if lc is not None:
+                    return lc
+        return None
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
 def decompose_rectangle(u,
                         component,
                         phase_shifter_fn,
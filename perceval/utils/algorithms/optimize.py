@@ -27,9 +27,13 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from typing import Optional, Callable, List
-from perceval.components.linear_circuit import ACircuit
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Optional, Callable, List, Tuple
+import numpy as np
+
+from perceval.components.linear_circuit import ACircuit, Circuit
 from perceval.utils import Matrix, P, global_params
+from .norm import fidelity, frobenius
 
 from scipy import optimize as scpy_optimize
 
@@ -42,6 +46,78 @@ def _min_fnc(c: ACircuit, params: List[P], x: List[int], v: Optional[Matrix],
     return -sign * value
 
 
+def unitary_and_derivatives(c: ACircuit, params: List[P]) -> Tuple[np.ndarray, List[np.ndarray]]:
+    r"""Compute the numeric unitary of a circuit and its derivatives with respect to a list of its parameters
+
+    Partial products of the components are computed in a forward then a backward sweep over the component list, so
+    that the derivative of the unitary with respect to a component is `suffix @ dU_component @ prefix`, the derivative
+    with respect to a parameter being the sum over the components using it.
+
+    :param c: the circuit
+    :param params: the parameters, a derivative is computed for each of them
+    :return: the unitary and the list of derivatives
+    """
+    m = c.m
+    components = list(c) if isinstance(c, Circuit) else [(tuple(range(m)), c)]
+    blocks = [np.asarray(comp.compute_unitary(use_symbolic=False)) for _, comp in components]
+    ranges = [(r[0], r[-1] + 1) for r, _ in components]
+    prefixes = [np.eye(m, dtype=complex)]
+    for (start, stop), block in zip(ranges, blocks):
+        prefix = prefixes[-1].copy()
+        prefix[start:stop] = block @ prefix[start:stop]
+        prefixes.append(prefix)
+    param_index = {id(p): idx for idx, p in enumerate(params)}
+    derivatives = [np.zeros((m, m), dtype=complex) for _ in params]
+    suffix = np.eye(m, dtype=complex)
+    for idx in range(len(components) - 1, -1, -1):
+        start, stop = ranges[idx]
+        for p, d_block in components[idx][1].compute_unitary_derivatives():
+            if id(p) in param_index:
+                derivatives[param_index[id(p)]] += suffix[:, start:stop] @ d_block @ prefixes[idx][start:stop]
+        suffix = suffix.copy()
+        suffix[:, start:stop] = suffix[:, start:stop] @ blocks[idx]
+    return prefixes[-1], derivatives
+
+
+def _frobenius_gradient(u: np.ndarray, v: np.ndarray, derivatives: List[np.ndarray]) -> List[float]:
+    norm = np.linalg.norm(u - v)
+    if norm == 0:
+        return [0.] * len(derivatives)
+    diff = np.conj(u - v)
+    return [float(np.sum(diff * du).real / norm) for du in derivatives]
+
+
+def _fidelity_gradient(u: np.ndarray, v: np.ndarray, derivatives: List[np.ndarray]) -> List[float]:
+    overlap = np.sum(np.conj(u) * v)  # tr(u^dagger v)
+    norm = np.sum(np.abs(u) ** 2).real  # tr(u^dagger u)
+    gradient = []
+    for du in derivatives:
+        d_overlap = np.sum(np.conj(du) * v)
+        d_norm = 2 * np.sum(np.conj(u) * du).real
+        d_abs_overlap = 2 * (np.conj(overlap) * d_overlap).real
+        gradient.append(float((d_abs_overlap * norm - abs(overlap) ** 2 * d_norm) / (u.shape[0] * norm ** 2)))
+    return gradient
+
+
+# Analytic gradients of the known fidelity functions, given the derivatives of the unitary
+_GRADIENTS = {frobenius: _frobenius_gradient, fidelity: _fidelity_gradient}
+
+
+def _min_fnc_and_gradient(c: ACircuit, params: List[P], x: List[int], v: Optional[Matrix],
+                          f: Callable[[Matrix, Matrix], float], sign: float):
+    for idx, p in enumerate(x):
+        params[idx].set_value(p)
+    u, derivatives = unitary_and_derivatives(c, params)
+    value = f(Matrix(u), v)
+    if f in _GRADIENTS:
+        gradient = _GRADIENTS[f](u, v, derivatives)
+    else:
+        # Directional finite differences of f only: the unitary is not recomputed
+        step = 1e-7
+        gradient = [(f(Matrix(u + step * du), v) - value) / step for du in derivatives]
+    return -sign * value, -sign * np.array(gradient)
+
+
 def _stop_criterion(f, f0, precision, accept):
     if accept:
         if abs(f-f0) < precision:
@@ -49,6 +125,26 @@ def _stop_criterion(f, f0, precision, accept):
     return False
 
 
+def _optimize_once(c: ACircuit, v: Optional[Matrix], f: Callable[[Matrix, Matrix], float], init_params: List[float],
+                   niter: int, target_opt: float, precision: float, sign: float, use_gradient: bool,
+                   temperature: float = 1.0) -> scpy_optimize.OptimizeResult:
+    params = c.get_parameters()
+    kwargs = {}
+    if use_gradient:
+        def func(x):
+            return _min_fnc_and_gradient(c, params, x, v, f, sign)
+        bounds = [(p.min, p.max) for p in params]
+        kwargs['minimizer_kwargs'] = {"method": "L-BFGS-B", "jac": True, "bounds": bounds}
+    else:
+        def func(x):
+            return _min_fnc(c, params, x, v, f, sign)
+    return scpy_optimize.basinhopping(func, init_params,
+                                      niter=niter,
+                                      T=temperature,
+                                      callback=lambda _, f, accept: _stop_criterion(f, target_opt, precision, accept),
+                                      **kwargs)
+
+
 def optimize(c: ACircuit,
              v: Optional[Matrix],
              f: Callable[[Matrix, Matrix], float],
@@ -56,7 +152,9 @@ def optimize(c: ACircuit,
              target_opt: float = 0,
              precision: float = None,
              n_try: int = 10,
-             sign=1) -> scpy_optimize.OptimizeResult:
+             sign=1,
+             use_gradient: bool = False,
+             n_workers: int = 1) -> scpy_optimize.OptimizeResult:
     r"""Optimize parameters of a circuit according to Callable function
 
     :param c: circuit with parameters to optimize
@@ -66,27 +164,54 @@ def optimize(c: ACircuit,
     :param sign: -1 to find maximal values
     :param target_opt: optimal value for the function - used with `precision` for early stopping
     :param precision: used with `target_opt` for early stopping
-    :return: OptimizeResult from scipy library
+    :param n_try: number of starts from random parameter values
+    :param use_gradient: use a gradient-based local minimizer (L-BFGS-B), the unitary and its derivatives being
+        computed in a single sweep over the circuit components. Gradients are analytic for `fidelity` and `frobenius`.
+    :param n_workers: run the starts in a pool of `n_workers` processes (the circuit and `f` have to be picklable)
+    :return: OptimizeResult from scipy library. The circuit parameters are set to the best values found.
     """
     if precision is None:
         precision = global_params["min_complex_component"]
     params = c.get_parameters()
     best = None
     best_x = None
-    while n_try > 0:
-        init_params = [p.random() for p in params]
-        temperature = 1.0
-        res = scpy_optimize.basinhopping(lambda x: _min_fnc(c, params, x, v, f, sign), init_params,
-                                         niter=niter,
-                                         T= temperature,
-                                         callback=lambda _, f, accept: _stop_criterion(f, target_opt, precision, accept))
-        if best is None or res.fun < best:
-            best = res.fun
-            best_x = res.x
-        if _stop_criterion(res.fun, target_opt, precision, True):
-            break
-        n_try -= 1
-        temperature *= 1.1
+    res = None
+    if n_workers > 1:
+        # Starting points are drawn here, so that workers do not share the same random state
+        starts = [[p.random() for p in params] for _ in range(n_try)]
+        executor = ProcessPoolExecutor(n_workers)
+        futures = [executor.submit(_optimize_once, c, v, f, init_params, niter, target_opt, precision, sign,
+                                   use_gradient) for init_params in starts]
+        try:
+            for future in as_completed(futures):
+                trial = future.result()
+                if best is None or trial.fun < best:
+                    # The result of the best trial is returned, with all its fields (success, nfev...)
+                    best = trial.fun
+                    best_x = trial.x
+                    res = trial
+                if _stop_criterion(trial.fun, target_opt, precision, True):
+                    break
+        finally:
+            # Once the target is reached, starts which have not begun are dropped, and the running ones end in the
+            # background instead of being waited for
+            for pending in futures:
+                pending.cancel()
+            executor.shutdown(wait=False)
+    else:
+        while n_try > 0:
+            init_params = [p.random() for p in params]
+            temperature = 1.0
+            res = _optimize_once(c, v, f, init_params, niter, target_opt, precision, sign, use_gradient, temperature)
+            if best is None or res.fun < best:
+                best = res.fun
+                best_x = res.x
+            if _stop_criterion(res.fun, target_opt, precision, True):
+                break
+            n_try -= 1
+            temperature *= 1.1
+    for p, value in zip(params, best_x):
+        p.set_value(value)
     res.fun = best * -sign
     res.x = best_x
     return res
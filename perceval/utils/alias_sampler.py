@@ -0,0 +1,143 @@
+# MIT License
+#
+# Copyright (c) 2022 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# As a special exception, the copyright holders of exqalibur library give you
+# permission to combine exqalibur with code included in the standard release of
+# Perceval under the MIT license (or modified versions of such code). You may
+# copy and distribute such a combined system following the terms of the MIT
+# license for both exqalibur and Perceval. This exception for the usage of
+# exqalibur is limited to the python bindings used by Perceval.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+from typing import Sequence, Union
+
+import numpy as np
+
+from .statevector import BasicState, BSSamples, StateVector, ProbabilityDistribution
+from .state_array import BasicStateArray
+
+
+def _has_photons(state) -> bool:
+    n = state.n
+    return max(n) != 0 if isinstance(n, list) else n != 0
+
+
+class AliasSampler:
+    r"""Precomputed sampler over a discrete distribution, using Walker's alias method.
+
+    Building the alias table costs O(N) for N states, then each draw costs O(1) whatever the number of states, which
+    makes it suitable for drawing millions of samples from the same distribution. Draws use NumPy global random
+    generator, and can thus be seeded with `perceval.random_seed`.
+
+    :param states: the states to sample from (any sequence, including a `BasicStateArray`)
+    :param weights: non-negative weights of the states, not necessarily normalized
+    """
+
+    def __init__(self, states: Sequence, weights):
+        weights = np.asarray(weights, dtype=float)
+        assert len(states) == len(weights), "There must be exactly one weight per state"
+        assert len(weights) and (weights >= 0).all() and weights.sum() > 0, \
+            "Weights must be non-negative and non all zero"
+        self._states = states
+        self._prob, self._alias = self._build_table(weights)
+        self._occupations = None
+
+    @staticmethod
+    def _build_table(weights: np.ndarray):
+        # Vose's algorithm: each cell k keeps the states k (with probability prob[k]) and alias[k]
+        size = len(weights)
+        scaled = weights * (size / weights.sum())
+        prob = np.ones(size)
+        alias = np.arange(size)
+        small = np.flatnonzero(scaled < 1).tolist()
+        large = np.flatnonzero(scaled >= 1).tolist()
+        scaled = scaled.tolist()
+        while small and large:
+            s = small.pop()
+            g = large[-1]
+            prob[s] = scaled[s]
+            alias[s] = g
+            scaled[g] += scaled[s] - 1
+            if scaled[g] < 1:
+                small.append(large.pop())
+        # Remaining cells are full, up to rounding errors
+        return prob, alias
+
+    @staticmethod
+    def from_distribution(distribution: Union[ProbabilityDistribution, StateVector, dict],
+                          non_null: bool = True) -> AliasSampler:
+        r"""Build a sampler from a distribution of states
+
+        :param distribution: a `BSDistribution`, `SVDistribution`, `BSCount` (or any mapping from states to weights),
+            or a `StateVector` (weights being the squared amplitude moduli)
+        :param non_null: excludes states without photons
+        """
+        if isinstance(distribution, StateVector):
+            items = [(state, abs(amplitude) ** 2) for state, amplitude in distribution.items()]
+        else:
+            items = list(distribution.items())
+        if non_null:
+            items = [(state, weight) for state, weight in items if _has_photons(state)]
+        states = [state for state, _ in items]
+        return AliasSampler(states, [weight for _, weight in items])
+
+    @property
+    def states(self) -> Sequence:
+        return self._states
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def sample_indices(self, count: int) -> np.ndarray:
+        r"""Draw `count` state indexes"""
+        x = np.random.random(count) * len(self._prob)
+        cells = x.astype(np.int64)
+        return np.where(x - cells < self._prob[cells], cells, self._alias[cells])
+
+    def sample(self, count: int) -> list:
+        r"""Draw `count` states, returned as a `BSSamples` when sampling basic states
+
+        Drawn states are not copied: a state drawn several times is the same object.
+        """
+        indices = self.sample_indices(count)
+        if isinstance(self._states, BasicStateArray):
+            # States are built once per distinct drawn index
+            unique, inverse = np.unique(indices, return_inverse=True)
+            drawn = list(self._states[unique])
+            return self._to_samples([drawn[i] for i in inverse.tolist()])
+        return self._to_samples([self._states[i] for i in indices.tolist()])
+
+    @staticmethod
+    def _to_samples(states: list) -> list:
+        if states and isinstance(states[0], BasicState):
+            samples = BSSamples()
+            samples.extend(states)
+            return samples
+        return states
+
+    def sample_occupations(self, count: int) -> BasicStateArray:
+        r"""Draw `count` non-annotated basic states, returned as a `BasicStateArray` without building any state object"""
+        if self._occupations is None:
+            self._occupations = self._states.occupations if isinstance(self._states, BasicStateArray) \
+                else BasicStateArray.from_states(self._states).occupations
+        return BasicStateArray(self._occupations[self.sample_indices(count)])
@@ -0,0 +1,403 @@
+# MIT License
+#
+# Copyright (c) 2022 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# As a special exception, the copyright holders of exqalibur library give you
+# permission to combine exqalibur with code included in the standard release of
+# Perceval under the MIT license (or modified versions of such code). You may
+# copy and distribute such a combined system following the terms of the MIT
+# license for both exqalibur and Perceval. This exception for the usage of
+# exqalibur is limited to the python bindings used by Perceval.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import warnings
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple, Union
+
+import numpy as np
+
+from .globals import global_params
+from .state_array import BasicStateArray, _occupation_dtype, pack_occupations, packed_keys_view
+from .alias_sampler import AliasSampler
+from .statevector import BasicState, BSDistribution, BSSamples, StateVector
+
+
+_PRODUCT_BLOCK_SIZE = 1 << 22
+
+
+class _CompactMapping:
+    r"""Array-backed mapping of non-annotated basic states to numerical values.
+
+    States are stored as the rows of an occupation matrix and values in a NumPy vector; rows are hashed through packed
+    integer keys. Single-state accesses mimic the dict API, whereas whole distribution operations run as NumPy
+    operations.
+    """
+    _VALUE_DTYPE = np.float64
+
+    def __init__(self, states: Union[BasicStateArray, np.ndarray, None] = None, values: np.ndarray = None):
+        self._occ: Optional[np.ndarray] = None
+        self._values = np.zeros(0, dtype=self._VALUE_DTYPE)
+        self._new_rows: List[list] = []
+        self._new_values: list = []
+        self._chunks: List[Tuple[np.ndarray, np.ndarray]] = []  # Bulk additions, reduced on next flush
+        self._index: Optional[Dict[bytes, int]] = None
+        if states is not None:
+            occupations = states.occupations if isinstance(states, BasicStateArray) else np.asarray(states)
+            assert values is not None and len(values) == occupations.shape[0], \
+                "A value is required for each state"
+            self._occ = occupations
+            self._values = np.array(values, dtype=self._VALUE_DTYPE)
+
+    @classmethod
+    def _from_mapping(cls, mapping: Mapping[BasicState, complex]):
+        if not mapping:
+            return cls()
+        states = BasicStateArray.from_states(mapping.keys())
+        return cls(states, np.fromiter(mapping.values(), dtype=cls._VALUE_DTYPE, count=len(states)))
+
+    def _to_mapping(self, result):
+        dict.update(result, zip(self.state_array, self.value_array.tolist()))
+        return result
+
+    # Internal storage management
+    def _flush(self):
+        if self._chunks:
+            chunks = [(self._occ, self._values)] + self._chunks
+            dtype = np.result_type(*[occ.dtype for occ, _ in chunks])
+            self._set_arrays(np.concatenate([occ.astype(dtype, copy=False) for occ, _ in chunks]),
+                             np.concatenate([values for _, values in chunks]).astype(self._VALUE_DTYPE, copy=False))
+            self._reduce()
+        self._flush_new_rows()
+
+    def _flush_new_rows(self):
+        if self._new_rows:
+            n_max = max(max(row, default=0) for row in self._new_rows)
+            self._ensure_dtype(n_max)
+            new_occ = np.array(self._new_rows, dtype=self._occ.dtype).reshape(len(self._new_rows), self.m)
+            self._occ = np.concatenate([self._occ, new_occ])
+            self._values = np.concatenate([self._values, np.array(self._new_values, dtype=self._VALUE_DTYPE)])
+            self._new_rows = []
+            self._new_values = []
+
+    def _ensure_dtype(self, n_max: int):
+        dtype = _occupation_dtype(n_max)
+        if np.dtype(dtype).itemsize > self._occ.dtype.itemsize:
+            self._occ = self._occ.astype(dtype)
+            self._index = None  # Packed keys depend on the occupation dtype
+
+    def _set_arrays(self, occupations: np.ndarray, values: np.ndarray):
+        self._occ = occupations
+        self._values = values
+        self._new_rows = []
+        self._new_values = []
+        self._chunks = []
+        self._index = None
+
+    def _reduce(self):
+        r"""Merge duplicated states, summing their values"""
+        self._flush()
+        if self._occ is None or not len(self._values):
+            return
+        keys = packed_keys_view(pack_occupations(self._occ))
+        _, first_idx, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        if len(first_idx) == len(keys):
+            return
+        if np.iscomplexobj(self._values):
+            values = np.bincount(inverse, weights=self._values.real) \
+                     + 1j * np.bincount(inverse, weights=self._values.imag)
+        else:
+            values = np.bincount(inverse, weights=self._values)
+        self._set_arrays(self._occ[first_idx], values.astype(self._VALUE_DTYPE, copy=False))
+
+    def _row_key(self, state: BasicState) -> bytes:
+        row = np.array([list(state)], dtype=self._occ.dtype)
+        return packed_keys_view(pack_occupations(row)).tolist()[0]
+
+    def _get_index(self) -> Dict[bytes, int]:
+        if self._index is None:
+            self._flush()
+            keys = packed_keys_view(pack_occupations(self._occ)).tolist()
+            self._index = dict(zip(keys, range(len(keys))))
+        return self._index
+
+    def _find(self, state: BasicState) -> Optional[int]:
+        if self._occ is None or state.m != self.m:
+            return None
+        if state.n and max(state) > np.iinfo(self._occ.dtype).max:
+            return None
+        return self._get_index().get(self._row_key(state))
+
+    def _read(self, idx: int):
+        if idx < len(self._values):
+            return self._values[idx].item()
+        return self._new_values[idx - len(self._values)]
+
+    # Mapping API
+    @property
+    def m(self) -> Optional[int]:
+        return None if self._occ is None else self._occ.shape[1]
+
+    @property
+    def state_array(self) -> BasicStateArray:
+        r"""All the states, as a lazy `BasicStateArray`"""
+        self._flush()
+        if self._occ is None:
+            return BasicStateArray(np.zeros((0, 0), dtype=np.uint8))
+        return BasicStateArray(self._occ)
+
+    @property
+    def value_array(self) -> np.ndarray:
+        r"""All the values, indexed the same way as `state_array`"""
+        self._flush()
+        return self._values
+
+    def __len__(self) -> int:
+        if self._chunks:
+            self._flush()
+        return len(self._values) + len(self._new_values)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __contains__(self, state) -> bool:
+        return isinstance(state, BasicState) and self._find(state) is not None
+
+    def __getitem__(self, state: BasicState):
+        assert isinstance(state, BasicState), "Keys must be BasicStates"
+        idx = self._find(state)
+        return self._VALUE_DTYPE(0).item() if idx is None else self._read(idx)
+
+    def get(self, state: BasicState, default=None):
+        idx = self._find(state)
+        return default if idx is None else self._read(idx)
+
+    def __setitem__(self, state: BasicState, value):
+        assert isinstance(state, BasicState), "Keys must be BasicStates"
+        assert not state.has_annotations, "Annotated states cannot be stored in a compact distribution"
+        if self._occ is None:
+            self._occ = np.zeros((0, state.m), dtype=np.uint8)
+        assert state.m == self.m, f"Invalid state size ({state.m}), expected {self.m}"
+        row = list(state)
+        if state.n:
+            self._ensure_dtype(max(row))
+        idx = self._get_index().get(self._row_key(state))
+        if idx is None:
+            self._index[self._row_key(state)] = len(self)
+            self._new_rows.append(row)
+            self._new_values.append(value)
+        elif idx < len(self._values):
+            self._values[idx] = value
+        else:
+            self._new_values[idx - len(self._values)] = value
+
+    def __iter__(self) -> Iterator[BasicState]:
+        return iter(self.state_array)
+
+    def keys(self) -> Iterator[BasicState]:
+        return iter(self)
+
+    def values(self) -> list:
+        return self.value_array.tolist()
+
+    def items(self) -> Iterator[Tuple[BasicState, complex]]:
+        return zip(self.state_array, self.value_array.tolist())
+
+    def __copy__(self):
+        self._flush()
+        result = type(self)()
+        if self._occ is not None:
+            result._set_arrays(self._occ.copy(), self._values.copy())
+        return result
+
+    # Vectorized operations
+    def consolidate(self):
+        r"""Merge all pending insertions into the state and value arrays, summing the values of duplicated states. The
+        order of the states is not specified."""
+        self._flush()
+
+    def accumulate(self, other: _CompactMapping, factor: complex = 1):
+        r"""Add `factor` times the values of another compact mapping to this one (in place)
+
+        Additions are buffered and duplicated states are merged all at once on next access, so that accumulating many
+        mappings costs a single sort.
+
+        :param other: the compact mapping to add, defined on the same number of modes
+        :param factor: a multiplying factor applied to the values of `other`
+        """
+        other._flush()
+        if other._occ is None or not len(other._values):
+            return
+        self._flush_new_rows()
+        if self._occ is None:
+            self._occ = np.zeros((0, other.m), dtype=other._occ.dtype)
+        assert other.m == self.m, "Mode count mismatch"
+        self._chunks.append((other._occ, other._values * factor))
+        self._index = None
+
+    def _select(self, selection: np.ndarray):
+        self._flush()
+        if self._occ is not None:
+            self._set_arrays(self._occ[selection], self._values[selection])
+
+    def prune(self, threshold: float):
+        r"""Remove (in place) every state whose value modulus is lower or equal to a threshold"""
+        self._flush()
+        self._select(np.abs(self._values) > threshold)
+
+    def top_k(self, k: int):
+        r"""Return a new compact mapping containing the `k` states having the highest value modulus, sorted in
+        decreasing order"""
+        values = self.value_array
+        order = np.argsort(-np.abs(values), kind="stable")[:k]
+        result = type(self)()
+        if self._occ is not None:
+            result._set_arrays(self._occ[order], values[order])
+        return result
+
+    def __str__(self):
+        return "{\n  " + "\n  ".join([f"{k}: {v}" for k, v in self.items()]) + "\n}"
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class CompactBSDistribution(_CompactMapping):
+    r"""Array-backed equivalent of `BSDistribution`, suitable for distributions of millions of states.
+
+    It exposes the same mapping API and can be converted from and to a `BSDistribution`. Normalization, thresholding,
+    top-k selection, accumulation and tensor products all run as NumPy operations.
+
+    :param states: output states, as a `BasicStateArray` or a (count x m) occupation matrix
+    :param probs: probability of each state
+    """
+
+    def __init__(self, states: Union[BasicStateArray, np.ndarray, None] = None, probs: np.ndarray = None):
+        super().__init__(states, probs)
+
+    @staticmethod
+    def from_bsd(bsd: BSDistribution) -> CompactBSDistribution:
+        return CompactBSDistribution._from_mapping(bsd)
+
+    def to_bsd(self) -> BSDistribution:
+        return self._to_mapping(BSDistribution())
+
+    def add(self, obj: BasicState, proba: float):
+        if proba > global_params['min_p']:
+            self[obj] += proba
+
+    def normalize(self):
+        values = self.value_array
+        sum_probs = values.sum()
+        if sum_probs == 0:
+            warnings.warn("Unable to normalize a distribution with only null probabilities")
+            return
+        values /= sum_probs
+
+    def sample(self, count: int, non_null: bool = True) -> BSSamples:
+        r""" Samples basic states from the `CompactBSDistribution`
+
+        :param count: number of samples to draw
+        :param non_null: excludes null states from the sample generation
+        :return: a list of :math:`count` samples
+        """
+        states = self.state_array
+        probs = self.value_array
+        if non_null:
+            probs = np.where(states.n != 0, probs, 0)
+        return AliasSampler(states, probs).sample(count)
+
+    def __mul__(self, other):
+        return CompactBSDistribution.tensor_product(self, other)
+
+    @staticmethod
+    def tensor_product(bsd1: CompactBSDistribution, bsd2: CompactBSDistribution, merge_modes: bool = False,
+                       prob_threshold: float = 0) -> CompactBSDistribution:
+        r"""Vectorized tensor product of two compact distributions
+
+        :param bsd1: first distribution
+        :param bsd2: second distribution
+        :param merge_modes: if True, occupations of both states are summed mode by mode (both distributions have to be
+            defined on the same modes), otherwise states are concatenated
+        :param prob_threshold: state pairs having a joint probability lower than this threshold are discarded
+        """
+        if len(bsd1) == 0:
+            return bsd2
+        occ1, occ2 = bsd1.state_array.occupations, bsd2.state_array.occupations
+        probs1, probs2 = bsd1.value_array, bsd2.value_array
+        if prob_threshold > 0 and len(probs1) and len(probs2):
+            # Discard the states which cannot reach the threshold with any other state
+            keep1 = probs1 * probs2.max() >= prob_threshold
+            keep2 = probs2 * probs1.max() >= prob_threshold
+            occ1, probs1, occ2, probs2 = occ1[keep1], probs1[keep1], occ2[keep2], probs2[keep2]
+        n_max = (int(occ1.max()) if occ1.size else 0) + (int(occ2.max()) if occ2.size else 0)
+        dtype = _occupation_dtype(n_max)
+        result = CompactBSDistribution()
+        # Process bsd1 by blocks, so that the joint probability matrix never exceeds _PRODUCT_BLOCK_SIZE elements
+        block_rows = max(1, _PRODUCT_BLOCK_SIZE // max(1, len(probs2)))
+        for start in range(0, len(probs1), block_rows):
+            joint_probs = np.outer(probs1[start:start + block_rows], probs2)
+            i1, i2 = np.nonzero(joint_probs >= prob_threshold)
+            block_occ1 = occ1[start + i1].astype(dtype, copy=False)
+            if merge_modes:
+                occupations = block_occ1 + occ2[i2]
+            else:
+                occupations = np.concatenate([block_occ1, occ2[i2].astype(dtype, copy=False)], axis=1)
+            result.accumulate(CompactBSDistribution(occupations, joint_probs[i1, i2]))
+        return result
+
+
+class CompactStateVector(_CompactMapping):
+    r"""Array-backed equivalent of a `StateVector` of non-annotated basic states
+
+    :param states: basic states, as a `BasicStateArray` or a (count x m) occupation matrix
+    :param amplitudes: probability amplitude of each state
+    """
+    _VALUE_DTYPE = np.complex128
+
+    def __init__(self, states: Union[BasicStateArray, np.ndarray, None] = None, amplitudes: np.ndarray = None):
+        super().__init__(states, amplitudes)
+
+    @staticmethod
+    def from_sv(sv: StateVector) -> CompactStateVector:
+        return CompactStateVector._from_mapping(sv)
+
+    def to_sv(self) -> StateVector:
+        sv = StateVector()
+        for state, pa in self.items():
+            sv[state] = pa
+        return sv
+
+    def normalize(self):
+        r"""Remove negligible components and normalize the remaining amplitudes"""
+        self._flush()
+        moduli = np.abs(self._values)
+        # Same rule as StateVector.normalize: a component equal to the threshold is kept
+        self._select((moduli >= global_params["min_complex_component"]) & (moduli > 0))
+        norm = np.linalg.norm(self._values)
+        if norm:
+            self._values /= norm
+
+    def to_probabilities(self) -> CompactBSDistribution:
+        r"""Compute the distribution of output probabilities, i.e. the squared modulus of the amplitudes"""
+        self._flush()
+        if self._occ is None:
+            return CompactBSDistribution()
+        return CompactBSDistribution(self._occ, np.abs(self._values) ** 2)
@@ -27,7 +27,11 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+from collections import Counter
+
 from .statevector import BSDistribution, BSCount, BSSamples
+from .compact_distribution import CompactBSDistribution
+from .alias_sampler import AliasSampler
 
 import numpy as np
 
@@ -35,9 +39,8 @@ import numpy as np
 # Conversion functions (samples <=> probs <=> sample_count)
 def samples_to_sample_count(sample_list: BSSamples) -> BSCount:
     results = BSCount()
-    for s in sample_list:
-        if s not in results:
-            results[s] = sample_list.count(s)
+    for s, count in Counter(sample_list).items():
+        results[s] = count
     return results
 
 
@@ -46,16 +49,24 @@ def samples_to_probs(sample_list: BSSamples) -> BSDistribution:
 
 
 def probs_to_sample_count(probs: BSDistribution, count: int) -> BSCount:
-    perturbed_dist = {state: max(prob + np.random.normal(scale=(prob * (1 - prob) / count) ** .5), 0)
-                      for state, prob in probs.items()}
-    prob_sum = sum(prob for prob in perturbed_dist.values())
-    if prob_sum == 0:
-        return samples_to_sample_count(probs_to_samples(probs, count))
-    fac = 1 / prob_sum
-    perturbed_dist = {key: fac * prob for key, prob in perturbed_dist.items()}  # Renormalisation
+    r"""Draw the counts of `count` samples from a distribution, in a single multinomial draw
+
+    :param probs: the distribution (a `BSDistribution` or a `CompactBSDistribution`), not necessarily normalized
+    :param count: number of samples
+    """
+    if isinstance(probs, CompactBSDistribution):
+        states = probs.state_array
+        prob_array = probs.value_array
+    else:
+        states = list(probs.keys())
+        prob_array = np.fromiter(probs.values(), dtype=float, count=len(states))
+    prob_sum = prob_array.sum()
     results = BSCount()
-    for state in perturbed_dist:
-        results.add(state, int(np.round(perturbed_dist[state] * count)))
+    if prob_sum == 0:
+        return results
+    counts = np.random.multinomial(count, prob_array / prob_sum)
+    for idx in np.flatnonzero(counts).tolist():
+        results[states[idx]] = int(counts[idx])
     return results
 
 
@@ -78,4 +89,4 @@ def sample_count_to_probs(sample_count: BSCount) -> BSDistribution:
 def sample_count_to_samples(sample_count: BSCount, count: int=None) -> BSSamples:
     if count is None:
         count = sum([v for v in sample_count.values()])
-    return sample_count_to_probs(sample_count).sample(count)
+    return AliasSampler.from_distribution(sample_count).sample(count)
@@ -110,7 +110,7 @@ class Matrix(ABC):
         """
         if use_symbolic:
             return MatrixS(sp.zeros(rows=shape[0], cols=shape[1]))
-        return MatrixN(np.zeros(shape))
+        return np.zeros(shape, dtype=complex).view(MatrixN)
 
     def is_square(self) -> bool:
         return len(self.shape) == 2 and self.shape[0] == self.shape[1]
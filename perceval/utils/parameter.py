@@ -46,6 +46,7 @@ class Parameter:
     :param is_expression: for symbolic parameter, the value is an expression to evaluate with context values
     """
     _id = 0
+    _last_version = 0  # Version given to the last change of any parameter
 
     def __init__(self, name: str, value: float = None,
                  min_v: float = None, max_v: float = None, periodic=True,
@@ -71,8 +72,27 @@ class Parameter:
         self._periodic = periodic
         self._pid = Parameter._id
         self._is_expression = is_expression
+        self._version = Parameter._new_version()
         Parameter._id += 1
 
+    @staticmethod
+    def _new_version() -> int:
+        Parameter._last_version += 1
+        return Parameter._last_version
+
+    @staticmethod
+    def last_version() -> int:
+        r"""Version of the last change of any parameter (or circuit structure): as long as it stays the same, nothing
+        has changed
+        """
+        return Parameter._last_version
+
+    @property
+    def version(self) -> int:
+        r"""Version of the parameter value, which grows each time the value changes
+        """
+        return self._version
+
     @property
     def spv(self) -> sp.Expr:
         r"""The current value of the parameter defined as a sympy expression
@@ -130,7 +150,9 @@ class Parameter:
         v = self._check_value(v, self._min, self._max, self._periodic)
         if self.fixed and not force:
             raise RuntimeError("cannot set fixed parameter", v, self._value)
-        self._value = v
+        if v != self._value:
+            self._value = v
+            self._version = Parameter._new_version()
 
     def fix_value(self, v):
         r"""Fix the value of a non-fixed parameter
@@ -139,11 +161,13 @@ class Parameter:
         """
         self._symbol = None
         self._value = self._check_value(v, self._min, self._max, self._periodic)
+        self._version = Parameter._new_version()
 
     def reset(self):
         r"""Reset the value of a non-fixed parameter"""
-        if self._symbol:
+        if self._symbol and self._value is not None:
             self._value = None
+            self._version = Parameter._new_version()
 
     @property
     def defined(self) -> bool:
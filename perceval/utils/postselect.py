@@ -31,6 +31,7 @@ from perceval.utils.statevector import BasicState
 
 import json
 import re
+import numpy as np
 from typing import Callable, List
 
 
@@ -52,6 +53,7 @@ class PostSelect:
     """
 
     _OPERATOR = {"==": int.__eq__, "<": int.__lt__, ">": int.__gt__}
+    _NP_OPERATOR = {int.__eq__: np.equal, int.__lt__: np.less, int.__gt__: np.greater}
     _PATTERN = re.compile(r"(\[[,0-9\s]+\]\s*)(==|<|>)\s*(\d+\b)")
 
     def __init__(self, str_repr: str = None):
@@ -104,6 +106,19 @@ class PostSelect:
                     return False
         return True
 
+    def select(self, occupations: np.ndarray) -> np.ndarray:
+        """Vectorized version of the post-selection, applied to every row of an occupation matrix.
+
+        :param occupations: a (count x m) occupation matrix (see `BasicStateArray`)
+        :return: a boolean vector, `True` for each row validating all conditions
+        """
+        result = np.ones(occupations.shape[0], dtype=bool)
+        for operator, cond in self._conditions.items():
+            for indexes, value in cond:
+                s = occupations[:, list(indexes)].sum(axis=1, dtype=np.int64)
+                result &= self._NP_OPERATOR[operator](s, value)
+        return result
+
     def __repr__(self):
         strlist = []
         for operator, cond in self._conditions.items():
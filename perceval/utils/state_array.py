@@ -0,0 +1,198 @@
+# MIT License
+#
+# Copyright (c) 2022 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# As a special exception, the copyright holders of exqalibur library give you
+# permission to combine exqalibur with code included in the standard release of
+# Perceval under the MIT license (or modified versions of such code). You may
+# copy and distribute such a combined system following the terms of the MIT
+# license for both exqalibur and Perceval. This exception for the usage of
+# exqalibur is limited to the python bindings used by Perceval.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+from math import factorial
+from typing import Iterable, Iterator, Union
+
+import numpy as np
+from exqalibur import FSArray
+
+from .statevector import BasicState
+
+
+def _occupation_dtype(n: int):
+    return np.uint8 if n < 256 else np.uint16
+
+
+def fock_space_occupations(m: int, n: int) -> np.ndarray:
+    r"""Build the occupation matrix of every Fock state of n photons in m modes
+
+    Rows follow the same order as the states of a non masked `FSArray(m, n)`, so that row `i` is the i-th state of
+    the array. The matrix is built by dynamic programming on the number of modes, without creating any Fock state
+    object.
+
+    :param m: number of modes
+    :param n: number of photons
+    :return: a (count x m) occupation matrix
+    """
+    dtype = _occupation_dtype(n)
+    if m == 0:
+        return np.zeros((1 if n == 0 else 0, 0), dtype=dtype)
+    tables = [np.array([[k]], dtype=dtype) for k in range(n + 1)]  # tables[k]: states of k photons in j modes
+    for j in range(2, m + 1):
+        new_tables = []
+        for k in range(n + 1):
+            blocks = []
+            for first in range(k, -1, -1):
+                sub = tables[k - first]
+                block = np.empty((sub.shape[0], j), dtype=dtype)
+                block[:, 0] = first
+                block[:, 1:] = sub
+                blocks.append(block)
+            new_tables.append(np.concatenate(blocks))
+        tables = new_tables
+    return tables[n]
+
+
+def prodnfact_array(occupations: np.ndarray) -> np.ndarray:
+    r"""Vectorized version of `BasicState.prodnfact` over the rows of an occupation matrix
+
+    :param occupations: a (count x m) occupation matrix
+    :return: a float64 vector containing the product of the factorials of the occupation numbers of each row
+    """
+    max_occ = int(occupations.max()) if occupations.size else 0
+    factorials = np.array([factorial(k) for k in range(max_occ + 1)], dtype=np.float64)
+    return np.prod(factorials[occupations], axis=1)
+
+
+def pack_occupations(occupations: np.ndarray) -> np.ndarray:
+    r"""Pack each row of an occupation matrix into integer keys
+
+    Each mode is given as many bits as the occupation dtype (8 or 16), and the modes are packed into as few 64-bit words
+    as possible. Two rows are equal if and only if their packed keys are equal, which makes keys suitable for hashing,
+    sorting and `np.unique`.
+
+    :param occupations: a (count x m) occupation matrix
+    :return: a (count x words) uint64 matrix, words being 1 for up to 8 (resp. 4) modes with uint8 (resp. uint16)
+        occupations
+    """
+    bits = 8 * occupations.dtype.itemsize
+    modes_per_word = 64 // bits
+    count, m = occupations.shape
+    words = max(1, -(-m // modes_per_word))
+    padded = np.zeros((count, words * modes_per_word), dtype=np.uint64)
+    padded[:, :m] = occupations
+    shifts = (np.arange(modes_per_word, dtype=np.uint64) * np.uint64(bits))
+    return np.bitwise_or.reduce(padded.reshape(count, words, modes_per_word) << shifts, axis=2)
+
+
+def packed_keys_view(keys: np.ndarray) -> np.ndarray:
+    r"""View a (count x words) packed key matrix as a 1-D array of opaque scalars, usable in `np.unique` or as
+    dictionary keys (through `tolist()`)"""
+    keys = np.ascontiguousarray(keys)
+    return keys.view(np.dtype((np.void, keys.dtype.itemsize * keys.shape[1]))).ravel()
+
+
+class BasicStateArray:
+    r"""Compact and lazy sequence of non-annotated basic states sharing the same number of modes.
+
+    States are stored as the rows of a 2-D occupation matrix, and `BasicState` objects are only built when accessed.
+
+    :param occupations: a (count x m) occupation matrix
+    """
+
+    def __init__(self, occupations: np.ndarray):
+        occupations = np.asarray(occupations)
+        assert occupations.ndim == 2, "Occupations must be a 2-D array"
+        self._occupations = occupations
+
+    @staticmethod
+    def from_fsarray(fsa: FSArray, masked: bool = False) -> BasicStateArray:
+        r"""Build the occupation matrix of an `FSArray`, preserving its state order
+
+        :param fsa: the Fock state array
+        :param masked: has to be True when `fsa` was built with a mask; states are then read one by one from `fsa`
+        """
+        if not masked:
+            return BasicStateArray(fock_space_occupations(fsa.m, fsa.n))
+        return BasicStateArray.from_states(fsa, fsa.m)
+
+    @staticmethod
+    def from_states(states: Iterable[BasicState], m: int = None) -> BasicStateArray:
+        r"""Build a state array from an iterable of non-annotated basic states
+
+        :param states: the basic states
+        :param m: the number of modes, required if `states` is empty
+        """
+        states = list(states)
+        if states:
+            m = states[0].m
+        assert m is not None, "Mode count is required to build an empty state array"
+        if not states or m == 0:
+            return BasicStateArray(np.zeros((len(states), m), dtype=np.uint8))
+        # Samples repeat the same states many times: each distinct state is only converted once
+        index = {}
+        rows = [index.setdefault(state, len(index)) for state in states]
+        if any(state.has_annotations for state in index):
+            raise ValueError("Annotated states cannot be stored in a state array")
+        unique = np.array([list(state) for state in index], dtype=np.uint16).reshape(len(index), m)
+        n_max = int(unique.max())
+        return BasicStateArray(unique.astype(_occupation_dtype(n_max), copy=False)[rows])
+
+    @property
+    def occupations(self) -> np.ndarray:
+        return self._occupations
+
+    @property
+    def m(self) -> int:
+        return self._occupations.shape[1]
+
+    @property
+    def n(self) -> np.ndarray:
+        r"""Photon count of each state"""
+        return self._occupations.sum(axis=1, dtype=np.int64)
+
+    def prodnfact(self) -> np.ndarray:
+        return prodnfact_array(self._occupations)
+
+    def packed_keys(self) -> np.ndarray:
+        r"""Hashable/sortable key of each state, see `pack_occupations`"""
+        return packed_keys_view(pack_occupations(self._occupations))
+
+    def __len__(self) -> int:
+        return self._occupations.shape[0]
+
+    def __getitem__(self, key) -> Union[BasicState, BasicStateArray]:
+        if isinstance(key, (int, np.integer)):
+            return BasicState(self._occupations[key].tolist())
+        return BasicStateArray(self._occupations[key])
+
+    def __iter__(self) -> Iterator[BasicState]:
+        for row in self._occupations.tolist():
+            yield BasicState(row)
+
+    def __str__(self):
+        sz = len(self)
+        n_to_display = min(sz, 10)
+        s = '[' + ', '.join([str(bs) for bs in self[:n_to_display]])
+        if sz > n_to_display:
+            s += f', ... (size={sz})'
+        return s + ']'
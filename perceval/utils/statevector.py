@@ -290,10 +290,9 @@ class StateVector(defaultdict):
         :param shots: the number of samples
         :return: a list of BasicState
         """
+        from .alias_sampler import AliasSampler  # Avoids a circular import
         self.normalize()
-        weight = [abs(self[key])**2 for key in self.keys()]
-        rng = np.random.default_rng()
-        return [BasicState(x) for x in rng.choice(list(self.keys()), shots, p=weight)]
+        return list(AliasSampler.from_distribution(self, non_null=False).sample(shots))
 
     def measure(self, modes: Union[int, List[int]]) -> Dict[BasicState, Tuple[float, StateVector]]:
         r"""perform a measure on one or multiple modes and collapse the remaining statevector. The resulting
@@ -482,15 +481,9 @@ class SVDistribution(ProbabilityDistribution):
         :param count: number of samples to draw
         :return: a list of :math:`count` samples
         """
+        from .alias_sampler import AliasSampler  # Avoids a circular import
         self.normalize()
-        d = self
-        if non_null:
-            d = {sv: p for sv, p in self.items() if max(sv.n) != 0}
-        states = list(d.keys())
-        probs = list(d.values())
-        rng = np.random.default_rng()
-        results = rng.choice(states, count, p=np.array(probs) / sum(probs))
-        return list(results)
+        return AliasSampler.from_distribution(self, non_null).sample(count)
 
 
 @dispatch(StateVector, annot_tag=str)
@@ -520,6 +513,7 @@ def anonymize_annotations(svd: SVDistribution, annot_tag: str = "a"):
 
 
 class BSDistribution(ProbabilityDistribution):
+    _VECTORIZED_PRODUCT_MIN_PAIRS = 256  # Under this size, the conversion to arrays costs more than a Python loop
 
     def __init__(self, d: Optional[BasicState, Dict] = None):
         super().__init__()
@@ -546,28 +540,29 @@ class BSDistribution(ProbabilityDistribution):
         :param count: number of samples to draw
         :return: a list of :math:`count` samples
         """
+        from .alias_sampler import AliasSampler  # Avoids a circular import
         self.normalize()
-        d = self
-        if non_null:
-            d = {bs: p for bs, p in self.items() if bs.n != 0}
-        states = list(d.keys())
-        probs = list(d.values())
-        rng = np.random.default_rng()
-        results = rng.choice(states, count, p=probs)
-        # numpy transforms iterables of ints to a nparray in rng.choice call
-        # Thus, we need to convert back the results to BasicStates
-        output = BSSamples()
-        for s in results:
-            output.append(BasicState(s))
-        return output
+        return AliasSampler.from_distribution(self, non_null).sample(count)
 
     def __mul__(self, other):
         return BSDistribution.tensor_product(self, other)
 
     @staticmethod
     def tensor_product(bsd1, bsd2, merge_modes: bool = False, prob_threshold: float = 0):
+        r"""Tensor product of two distributions
+
+        :param bsd1: first distribution
+        :param bsd2: second distribution
+        :param merge_modes: if True, both distributions are defined on the same modes and photon counts are summed mode
+            by mode (`BasicState.merge`), otherwise states are concatenated
+        :param prob_threshold: state pairs having a joint probability lower than this threshold are discarded
+        """
         if len(bsd1) == 0:
             return bsd2
+        if len(bsd1) * len(bsd2) >= BSDistribution._VECTORIZED_PRODUCT_MIN_PAIRS:
+            new_dist = BSDistribution._vectorized_tensor_product(bsd1, bsd2, merge_modes, prob_threshold)
+            if new_dist is not None:
+                return new_dist
         new_dist = BSDistribution()
         for bs1, proba1 in bsd1.items():
             for bs2, proba2 in bsd2.items():
@@ -580,6 +575,27 @@ class BSDistribution(ProbabilityDistribution):
                 new_dist[bs] += proba1 * proba2
         return new_dist
 
+    @staticmethod
+    def _vectorized_tensor_product(bsd1, bsd2, merge_modes: bool, prob_threshold: float):
+        # Broadcasts occupation arrays, then merges duplicated states with a single sort (see CompactBSDistribution)
+        # Returns None when the distributions cannot be stored as arrays (annotated states)
+        from .compact_distribution import CompactBSDistribution  # Avoids a circular import
+        if prob_threshold > 0:
+            # States which cannot reach the threshold with any other state are not worth converting
+            max_p1 = max(bsd1.values())
+            max_p2 = max(bsd2.values())
+            bsd1 = {bs: p for bs, p in bsd1.items() if p * max_p2 >= prob_threshold}
+            bsd2 = {bs: p for bs, p in bsd2.items() if p * max_p1 >= prob_threshold}
+            if not bsd1 or not bsd2:
+                return BSDistribution()
+        try:
+            compact1 = CompactBSDistribution.from_bsd(bsd1)
+            compact2 = CompactBSDistribution.from_bsd(bsd2)
+        except ValueError:
+            return None
+        result = CompactBSDistribution.tensor_product(compact1, compact2, merge_modes, prob_threshold)
+        return result.to_bsd()
+
 
 class BSCount(defaultdict):
     def __init__(self, d: Optional[Dict] = None):
@@ -0,0 +1,92 @@
+# MIT License
+#
+# Copyright (c) 2022 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# As a special exception, the copyright holders of exqalibur library give you
+# permission to combine exqalibur with code included in the standard release of
+# Perceval under the MIT license (or modified versions of such code). You may
+# copy and distribute such a combined system following the terms of the MIT
+# license for both exqalibur and Perceval. This exception for the usage of
+# exqalibur is limited to the python bindings used by Perceval.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import numpy as np
+import pytest
+
+import perceval as pcvl
+from perceval.utils import AliasSampler, BasicState, BasicStateArray, BSCount, BSDistribution, BSSamples
+from perceval.utils.conversion import sample_count_to_samples
+
+
+def test_alias_sampler_frequencies():
+    weights = np.random.random(50)
+    weights[3] = 0
+    sampler = AliasSampler(list(range(50)), weights)
+    indices = sampler.sample_indices(400000)
+    assert indices.min() >= 0 and indices.max() < 50
+    frequencies = np.bincount(indices, minlength=50) / len(indices)
+    assert frequencies[3] == 0
+    np.testing.assert_allclose(frequencies, weights / weights.sum(), atol=3e-3)
+
+
+def test_alias_sampler_single_state():
+    sampler = AliasSampler(["a"], [2])
+    assert sampler.sample(5) == ["a"] * 5
+    with pytest.raises(AssertionError):
+        AliasSampler(["a", "b"], [0, 0])
+
+
+def test_alias_sampler_from_distribution():
+    bsd = BSDistribution()
+    bsd[BasicState([0, 0])] = 0.5
+    bsd[BasicState([1, 0])] = 0.25
+    bsd[BasicState([0, 2])] = 0.25
+    sampler = AliasSampler.from_distribution(bsd)
+    assert len(sampler) == 2
+    samples = sampler.sample(1000)
+    assert isinstance(samples, BSSamples)
+    assert BasicState([0, 0]) not in samples
+    assert 400 < samples.count(BasicState([1, 0])) < 600
+
+    occupations = sampler.sample_occupations(1000)
+    assert isinstance(occupations, BasicStateArray)
+    assert occupations.occupations.shape == (1000, 2)
+    assert set(map(tuple, occupations.occupations.tolist())) == {(1, 0), (0, 2)}
+
+
+def test_alias_sampler_state_array():
+    states = BasicStateArray(np.array([[1, 0], [0, 1]], dtype=np.uint8))
+    sampler = AliasSampler(states, [0, 1])
+    assert sampler.sample(3) == [BasicState([0, 1])] * 3
+
+
+def test_alias_sampler_seed():
+    sampler = AliasSampler(list(range(10)), np.arange(10))
+    pcvl.random_seed(7)
+    first = sampler.sample_indices(100)
+    pcvl.random_seed(7)
+    assert (sampler.sample_indices(100) == first).all()
+
+
+def test_sample_count_to_samples():
+    counts = BSCount({BasicState([1, 0]): 30, BasicState([0, 1]): 10})
+    samples = sample_count_to_samples(counts)
+    assert len(samples) == 40
+    assert set(samples) == {BasicState([1, 0]), BasicState([0, 1])}
@@ -30,9 +30,9 @@ import warnings
 from math import sqrt
 
 from perceval.backends import Clifford2017Backend, NaiveBackend, AProbAmpliBackend, SLOSBackend, MPSBackend,\
-    BackendFactory
-from perceval.components import BS, PS, Circuit
-from perceval.utils import BSCount, BasicState, Parameter, StateVector
+    BackendFactory, SLOSPathCache
+from perceval.components import BS, PS, Circuit, Unitary
+from perceval.utils import BSCount, BasicState, Parameter, StateVector, Matrix, allstate_iterator, BasicStateArray
 import pytest
 import numpy as np
 
@@ -63,7 +63,6 @@ def _assert_cnot(backend: AProbAmpliBackend):
     assert pytest.approx(backend.probability(BasicState([0, 0, 1, 1, 0, 0]))) == 1 / 9
 
 
-
 def test_clifford_bs():
     cliff_bs = Clifford2017Backend()
     cliff_bs.set_circuit(BS.H())
@@ -75,6 +74,25 @@ def test_clifford_bs():
     assert 4750 < counts[BasicState("|1,0>")] < 5250
 
 
+def test_clifford_sample_many():
+    u = Matrix.random_unitary(4)
+    slos = SLOSBackend()
+    slos.set_circuit(Unitary(u))
+    cliff_bs = Clifford2017Backend()
+    cliff_bs.set_circuit(Unitary(u))
+    count = 20000
+    for input_state in [BasicState([0, 0, 0, 0]), BasicState([0, 1, 0, 0]), BasicState([1, 0, 2, 0]),
+                        BasicState([1, 1, 1, 0])]:
+        slos.set_input_state(input_state)
+        cliff_bs.set_input_state(input_state)
+        samples = cliff_bs.sample_many(count)
+        assert samples.shape == (count, 4)
+        assert (samples.sum(axis=1) == input_state.n).all()
+        rows, counts = np.unique(samples, axis=0, return_counts=True)
+        for row, state_count in zip(rows, counts):
+            assert pytest.approx(slos.probability(BasicState(list(row))), abs=0.02) == state_count / count
+
+
 def check_output_distribution(backend: AProbAmpliBackend, input_state: BasicState, expected: dict):
     backend.set_input_state(input_state)
     prob_list = []
@@ -196,6 +214,186 @@ def test_slos_cnot_with_mask():
     assert pytest.approx(non_post_selected_probability) == 0
 
 
+def test_slos_prob_vector():
+    cnot = _cnot_circuit()
+    for slos in [SLOSBackend(), SLOSBackend(n=2, mask=["0    0"])]:
+        slos.set_circuit(cnot)
+        slos.set_input_state(BasicState([0, 1, 0, 1, 0, 0]))
+        probs, states = slos.prob_vector()
+        assert len(probs) == len(states)
+        assert pytest.approx(sum(probs)) == sum(slos.prob_distribution().values())
+        for idx, state in enumerate(states):
+            assert pytest.approx(probs[idx]) == slos.probability(state)
+
+
+def test_slos_batch_prob_vector():
+    cnot = _cnot_circuit()
+    input_states = [BasicState([0, 1, 0, 1, 0, 0]), BasicState([0, 0, 1, 0, 1, 0])]
+    unitaries = np.array([np.asarray(Matrix.random_unitary(6)) for _ in range(3)])
+    for mask in [None, ["0    0"]]:
+        slos = SLOSBackend(n=2, mask=mask)
+        slos.set_circuit(cnot)
+        res = slos.batch_prob_vector(unitaries, input_states)
+        for k, u in enumerate(unitaries):
+            reference = SLOSBackend(n=2, mask=mask)
+            reference.set_circuit(Unitary(Matrix(u)))
+            for input_state in input_states:
+                reference.set_input_state(input_state)
+                expected_probs, expected_states = reference.prob_vector()
+                probs, states = res[input_state]
+                assert np.allclose(probs[k], expected_probs)
+                assert np.array_equal(states.occupations, expected_states.occupations)
+        slos.set_input_state(input_states[0])  # The circuit unitary is untouched
+        assert slos.probability(BasicState([0, 1, 0, 1, 0, 0])) == pytest.approx(1/9)
+
+
+def test_slos_path_cache(tmp_path):
+    cnot = _cnot_circuit()
+    input_states = [BasicState([0, 1, 0, 1, 0, 0]), BasicState([0, 1, 0, 0, 1, 0]), BasicState([0, 0, 1, 0, 1, 0])]
+    reference = SLOSBackend(n=2, mask=["0    0"])
+    reference.set_circuit(cnot)
+
+    cache = SLOSPathCache(str(tmp_path))
+    for expected_hits in [0, 2]:  # Second run starts from a fresh backend, as a restarted process would
+        slos = SLOSBackend(n=2, mask=["0    0"])
+        slos.set_path_cache(cache)
+        slos.set_circuit(cnot)
+        slos.preprocess(input_states)
+        for input_state in input_states:
+            slos.set_input_state(input_state)
+            reference.set_input_state(input_state)
+            probs, states = slos.prob_vector()
+            expected_probs, expected_states = reference.prob_vector()
+            assert np.allclose(probs, expected_probs)
+            assert np.array_equal(states.occupations, expected_states.occupations)
+        assert cache.stats['hits'] == expected_hits
+    assert cache.stats['misses'] == 2
+
+    small_cache = SLOSPathCache(str(tmp_path), max_size=1)
+    small_cache.store(SLOSPathCache.key("path", "dummy"), np.zeros(4, dtype=np.int32))
+    assert small_cache.stats['evictions'] == 2  # Only the newest entry is kept
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_slos_path_cache_photon_counts(tmp_path):
+    # With the mask "1 1 ", the layer of 2 photons contains 1 state when n=2, but 5 states when n=3
+    circuit = Circuit(4) // (0, BS()) // (2, BS()) // (1, BS())
+    input_state = BasicState([1, 0, 1, 0])
+    cache = SLOSPathCache(str(tmp_path))
+    for n in [2, 3, 2, 3]:
+        reference = SLOSBackend(n=n, mask=["1 1 "])
+        reference.set_circuit(circuit)
+        reference.set_input_state(input_state)
+        slos = SLOSBackend(n=n, mask=["1 1 "])
+        slos.set_path_cache(cache)
+        slos.set_circuit(circuit)
+        slos.set_input_state(input_state)
+        probs, states = slos.prob_vector()
+        expected_probs, expected_states = reference.prob_vector()
+        assert np.allclose(probs, expected_probs)
+        assert np.array_equal(states.occupations, expected_states.occupations)
+
+
+def test_mps_matches_slos():
+    m = 6
+    circuit = Circuit.generic_interferometer(m, lambda i: BS(theta=float(np.random.random()*3))
+                                             // PS(phi=float(np.random.random()*6)), shape="rectangle")
+    mps = MPSBackend()
+    mps.set_cutoff(20)
+    mps.set_circuit(circuit)
+    slos = SLOSBackend()
+    slos.set_circuit(circuit)
+    input_state = BasicState([1, 1, 1, 0, 0, 0])
+    mps.set_input_state(input_state)
+    slos.set_input_state(input_state)
+    for output_state in allstate_iterator(input_state):
+        assert pytest.approx(slos.prob_amplitude(output_state), abs=1e-10) == mps.prob_amplitude(output_state)
+
+
+def test_mps_distribution_and_samples():
+    m = 6
+    circuit = Circuit.generic_interferometer(m, lambda i: BS(theta=float(np.random.random()*3))
+                                             // PS(phi=float(np.random.random()*6)), shape="rectangle")
+    mps = MPSBackend()
+    mps.set_cutoff(20)
+    mps.set_circuit(circuit)
+    slos = SLOSBackend()
+    slos.set_circuit(circuit)
+    input_state = BasicState([1, 0, 1, 0, 1, 0])
+    mps.set_input_state(input_state)
+    slos.set_input_state(input_state)
+    expected = slos.prob_distribution()
+
+    distribution = mps.prob_distribution()
+    assert len(distribution) == len(expected)
+    for state, prob in expected.items():
+        assert pytest.approx(prob, abs=1e-10) == distribution[state]
+    # Pruning only keeps the most likely states
+    probs, states = mps.prob_vector(threshold=0.01)
+    assert (probs > 0.01).all()
+    assert len(states) == len([p for p in expected.values() if p > 0.01])
+
+    count = 20000
+    samples = mps.sample_many(count)
+    assert (samples.sum(axis=1) == 3).all()
+    rows, counts = np.unique(samples, axis=0, return_counts=True)
+    for row, state_count in zip(rows, counts):
+        assert pytest.approx(expected[BasicState(list(row))], abs=0.02) == state_count / count
+    assert mps.sample().n == 3
+
+
+def test_mps_samples_after_parameter_change():
+    theta = Parameter("theta")
+    circuit = Circuit(4) // (0, BS()) // (1, BS(theta=theta)) // (2, BS()) // (1, BS())
+    input_state = BasicState([1, 1, 0, 2])
+    mps = MPSBackend()
+    mps.set_cutoff(20)
+    slos = SLOSBackend()
+    # With theta=0, the middle beam splitter does not entangle modes 1 and 2: the environments computed for the first
+    # compilation are wrong for the second one
+    for value in [0, 2.0]:
+        theta.set_value(value)
+        mps.set_circuit(circuit)
+        mps.set_input_state(input_state)
+        slos.set_circuit(circuit)
+        slos.set_input_state(input_state)
+        expected = slos.prob_distribution()
+        count = 20000
+        rows, counts = np.unique(mps.sample_many(count), axis=0, return_counts=True)
+        for row, state_count in zip(rows, counts):
+            assert pytest.approx(expected[BasicState(list(row))], abs=0.02) == state_count / count
+        probs, states = mps.prob_vector()
+        for state, prob in zip(states, probs):
+            assert pytest.approx(expected[state], abs=1e-10) == prob
+
+
+def test_prob_amplitudes_batch():
+    m = 5
+    circuit = Unitary(Matrix.random_unitary(m))
+    input_state = BasicState([1, 0, 2, 0, 1])
+    output_states = list(allstate_iterator(input_state))
+    for backend in [NaiveBackend(), NaiveBackend(n_threads=2), MPSBackend(), SLOSBackend()]:
+        if isinstance(backend, MPSBackend):
+            circuit = Circuit.generic_interferometer(m, lambda i: BS(theta=float(np.random.random()*3))
+                                                     // PS(phi=float(np.random.random()*6)), shape="rectangle")
+            input_state = BasicState([1, 0, 1, 0, 1])
+            output_states = list(allstate_iterator(input_state))
+            backend.set_cutoff(20)
+        backend.set_circuit(circuit)
+        backend.set_input_state(input_state)
+        expected = np.array([backend.prob_amplitude(output_state) for output_state in output_states])
+        np.testing.assert_allclose(backend.prob_amplitudes(output_states), expected, atol=1e-12)
+        state_array = BasicStateArray.from_states(output_states)
+        np.testing.assert_allclose(backend.prob_amplitudes(state_array), expected, atol=1e-12)
+        np.testing.assert_allclose(backend.prob_amplitudes(state_array.occupations), expected, atol=1e-12)
+        assert len(backend.prob_amplitudes([])) == 0
+
+    backend = NaiveBackend()
+    backend.set_circuit(circuit)
+    backend.set_input_state(input_state)
+    assert backend.prob_amplitudes(np.array([[1, 0, 0, 0, 0]]))[0] == 0  # Photon count mismatch
+
+
 def test_probampli_backends():
     for backend_type in [NaiveBackend, SLOSBackend, MPSBackend]:
         backend = backend_type()
@@ -28,6 +28,7 @@
 # SOFTWARE.
 
 import pytest
+import random
 from pathlib import Path
 
 from perceval import Circuit, P, BasicState, pdisplay, Matrix, BackendFactory, Processor
@@ -228,6 +229,40 @@ def test_unitary_inverse():
     assert np.allclose(u1.U, u2.U, atol=1e-12)
 
 
+def test_incremental_unitary():
+    size = 5
+    sub_circuit = Circuit(2) // comp.BS(theta=P("theta_sub")) // comp.PS(phi=P("phi_sub"))
+    c = Circuit(size) // comp.Unitary(Matrix.random_unitary(size))
+    for i in range(size - 1):
+        c //= (i, comp.BS(theta=P(f"theta{i}")))
+        c //= (i, comp.PS(phi=P(f"phi{i}")))
+    c.add(2, sub_circuit, merge=False)
+    c //= (1, comp.Unitary(Matrix.random_unitary(3)))
+    params = c.get_parameters()
+    for param in params:
+        param.set_value(random.random())
+
+    def reference():
+        u = np.eye(size, dtype=complex)
+        for r, component in c:
+            cu = np.eye(size, dtype=complex)
+            cu[r[0]:r[-1] + 1, r[0]:r[-1] + 1] = component.compute_unitary()
+            u = cu @ u
+        return u
+
+    assert np.allclose(c.compute_unitary(), reference())
+    for _ in range(20):  # Change a single parameter, then several ones
+        random.choice(params).set_value(random.random())
+        assert np.allclose(c.compute_unitary(), reference())
+        for param in random.sample(params, 3):
+            param.set_value(random.random())
+        assert np.allclose(c.compute_unitary(), reference())
+    c._components[0][1].inverse(h=True)
+    assert np.allclose(c.compute_unitary(), reference())
+    c //= comp.PS(phi=0.5)
+    assert np.allclose(c.compute_unitary(), reference())
+
+
 def _gen_bs(i: int):
     return comp.BS(theta=P(f"theta{i}"))
 
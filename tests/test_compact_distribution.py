@@ -0,0 +1,129 @@
+# MIT License
+#
+# Copyright (c) 2022 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# As a special exception, the copyright holders of exqalibur library give you
+# permission to combine exqalibur with code included in the standard release of
+# Perceval under the MIT license (or modified versions of such code). You may
+# copy and distribute such a combined system following the terms of the MIT
+# license for both exqalibur and Perceval. This exception for the usage of
+# exqalibur is limited to the python bindings used by Perceval.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import pytest
+import numpy as np
+
+from perceval.utils import BasicState, BasicStateArray, BSDistribution, StateVector, CompactBSDistribution, \
+    CompactStateVector, global_params
+
+
+def _bsd():
+    return BSDistribution({BasicState([1, 0]): 0.2, BasicState([0, 1]): 0.3, BasicState([2, 0]): 0.5})
+
+
+def test_compact_bsd_mapping_api():
+    cbsd = CompactBSDistribution.from_bsd(_bsd())
+    assert len(cbsd) == 3
+    assert BasicState([0, 1]) in cbsd
+    assert BasicState([1, 1]) not in cbsd
+    assert cbsd[BasicState([0, 1])] == pytest.approx(0.3)
+    assert cbsd[BasicState([1, 1])] == 0
+    assert len(cbsd) == 3  # Reading a missing state does not insert it
+
+    cbsd[BasicState([1, 1])] += 0.5
+    cbsd[BasicState([0, 1])] += 0.5
+    cbsd.add(BasicState([0, 2]), 0)
+    assert len(cbsd) == 4
+    assert cbsd[BasicState([0, 1])] == pytest.approx(0.8)
+    cbsd.normalize()
+    assert sum(cbsd.values()) == pytest.approx(1)
+    assert dict(cbsd.items()) == pytest.approx(cbsd.to_bsd())
+    assert repr(cbsd) == str(cbsd) and "|0,1>: " in repr({'results': cbsd})
+
+
+def test_compact_bsd_large_occupation():
+    cbsd = CompactBSDistribution()
+    cbsd[BasicState([1, 0])] = 0.5
+    cbsd[BasicState([300, 0])] = 0.5
+    assert cbsd.state_array.occupations.dtype == np.uint16
+    assert cbsd[BasicState([1, 0])] == 0.5
+    assert cbsd[BasicState([300, 0])] == 0.5
+
+
+def test_compact_bsd_vectorized_operations():
+    cbsd = CompactBSDistribution.from_bsd(_bsd())
+    top = cbsd.top_k(2)
+    assert list(top.keys()) == [BasicState([2, 0]), BasicState([0, 1])]
+
+    cbsd.accumulate(CompactBSDistribution.from_bsd(_bsd()), 2)
+    assert len(cbsd) == 3
+    assert cbsd[BasicState([1, 0])] == pytest.approx(0.6)
+
+    cbsd.prune(0.7)
+    assert len(cbsd) == 2
+    assert BasicState([1, 0]) not in cbsd
+
+
+@pytest.mark.parametrize("merge_modes", [True, False])
+def test_compact_bsd_tensor_product(merge_modes):
+    bsd = _bsd()
+    expected = BSDistribution.tensor_product(bsd, bsd, merge_modes=merge_modes, prob_threshold=0.05)
+    cbsd = CompactBSDistribution.from_bsd(bsd)
+    result = CompactBSDistribution.tensor_product(cbsd, cbsd, merge_modes=merge_modes, prob_threshold=0.05)
+    assert len(result) == len(expected)
+    for state, prob in expected.items():
+        assert result[state] == pytest.approx(prob)
+
+
+def test_compact_bsd_sample():
+    cbsd = CompactBSDistribution.from_bsd(BSDistribution({BasicState([1, 0]): 0.4, BasicState([0, 0]): 0.6}))
+    samples = cbsd.sample(20)
+    assert len(samples) == 20
+    assert all(s == BasicState([1, 0]) for s in samples)
+
+
+def test_compact_state_vector():
+    sv = StateVector([1, 0]) + 1j * StateVector([0, 1])
+    csv = CompactStateVector.from_sv(sv)
+    assert csv[BasicState([0, 1])] == pytest.approx(1j * 2 ** -.5)
+    csv[BasicState([0, 1])] += 1j * 2 ** -.5
+    csv.normalize()
+    assert np.linalg.norm(csv.value_array) == pytest.approx(1)
+    probs = csv.to_probabilities()
+    assert probs[BasicState([0, 1])] == pytest.approx(0.8)
+    assert pytest.approx(csv.to_sv()[BasicState([1, 0])]) == csv[BasicState([1, 0])]
+
+    threshold = global_params["min_complex_component"]
+    csv = CompactStateVector()
+    csv[BasicState([1, 0])] = 1
+    csv[BasicState([0, 1])] = threshold
+    csv[BasicState([1, 1])] = threshold / 2
+    csv.normalize()
+    assert BasicState([0, 1]) in csv  # Components equal to the threshold are kept, as in StateVector
+    assert BasicState([1, 1]) not in csv
+
+
+def test_state_array_from_states():
+    states = [BasicState([1, 0]), BasicState([0, 300]), BasicState([1, 0])]
+    state_array = BasicStateArray.from_states(states)
+    assert state_array.occupations.dtype == np.uint16
+    assert list(state_array) == states
+    with pytest.raises(ValueError):
+        BasicStateArray.from_states([BasicState("|{_:0},{_:1}>")])
@@ -27,12 +27,15 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import os
+import time
 from pathlib import Path
 import pytest
 import perceval as pcvl
 import perceval.components.unitary_components as comp
 from perceval.utils.algorithms.circuit_optimizer import CircuitOptimizer
 from perceval.utils.algorithms import norm
+from perceval.utils.algorithms.decomposition import decompose_parallel
 
 import numpy as np
 
@@ -233,3 +236,28 @@ def test_decomposition_inverse_h():
                                    inverse_h=True,
                                    phase_shifter_fn=comp.PS)
     np.testing.assert_array_almost_equal(u, c.compute_unitary(False), decimal=6)
+
+
+def test_any_unitary_triangle_parallel():
+    with open(TEST_DATA_DIR / 'u_random_3', "r") as f:
+        m = pcvl.Matrix(f)
+    c1 = pcvl.Circuit.decomposition(m, _mzi_triangle(), phase_shifter_fn=comp.PS, shape="triangle", max_try=4,
+                                    n_workers=2)
+    assert c1 is not None
+    np.testing.assert_array_almost_equal(m, c1.compute_unitary(), decimal=6)
+
+
+def _first_trial_succeeds(directory: str):
+    # The first trial to start succeeds at once, the other one is a slow failure
+    try:
+        os.close(os.open(os.path.join(directory, "first"), os.O_CREAT | os.O_EXCL))
+    except FileExistsError:
+        time.sleep(5)
+        return None
+    return ["success"]
+
+
+def test_decompose_parallel_does_not_wait_for_running_trials(tmp_path):
+    start = time.time()
+    assert decompose_parallel(_first_trial_succeeds, 2, 2, str(tmp_path)) == ["success"]
+    assert time.time() - start < 4
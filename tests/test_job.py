@@ -29,6 +29,7 @@
 
 import perceval as pcvl
 from perceval.runtime.job_status import RunningStatus
+import pytest
 import time
 
 
@@ -100,12 +101,38 @@ def test_run_async_cancel():
     assert job.status.status == RunningStatus.CANCELED
 
 
+def square_chunks(n, chunk_size=2, progress_callback=None):
+    for start in range(0, n, chunk_size):
+        if progress_callback:
+            progress_callback(start / n, "chunk")
+        yield {'results': [i ** 2 for i in range(start, min(n, start + chunk_size))],
+               'physical_perf': 0.5, 'logical_perf': 1}
+
+
+def test_stream_job():
+    job = pcvl.LocalStreamJob(square_chunks, fold=lambda acc, r: acc + sum(r), init_results=int)
+    res = job.execute_sync(5)
+    assert res['results'] == 30
+    assert pytest.approx(0.5) == res['physical_perf']
+    assert res['logical_perf'] == 1
+    assert job.status.status == RunningStatus.SUCCESS
+
+    job = pcvl.LocalStreamJob(square_chunks)
+    chunks = [chunk['results'] for chunk in job.iterate(5)]
+    assert chunks == [[0, 1], [4, 9], [16]]
+    assert job.status.status == RunningStatus.SUCCESS
+
+    job = pcvl.LocalStreamJob(square_chunks)
+    for chunk in job.iterate(5):
+        assert job.is_running
+        job.cancel()
+    assert job.status.status == RunningStatus.CANCELED
+
+
 # ============ Remote jobs ============ #
 from perceval.runtime import RemoteJob
-from perceval.serialization import serialize
+from perceval.serialization import serialize, LazyDict
 import json
-import pytest
-import time
 
 _REMOTE_JOB_NAME = "a remote job"
 _REMOTE_JOB_DURATION = 5
@@ -215,3 +242,67 @@ def test_remote_job():
     assert rj.status.creation_timestamp == _REMOTE_JOB_CREATION_TIMESTAMP
     assert rj.status.start_timestamp == _REMOTE_JOB_START_TIMESTAMP
     assert rj.status.duration == _REMOTE_JOB_DURATION
+
+
+class MockResultsRPCHandler(MockRPCHandler):
+    def __init__(self, context_first: bool):
+        self._context_first = context_first
+
+    def get_job_results(self, job_id: str):
+        bsd = pcvl.BSDistribution({pcvl.BasicState([1, 0]): 0.25, pcvl.BasicState([0, 1]): 0.75})
+        job_context = {'mapping_delta_parameters': {'count': 100},
+                       'result_mapping': ['perceval.utils', 'probs_to_sample_count']}
+        results_list = [{'results': bsd, 'iteration': i} for i in range(3)]
+        results = {'job_context': job_context, 'results_list': results_list} if self._context_first \
+            else {'results_list': results_list, 'job_context': job_context}
+        return {'results': json.dumps(serialize(results))}
+
+
+@pytest.mark.parametrize("context_first", [True, False])
+@pytest.mark.parametrize("lazy", [True, False])
+def test_remote_job_results(context_first, lazy):
+    rj = RemoteJob.from_id("any", MockResultsRPCHandler(context_first))
+    results = rj.get_results(lazy=lazy)
+    assert isinstance(results, LazyDict) == lazy
+    assert len(results["results_list"]) == 3
+    for res in results["results_list"]:
+        assert isinstance(res["results"], pcvl.BSCount)
+        assert res["results"].total() == 100
+
+    iterations = list(rj.iter_results(lazy=lazy))
+    assert [res["iteration"] for res in iterations] == [0, 1, 2]
+    for res in iterations:
+        assert isinstance(res["results"], pcvl.BSCount)
+        assert res["results"].total() == 100
+
+
+def test_job_group():
+    fast = pcvl.LocalJob(quadratic_count_down).execute_async(2, speed=0.1)
+    slow = pcvl.LocalJob(quadratic_count_down).execute_async(5, speed=0.2)
+    failing = pcvl.LocalJob(quadratic_count_down).execute_async(3, speed=0.01)
+    remote = RemoteJob.from_id("any", MockResultsRPCHandler(True))
+    with pcvl.JobGroup([slow, fast, failing, remote], refresh_delay=0.05) as group:
+        assert len(group) == 4
+        assert group.wait_any() is not None
+        completed = [(job, results) for job, results in group.as_completed(timeout=10)]
+        assert {id(job) for job, _ in completed} == {id(job) for job in group}
+        assert [id(job) for job, _ in completed].index(id(fast)) < [id(job) for job, _ in completed].index(id(slow))
+        results = dict((id(job), results) for job, results in completed)
+        assert results[id(slow)] == [0, 1, 4, 9, 16]
+        assert results[id(failing)] is None
+        assert len(results[id(remote)]["results_list"]) == 3
+        assert group.wait_all(timeout=0)
+        assert group.results() == [results[id(job)] for job in group]
+
+
+def test_job_group_timeout():
+    job = pcvl.LocalJob(quadratic_count_down).execute_async(5, speed=0.3)
+    group = pcvl.JobGroup([job], refresh_delay=0.05)
+    assert group.wait_any(timeout=0.1) is None
+    assert not group.wait_all(timeout=0.1)
+    with pytest.raises(TimeoutError):
+        list(group.as_completed(timeout=0.1))
+    group.cancel_all()
+    assert group.wait_all(timeout=5)
+    assert group.results() == [None]
+    group.close()
@@ -27,12 +27,14 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import numpy as np
 import pytest
 
 import perceval as pcvl
-from perceval.utils.algorithms.optimize import optimize
+from perceval.utils.algorithms.optimize import optimize, unitary_and_derivatives
 from perceval.utils.algorithms.norm import fidelity, frobenius
 import perceval.components.unitary_components as comp
+from perceval.components.linear_circuit import ACircuit
 
 
 def _create_circuit():
@@ -61,3 +63,52 @@ def test_optimize_frobenius():
     res = optimize(c, v, frobenius, sign=-1)
     # test that the frobenius norm is almost 0 (pytest.approx will not work with almost 0)
     assert pytest.approx(0.5) == res.fun+0.5
+
+
+def test_unitary_derivatives():
+    c = _create_circuit()
+    params = c.get_parameters()
+    for p in params:
+        p.set_value(p.random())
+    u, derivatives = unitary_and_derivatives(c, params)
+    assert np.allclose(u, c.compute_unitary(use_symbolic=False))
+    step = 1e-6
+    for p, du in zip(params, derivatives):
+        value = float(p)
+        p.set_value(value + step)
+        u_plus = np.array(c.compute_unitary(use_symbolic=False))
+        p.set_value(value - step)
+        u_minus = np.array(c.compute_unitary(use_symbolic=False))
+        p.set_value(value)
+        assert np.allclose(du, (u_plus - u_minus) / (2 * step), atol=1e-6)
+
+
+@pytest.mark.parametrize("periodic", [True, False])
+@pytest.mark.parametrize("value", [0, 0.5, 1])
+def test_finite_difference_derivatives_at_bounds(periodic, value):
+    x = pcvl.P("x", min_v=0, max_v=1, periodic=periodic)
+    x.set_value(value)
+    ps = comp.PS(phi=x)
+    [(p, du)] = ACircuit.compute_unitary_derivatives(ps)  # Finite differences instead of the analytic override
+    assert p is x and float(x) == value  # The parameter is left untouched
+    [(_, expected)] = ps.compute_unitary_derivatives()
+    assert np.allclose(du, expected, atol=1e-5)
+
+
+def test_optimize_gradient():
+    c = _create_circuit()
+    v = pcvl.Matrix.random_unitary(3)
+    res = optimize(c, v, fidelity, use_gradient=True)
+    assert pytest.approx(1) == res.fun
+    assert pytest.approx(1) == fidelity(c.compute_unitary(use_symbolic=False), v)
+    res = optimize(c, v, frobenius, sign=-1, use_gradient=True)
+    assert pytest.approx(0.5) == res.fun+0.5
+
+
+def test_optimize_multi_start():
+    c = _create_circuit()
+    v = pcvl.Matrix.random_unitary(3)
+    res = optimize(c, v, fidelity, n_try=4, use_gradient=True, n_workers=2)
+    assert pytest.approx(1) == res.fun
+    assert res.nfev > 0 and res.message  # Fields of the best trial's result are returned
+    assert pytest.approx(1) == fidelity(c.compute_unitary(use_symbolic=False), v)
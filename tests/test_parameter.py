@@ -107,3 +107,25 @@ def test_multiple_parameter_use():
     c = comp.BS.H(phi_bl=phi) // comp.BS.H(phi_tl=phi)
     assert pdisplay_matrix(c.U.simp()) == '''⎡exp(I*phi)/2 + 1/2  (exp(I*phi) - 1)*exp(I*phi)/2⎤
 ⎣exp(I*phi)/2 - 1/2  (exp(I*phi) + 1)*exp(I*phi)/2⎦'''
+
+
+def test_parameter_version():
+    phi = Parameter("phi")
+    theta = Parameter("theta")
+    c = comp.BS(theta=theta) // comp.PS(phi)
+    version = c.version
+    last_version = Parameter.last_version()
+    phi.set_value(1)
+    assert phi.version > version and c.version == phi.version
+    assert Parameter.last_version() > last_version
+    version = c.version
+    phi.set_value(1)  # Same value: no change
+    assert c.version == version
+    theta.set_value(0.5)
+    assert c.version > version
+    version = c.version
+    c.add(0, comp.PS(0.2))  # Structure change
+    assert c.version > version
+    version = c.version
+    theta.reset()
+    assert c.version > version
@@ -27,7 +27,7 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from perceval.utils import BasicState, PostSelect
+from perceval.utils import BasicState, BasicStateArray, PostSelect
 
 import pytest
 
@@ -74,6 +74,14 @@ def test_postselect_usage():
     assert ps_cnot(BasicState("|0,{_:0},0,{_:1},0,0>"))
 
 
+def test_postselect_select():
+    ps = PostSelect("[0]==0 & [1,2]==1 & [3,4]>0 & [5]<1")
+    states = [BasicState([0, 1, 0, 1, 0, 0]), BasicState([0, 0, 1, 2, 0, 0]), BasicState([1, 1, 0, 1, 0, 0]),
+              BasicState([0, 1, 1, 1, 0, 0]), BasicState([0, 1, 0, 0, 0, 0]), BasicState([0, 0, 1, 0, 1, 1])]
+    selection = ps.select(BasicStateArray.from_states(states).occupations)
+    assert list(selection) == [ps(bs) for bs in states]
+
+
 def test_postselect_str():
     ps1 = PostSelect("[0]==0 & [1, 2 ]>0 & [3, 4]==1 & [5]<1")
     ps2 = PostSelect(str(ps1))
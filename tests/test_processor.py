@@ -108,6 +108,27 @@ def test_processor_probs():
     assert pytest.approx(probs['physical_perf']) == 1
 
 
+def test_processor_probs_compact():
+    source = pcvl.Source(emission_probability=0.9, multiphoton_component=0.02, indistinguishability=0.9)
+    circuit = pcvl.Circuit.generic_interferometer(6, lambda i: comp.BS(theta=0.4 + i / 10) // comp.PS(i / 5))
+    results = []
+    for compact in [False, True]:
+        qpu = pcvl.Processor("SLOS", circuit, source)
+        qpu.add_herald(5, 0)
+        qpu.set_postselection(pcvl.PostSelect("[0,1] == 1"))
+        qpu.thresholded_output(True)
+        qpu.compact_output(compact)
+        qpu.with_input(pcvl.BasicState([1, 0, 1, 0, 1]))
+        results.append(qpu.probs())
+    reference, compact_probs = results
+    assert isinstance(compact_probs['results'], pcvl.CompactBSDistribution)
+    assert len(compact_probs['results']) == len(reference['results'])
+    for state, prob in reference['results'].items():
+        assert pytest.approx(prob) == compact_probs['results'][state]
+    assert pytest.approx(reference['physical_perf']) == compact_probs['physical_perf']
+    assert pytest.approx(reference['logical_perf']) == compact_probs['logical_perf']
+
+
 def test_processor_samples():
     proc = pcvl.Processor(Clifford2017Backend(), comp.BS())
 
@@ -120,3 +141,57 @@ def test_processor_samples():
     proc.with_input(pcvl.SVDistribution({pcvl.BasicState("|{_:0},{_:1}>"): 1}))
     samples = proc.samples(500)
     assert samples["results"].count(pcvl.BasicState([1,1])) > 50
+
+
+def test_processor_samples_parallel():
+    proc = pcvl.Processor(Clifford2017Backend(), pcvl.Unitary(pcvl.Matrix.random_unitary(4)),
+                          source=pcvl.Source(emission_probability=0.8))
+    proc.with_input(pcvl.BasicState([1, 1, 0, 0]))
+    proc.set_parallel_workers(2, random_seed=42)
+    samples = proc.samples(3000)
+    assert len(samples["results"]) == 3000
+    assert all(state.n == 2 for state in samples["results"])
+    assert pytest.approx(0.64) == samples["physical_perf"]
+    assert list(proc.samples(3000)["results"]) == list(samples["results"])
+    proc.set_parallel_workers(3, random_seed=42)  # Results do not depend on the worker count
+    assert list(proc.samples(3000)["results"]) == list(samples["results"])
+
+    progress = []
+
+    def cancel_callback(p, _):
+        progress.append(p)
+        return {'cancel_requested': True}
+
+    samples = proc.samples(3000, progress_callback=cancel_callback)
+    assert len(progress) == 1
+    assert 0 < len(samples["results"]) < 3000
+
+
+def test_processor_samples_progress():
+    proc = pcvl.Processor(Clifford2017Backend(), pcvl.Unitary(pcvl.Matrix.random_unitary(4)))
+    proc.with_input(pcvl.BasicState([1, 1, 0, 0]))
+    count = 3 * proc._SAMPLING_CHUNK_SIZE
+    progress = []
+
+    def progress_callback(p, _):
+        progress.append(p)
+
+    assert len(proc.samples(count, progress_callback=progress_callback)["results"]) == count
+    assert progress == pytest.approx([1 / 3, 2 / 3, 1])
+
+    def cancel_callback(p, _):
+        progress.append(p)
+        return {'cancel_requested': True}
+
+    progress = []
+    assert len(proc.samples(count, progress_callback=cancel_callback)["results"]) == proc._SAMPLING_CHUNK_SIZE
+    assert len(progress) == 1
+
+
+def test_processor_samples_iterator_heralds():
+    proc = pcvl.Processor(Clifford2017Backend(), pcvl.Unitary(pcvl.Matrix.random_unitary(4)))
+    proc.add_herald(3, 0)
+    proc.with_input(pcvl.BasicState([1, 1, 0]))
+    chunks = list(proc.samples_iterator(250, chunk_size=100))
+    assert [len(chunk["results"]) for chunk in chunks] == [100, 100, 50]
+    assert all(chunk["results"].m == 3 for chunk in chunks)
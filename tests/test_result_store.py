@@ -0,0 +1,103 @@
+# MIT License
+#
+# Copyright (c) 2022 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# As a special exception, the copyright holders of exqalibur library give you
+# permission to combine exqalibur with code included in the standard release of
+# Perceval under the MIT license (or modified versions of such code). You may
+# copy and distribute such a combined system following the terms of the MIT
+# license for both exqalibur and Perceval. This exception for the usage of
+# exqalibur is limited to the python bindings used by Perceval.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import numpy as np
+import pytest
+
+from perceval.utils import BasicState, BasicStateArray, BSDistribution, BSCount, BSSamples
+from perceval.utils.state_array import fock_space_occupations
+from perceval.serialization import ResultStore, save_result_store
+
+
+def _distribution(m: int, n: int) -> BSDistribution:
+    occupations = fock_space_occupations(m, n)
+    bsd = BSDistribution()
+    for occupation, p in zip(occupations.tolist(), np.random.random(len(occupations))):
+        bsd[BasicState(occupation)] = p
+    bsd.normalize()
+    return bsd
+
+
+def test_result_store_distribution(tmp_path):
+    bsd = _distribution(6, 3)
+    filepath = str(tmp_path / "bsd.pcvs")
+    save_result_store(bsd, filepath)
+    with ResultStore(filepath) as store:
+        assert store.result_type is BSDistribution
+        assert store.m == 6
+        assert len(store) == len(bsd)
+        assert store.has_index
+        for state, p in bsd.items():
+            assert store.lookup(state) == pytest.approx(p)
+        assert store.lookup(BasicState([0, 0, 0, 0, 0, 3])) == pytest.approx(bsd[BasicState([0, 0, 0, 0, 0, 3])])
+        assert store.lookup(BasicState([4, 0, 0, 0, 0, 0])) == 0
+        assert isinstance(store.occupations, np.memmap)
+        assert store.values.sum() == pytest.approx(1)
+        assert store.load() == bsd
+        with pytest.raises(AssertionError):
+            store.append(bsd)  # Read-only
+
+
+def test_result_store_append_chunks(tmp_path):
+    filepath = str(tmp_path / "count.pcvs")
+    chunks = [BSCount({BasicState([1, 0, 1]): 3, BasicState([0, 2, 0]): 5}),
+              BSCount({BasicState([1, 0, 1]): 4, BasicState([0, 0, 2]): 1})]
+    with ResultStore.create(filepath, BSCount, 3) as store:
+        for chunk in chunks:
+            store.append(chunk)
+        assert not store.has_index
+        assert store.lookup(BasicState([1, 0, 1])) == 7  # Scan
+        store.build_index()
+        store.append(BasicStateArray(np.array([[0, 0, 2]])), values=np.array([2]))
+        assert not store.has_index  # Appending drops the index
+        store.build_index()
+
+    with ResultStore(filepath) as store:
+        assert len(store) == 5
+        assert store.lookup(BasicState([1, 0, 1])) == 7
+        assert store.lookup(BasicState([0, 0, 2])) == 3
+        assert store.lookup(BasicState([2, 0, 0])) == 0
+        assert store.load() == BSCount({BasicState([1, 0, 1]): 7, BasicState([0, 2, 0]): 5, BasicState([0, 0, 2]): 3})
+    with pytest.raises(AssertionError):
+        with ResultStore(filepath, mode="a") as store:
+            store.append(BSDistribution(BasicState([1, 0, 1])))
+
+
+def test_result_store_samples(tmp_path):
+    filepath = str(tmp_path / "samples.pcvs")
+    samples = BSSamples([BasicState([1, 0]), BasicState([0, 1]), BasicState([1, 0])])
+    with ResultStore.create(filepath, BSSamples, 2) as store:
+        store.append(samples)
+        store.append(BasicStateArray(np.array([[0, 1], [1, 0]])))
+    with ResultStore(filepath) as store:
+        assert store.values is None
+        assert store.load() == samples + [BasicState([0, 1]), BasicState([1, 0])]
+    with pytest.raises(ValueError):
+        with ResultStore.create(filepath, BSSamples, 2) as store:
+            store.append(BSSamples([BasicState([300, 0])]))
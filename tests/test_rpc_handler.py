@@ -0,0 +1,167 @@
+# MIT License
+#
+# Copyright (c) 2022 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# As a special exception, the copyright holders of exqalibur library give you
+# permission to combine exqalibur with code included in the standard release of
+# Perceval under the MIT license (or modified versions of such code). You may
+# copy and distribute such a combined system following the terms of the MIT
+# license for both exqalibur and Perceval. This exception for the usage of
+# exqalibur is limited to the python bindings used by Perceval.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import asyncio
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from requests import HTTPError
+
+from perceval.runtime import RPCHandler, AsyncRPCHandler
+
+
+class _StubCloud(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive
+    server_version = "StubCloud"
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def _reply(self, code: int, body):
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            data = gzip.compress(data)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.headers.get("Authorization") != "Bearer token":
+            return self._reply(401, {"error": "unauthorized"})
+        if self.path.startswith("/api/job/status/"):
+            job_id = self.path.rsplit("/", 1)[1]
+            with self.server.lock:
+                if self.server.failures > 0:
+                    self.server.failures -= 1
+                    return self._reply(503, {"error": "unavailable"})
+                self.server.polls[job_id] = self.server.polls.get(job_id, 0) + 1
+                status = "completed" if self.server.polls[job_id] >= 2 else "running"
+                status = self.server.statuses.get(job_id, status)
+            return self._reply(200, {"status": status, "progress": 0.5})
+        if self.path.startswith("/api/job/result/"):
+            return self._reply(200, {"results": json.dumps({"job_id": self.path.rsplit("/", 1)[1]})})
+        if self.path.startswith("/api/platform/"):
+            return self._reply(200, {"name": self.path.rsplit("/", 1)[1]})
+        self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        if self.path == "/api/job":
+            payload = json.loads(body)
+            if "job_name" not in payload:
+                return self._reply(400, {"error": "missing job name"})
+            return self._reply(200, {"job_id": f"id-{payload['job_name']}"})
+        self._reply(200, {})
+
+
+@pytest.fixture
+def stub_cloud():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubCloud)
+    server.connections = 0
+    server.failures = 0
+    server.polls = {}
+    server.statuses = {}
+    server.lock = threading.Lock()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _url(server) -> str:
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+@pytest.mark.parametrize("compress_requests", [False, True])
+def test_rpc_handler_session(stub_cloud, compress_requests):
+    with RPCHandler("sim:stub", _url(stub_cloud), "token", compress_requests=compress_requests) as handler:
+        assert handler.fetch_platform_details()["name"] == "sim%3Astub"
+        job_id = handler.create_job({"job_name": "a", "payload": {}})
+        assert job_id == "id-a"
+        for _ in range(3):
+            handler.get_job_status(job_id)
+        assert json.loads(handler.get_job_results(job_id)["results"]) == {"job_id": job_id}
+        handler.cancel_job(job_id)
+        with pytest.raises(HTTPError):
+            handler.create_job({"payload": {}})
+    assert stub_cloud.connections == 1  # All the requests went through a single kept-alive connection
+
+
+def test_rpc_handler_retries(stub_cloud):
+    handler = RPCHandler("sim:stub", _url(stub_cloud), "token", retries=3, backoff_factor=0)
+    stub_cloud.failures = 2
+    assert handler.get_job_status("id")["status"] == "running"
+    stub_cloud.failures = 5
+    with pytest.raises(HTTPError):
+        handler.get_job_status("id")
+    handler.close()
+
+
+def test_async_rpc_handler(stub_cloud):
+    async def run():
+        async with AsyncRPCHandler("sim:stub", _url(stub_cloud), "token", max_concurrency=4) as handler:
+            job_ids = await asyncio.gather(*[handler.create_job({"job_name": str(i), "payload": {}})
+                                             for i in range(20)])
+            statuses = await handler.wait_for_jobs(job_ids, poll_interval=0.01)
+            results = await asyncio.gather(*[handler.get_job_results(job_id) for job_id in job_ids])
+        return job_ids, statuses, results
+
+    job_ids, statuses, results = asyncio.run(run())
+    assert job_ids == [f"id-{i}" for i in range(20)]
+    assert all(statuses[job_id]["status"] == "completed" for job_id in job_ids)
+    assert [json.loads(r["results"])["job_id"] for r in results] == job_ids
+    assert stub_cloud.connections <= 4
+
+
+def test_async_rpc_handler_final_statuses(stub_cloud):
+    stub_cloud.statuses = {"id-error": "error", "id-canceled": "canceled", "id-new": "unheard_of", "id-stuck": "running"}
+
+    async def run(job_ids, timeout):
+        async with AsyncRPCHandler("sim:stub", _url(stub_cloud), "token") as handler:
+            return await handler.wait_for_jobs(job_ids, poll_interval=0.01, timeout=timeout)
+
+    with pytest.warns(UserWarning):
+        statuses = asyncio.run(run(["id-done", "id-error", "id-canceled", "id-new"], None))
+    assert [statuses[job_id]["status"] for job_id in ["id-done", "id-error", "id-canceled", "id-new"]] \
+        == ["completed", "error", "canceled", "unheard_of"]
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(run(["id-done", "id-stuck"], 0.2))
@@ -125,3 +125,57 @@ def test_sampler_iterator():
         assert len(res['results_list']) == len(iteration_list)
         res = sampler.sample_count(100)
         assert len(res['results_list']) == len(iteration_list)
+
+
+def test_sampler_iteration_sweep():
+    c = BS() // PS(phi=pcvl.P("phi1")) // BS()
+    iteration_list = [{"circuit_params": {"phi1": phi}, "input_state": pcvl.BasicState([1, 0])}
+                      for phi in [0.1, 0.8, 1.5, 2.2, 2.9]]
+    iteration_list.append({"circuit_params": {"phi1": 0.5}, "input_state": pcvl.BasicState([1, 1])})
+    for backend_name in ["SLOS", "Naive"]:  # Batched and iterated computations
+        sampler = Sampler(Processor(backend_name, c, Source(emission_probability=0.9)))
+        sampler.add_iteration_list(iteration_list)
+        res = sampler.probs()['results_list']
+        assert len(res) == len(iteration_list)
+        for it, probs in zip(iteration_list[:5], res):
+            # Single photon: the output probability only depends on phi1
+            assert probs['results'][pcvl.BasicState([1, 0])] == pytest.approx(np.sin(it["circuit_params"]["phi1"] / 2) ** 2)
+        c.get_parameters()[0].set_value(0.5)
+        p = Processor(backend_name, c, Source(emission_probability=0.9))
+        p.with_input(pcvl.BasicState([1, 1]))
+        expected = p.probs()['results']
+        for state, prob in expected.items():
+            assert res[-1]['results'][state] == pytest.approx(prob)
+
+
+def test_sampler_samples_stream():
+    p = Processor("CliffordClifford2017", BS(), Source(emission_probability=0.5))
+    p.with_input(pcvl.BasicState([1, 1]))
+    sampler = Sampler(p)
+    res = sampler.samples_stream.execute_sync(2500, chunk_size=1000)
+    assert res['results'].total() == 2500
+    assert res['results'][pcvl.BasicState([1, 1])] == 0  # HOM effect
+    assert pytest.approx(0.25) == res['physical_perf']
+    assert res['logical_perf'] == 1
+
+    job = sampler.samples_stream
+    chunk_sizes = [len(chunk['results']) for chunk in job.iterate(2500, chunk_size=1000)]
+    assert chunk_sizes == [1000, 1000, 500]
+    assert job.status.progress == 1
+
+
+def test_sampler_iteration_sweep_polarized():
+    c = pcvl.Circuit(2) // BS(theta=pcvl.P("t")) // pcvl.components.WP(0.25, 0.1)
+    iteration_list = [{"circuit_params": {"t": t}} for t in [0.4, 1.2]]
+    sampler = Sampler(Processor("SLOS", c))
+    sampler.add_iteration_list([dict(it, input_state=pcvl.BasicState([1, 0])) for it in iteration_list])
+    res = sampler.probs()['results_list']
+    assert len(res) == 2
+    for it, probs in zip(iteration_list, res):
+        c.get_parameters()[0].set_value(it["circuit_params"]["t"])
+        p = Processor("SLOS", c)
+        p.with_input(pcvl.BasicState([1, 0]))
+        expected = p.probs()['results']
+        assert len(probs['results']) == len(expected)
+        for state, prob in expected.items():
+            assert probs['results'][state] == pytest.approx(prob)
@@ -33,7 +33,8 @@ import sympy as sp
 import numpy
 from perceval import Matrix, P, ACircuit, Circuit
 from perceval.utils.statevector import BasicState, BSDistribution, BSCount, BSSamples, SVDistribution, StateVector
-from perceval.serialization import serialize, deserialize, serialize_binary, deserialize_circuit, deserialize_matrix
+from perceval.serialization import serialize, deserialize, serialize_binary, deserialize_circuit, deserialize_matrix, \
+    register_deserializer, LazyDict, LazyList, iter_json_object
 from perceval.serialization._parameter_serialization import serialize_parameter, deserialize_parameter
 import perceval.components.unitary_components as comp
 import json
@@ -242,3 +243,77 @@ def test_compress():
     d_only_basicstate = serialize(d, compress=["BasicState"])  # Compress only BasicState objects
     assert d_only_basicstate["input_state"].startswith(zip_prefix)
     assert not d_only_basicstate["circuit"].startswith(zip_prefix)
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_columnar_serialization(compress):
+    bsd = BSDistribution()
+    bsd.add(BasicState([0, 1, 0]), 0.4)
+    bsd.add(BasicState([1, 0, 300]), 0.4)  # Occupations needing 16 bits
+    bsd.add(BasicState([1, 1, 0]), 0.2)
+    bsc = BSCount()
+    bsc.add(BasicState([0, 1]), 95811)
+    bsc.add(BasicState([1, 0]), 56598)
+    samples = BSSamples()
+    for i in range(300):  # More than 256 distinct samples
+        samples.append(BasicState([i % 2, i]))
+        samples.append(BasicState([1, 0]))
+    for obj in [bsd, bsc, samples, BSDistribution(), BSSamples()]:
+        serialized = serialize(obj, compress=compress, binary=True)
+        assert serialized.startswith(f":PCVL:{type(obj).__name__}:bin:")
+        deserialized = deserialize(serialized)
+        assert type(deserialized) == type(obj)
+        assert deserialized == obj
+
+        payload = serialize_binary(obj, compression="zlib" if compress else None)
+        assert isinstance(payload, bytes)
+        assert deserialize(payload) == obj
+
+    encoded = json.loads(json.dumps(serialize({"results": bsc}, binary=True)))
+    assert deserialize(encoded)["results"] == bsc
+
+
+def test_lazy_deserialization():
+    bsd = BSDistribution({BasicState([1, 0]): 0.4, BasicState([0, 1]): 0.6})
+    serialized = json.loads(json.dumps(serialize({"results": bsd, "results_list": [{"results": bsd}] * 3,
+                                                  "circuit": Circuit(2) // comp.BS(), "count": 3}, compress=True)))
+    lazy = deserialize(serialized, lazy=True)
+    assert isinstance(lazy, LazyDict)
+    assert not lazy.is_decoded("results") and not lazy.is_decoded("circuit")
+    assert lazy["results"] == bsd
+    assert lazy.is_decoded("results") and not lazy.is_decoded("circuit")
+    assert isinstance(lazy["results_list"], LazyList)
+    assert lazy["results_list"][1]["results"] == bsd
+    assert lazy.get("count") == 3 and lazy.get("missing") is None
+    eager = deserialize(serialized)
+    assert lazy["results_list"] == eager["results_list"]
+    assert isinstance(lazy["circuit"], ACircuit)
+
+    # Copies deserialize the values they contain
+    lazy = deserialize(serialized, lazy=True)
+    for copy in [dict(lazy), {**lazy}, lazy.copy()]:
+        assert copy["results"] == bsd and isinstance(copy["circuit"], ACircuit)
+        assert isinstance(copy["results_list"], LazyList)
+    assert lazy["results_list"] + [] == eager["results_list"]
+    assert [] + lazy["results_list"] == eager["results_list"]
+    assert list(lazy["results_list"])[2]["results"] == bsd
+
+
+def test_deserializer_registry():
+    with pytest.raises(NotImplementedError):
+        deserialize(":PCVL:Unknown:payload")
+    register_deserializer("ReversedString", lambda payload: payload[::-1])
+    assert deserialize({"a": ":PCVL:ReversedString:payload"}) == {"a": "daolyap"}
+
+
+def test_iter_json_object():
+    text = json.dumps({"a": 1, "items": [{"x": i} for i in range(4)], "b": {"c": [1, 2]}})
+    pairs = iter_json_object(text, stream_key="items")
+    assert next(pairs) == ("a", 1)
+    key, items = next(pairs)
+    assert key == "items"
+    assert next(items) == {"x": 0}  # The other elements are skipped
+    assert next(pairs) == ("b", {"c": [1, 2]})
+    assert list(pairs) == []
+    assert [k for k, _ in iter_json_object(text)] == ["a", "items", "b"]
+    assert list(iter_json_object(" { } ")) == []
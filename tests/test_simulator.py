@@ -112,6 +112,47 @@ def test_simulator_probs_svd_distinguishable():
     assert res[BasicState("|0,3>")] == pytest.approx(0.288)
 
 
+def _imperfect_svd():
+    from perceval.components import Source
+    source = Source(emission_probability=0.9, multiphoton_component=0.05, indistinguishability=0.9)
+    return source.generate_distribution(BasicState([1, 0, 1, 0]))
+
+
+@pytest.mark.parametrize("backend_name", ["SLOS", "Naive"])
+def test_simulator_probs_svd_parallel(backend_name):
+    from perceval.backends import BackendFactory
+    from perceval.components import Unitary
+    from perceval.utils import Matrix
+    circuit = Unitary(Matrix.random_unitary(4))
+    svd = _imperfect_svd()
+
+    simulator = Simulator(BackendFactory.get_backend(backend_name))
+    simulator.set_circuit(circuit)
+    expected = simulator.probs_svd(svd)['results']
+
+    parallel_simulator = Simulator(BackendFactory.get_backend(backend_name))
+    parallel_simulator.set_circuit(circuit)
+    parallel_simulator.set_parallel_workers(2)
+    res = parallel_simulator.probs_svd(svd)['results']
+    assert res == expected  # Same summation order, hence exactly the same results
+    assert parallel_simulator.DEBUG_merge_count == simulator.DEBUG_merge_count
+
+
+def test_simulator_probs_svd_parallel_cancel():
+    simulator = Simulator(SLOSBackend())
+    simulator.set_circuit(Circuit(4) // (0, BS()) // (2, BS()) // (1, BS()))
+    simulator.set_parallel_workers(2)
+    progress = []
+
+    def cancel(p, _):
+        progress.append(p)
+        return {'cancel_requested': True}
+
+    with pytest.raises(RuntimeError):
+        simulator.probs_svd(_imperfect_svd(), progress_callback=cancel)
+    assert len(progress) == 1
+
+
 def test_simulator_probs_distinguishable():
     in_state = BasicState('|{_:0}{_:1},{_:0}>')
     circuit = BS.H(theta=BS.r_to_theta(0.4))
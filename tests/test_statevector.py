@@ -36,6 +36,7 @@ from perceval.rendering.pdisplay import pdisplay_state_distrib
 
 import numpy as np
 import sympy as sp
+import exqalibur as xq
 
 from test_circuit import strip_line_12
 
@@ -383,3 +384,21 @@ def test_statevector_arithmetic():
     sv4 += 0.2j*sv1
     sv4 += -0.6j*sv2
     assert str(sv4) == "-sqrt(5)*I/5*|0,1>+2*sqrt(5)*I/5*|1,0>"
+
+
+def test_basic_state_array():
+    fsa = xq.FSArray(4, 3)
+    states = pcvl.BasicStateArray.from_fsarray(fsa)
+    assert len(states) == fsa.count()
+    assert states.m == 4
+    for bs, expected in zip(states, fsa):
+        assert bs == expected
+    assert list(states.prodnfact()) == [bs.prodnfact() for bs in fsa]
+    assert all(states.n == 3)
+    assert states[1] == pcvl.BasicState([2, 1, 0, 0])
+    assert len(states[2:5]) == 3
+
+    masked_fsa = xq.FSArray(4, 3, xq.FSMask(4, 3, ["0   "]))
+    masked_states = pcvl.BasicStateArray.from_fsarray(masked_fsa, masked=True)
+    assert len(masked_states) == masked_fsa.count()
+    assert all(bs[0] == 0 for bs in masked_states)
@@ -27,9 +27,9 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from perceval.components import BS, PS, Circuit
+from perceval.components import BS, PS, Circuit, Unitary, PERM
 from perceval.simulators import Stepper, Simulator
-from perceval.utils import BasicState
+from perceval.utils import BasicState, Matrix, P
 from perceval.backends._naive import NaiveBackend
 
 import numpy as np
@@ -62,3 +62,52 @@ def test_stepper_complex_circuit():
     assert len(stepper_res) == len(slos_res)
     for stepper_bs, stepper_p in stepper_res.items():
         assert slos_res[stepper_bs] == pytest.approx(stepper_p)
+
+
+def test_stepper_transfer_cache():
+    phi = P("phi")
+    phi.set_value(0.3)
+    c = (Circuit(3) // BS() // (1, PS(phi)) // (1, BS.H()) // Unitary(Matrix.random_unitary(3)) // (1, BS.H())
+         // (0, BS()))
+    stepper_sim = Stepper()
+    stepper_sim.set_circuit(c)
+    slos_sim = Simulator(NaiveBackend())
+    for value in [0.3, 1.2, 0.3]:
+        phi.set_value(value)  # Components sharing a structure but not parameter values must not share a cache entry
+        slos_sim.set_circuit(c)
+        stepper_res = stepper_sim.probs(BasicState([1, 1, 0]))
+        slos_res = slos_sim.probs(BasicState([1, 1, 0]))
+        assert len(stepper_res) == len(slos_res)
+        for stepper_bs, stepper_p in stepper_res.items():
+            assert slos_res[stepper_bs] == pytest.approx(stepper_p)
+    # BS and BS.H only differ by their convention
+    assert len(stepper_sim._transfer_tables) == 5
+
+
+def test_stepper_array_engine():
+    def _gen_mzi(i: int):
+        return BS(BS.r_to_theta(0.42)) // PS(np.pi+i*0.1) // BS(BS.r_to_theta(0.52)) // PS(np.pi/2)
+
+    c = Circuit.generic_interferometer(5, _gen_mzi)
+    c.add(1, PERM([2, 0, 1]))
+    c.add(0, Unitary(Matrix.random_unitary(3)))
+    input_state = BasicState([2, 0, 1, 1, 0])
+    stepper_sim = Stepper(engine="array")
+    stepper_sim.set_circuit(c)
+    reference_sim = Stepper()
+    reference_sim.set_circuit(c)
+    res = stepper_sim.evolve(input_state)
+    expected = reference_sim.evolve(input_state)
+    assert len(res) == len(expected)
+    for state, amplitude in expected.items():
+        assert res[state] == pytest.approx(amplitude)
+
+    # A large threshold prunes most of the amplitudes, the result is still normalized
+    pruned_sim = Stepper(engine="array", threshold=0.1)
+    pruned_sim.set_circuit(c)
+    pruned = pruned_sim.probs(input_state)
+    assert len(pruned) < len(expected)
+    assert sum(pruned.values()) == pytest.approx(1)
+
+    with pytest.raises(AssertionError):
+        Stepper(engine="unknown")
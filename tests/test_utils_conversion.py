@@ -28,7 +28,7 @@
 # SOFTWARE.
 
 from perceval.utils.conversion import *
-from perceval.utils import BasicState
+from perceval.utils import BasicState, CompactBSDistribution
 
 
 b0 = BasicState([0, 0, 0, 1])
@@ -85,6 +85,13 @@ def test_probs_to_sample_count():
     assert output[b0] < output[b2]
     assert output[b2] < output[b1]
     assert output[b1] < output[b3]
+    assert output.total() == 1000
+
+    output = probs_to_sample_count(CompactBSDistribution.from_bsd(bsd), 1000)
+    assert output.total() == 1000
+    assert output[b0] < output[b3]
+
+    assert len(probs_to_sample_count(BSDistribution(), 1000)) == 0
 
 
 def test_sample_count_to_samples():